@@ -7,7 +7,7 @@ from .models import (
     Visitante, RegistroVisita, ConfiguracionSistema, TipoHorario,
     HorarioDiaSemana, TurnoRotativo, AsignacionTurnoRotativo,
     TipoPermiso, SolicitudPermiso, PeriodoVacacional, SaldoVacaciones,
-    SolicitudVacaciones, TipoJustificante, Justificante, AsignacionTurnoDiaria
+    SolicitudVacaciones, TipoJustificante, Justificante, AsignacionTurnoDiaria, CorreoPendiente, EstadoCorreo
 )
 
 @admin.register(Departamento)
@@ -149,7 +149,7 @@ class AsistenciaAdmin(admin.ModelAdmin):
     list_filter = ['fecha', 'tipo_movimiento', 'retardo', 'empleado__departamento']
     search_fields = ['empleado__user__first_name', 'empleado__user__last_name', 'empleado__codigo_empleado']
     date_hierarchy = 'fecha'
-    readonly_fields = ['timestamp']
+    readonly_fields = ['timestamp', 'secuencia', 'dispositivo', 'nonce']
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('empleado', 'empleado__user')
@@ -480,3 +480,24 @@ class JustificanteAdmin(admin.ModelAdmin):
         )
         self.message_user(request, f'{count} justificante(s) rechazado(s)')
     rechazar_justificantes.short_description = 'Rechazar justificantes seleccionados'
+
+# ========== BANDEJA DE SALIDA ==========
+
+@admin.register(CorreoPendiente)
+class CorreoPendienteAdmin(admin.ModelAdmin):
+    list_display = ['asunto', 'destinatarios', 'estado', 'intentos', 'siguiente_intento', 'creado', 'enviado']
+    list_filter = ['estado', 'creado']
+    search_fields = ['asunto', 'error']
+    date_hierarchy = 'creado'
+    readonly_fields = ['creado', 'enviado', 'lote']
+    actions = ['reintentar_correos']
+
+    def reintentar_correos(self, request, queryset):
+        count = queryset.exclude(estado=EstadoCorreo.ENVIADO).update(
+            estado=EstadoCorreo.PENDIENTE,
+            intentos=0,
+            siguiente_intento=timezone.now(),
+            lote=''
+        )
+        self.message_user(request, f'{count} correo(s) enviado(s) de nuevo a la bandeja de salida')
+    reintentar_correos.short_description = 'Reintentar correos seleccionados'
@@ -1,6 +1,3 @@
-import os
-import sys
-
 from django.apps import AppConfig
 
 
@@ -9,11 +6,7 @@ class AttendanceConfig(AppConfig):
     name = 'attendance'
 
     def ready(self):
-        # No iniciar scheduler durante migrate, collectstatic u otros commands
-        if len(sys.argv) > 1 and sys.argv[1] in ('migrate', 'collectstatic', 'makemigrations', 'shell', 'dbshell', 'createsuperuser'):
-            return
-
-        run_scheduler = os.environ.get('RUN_SCHEDULER', 'true').lower() == 'true'
-        if run_scheduler:
-            from attendance import jobs
-            jobs.start()
+        # Los jobs periódicos corren en su propio proceso (manage.py run_scheduler)
+        from attendance import signals  # noqa: F401
+        from checador.storage_backends import connect_file_signals
+        connect_file_signals()
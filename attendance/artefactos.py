@@ -0,0 +1,148 @@
+"""
+Caché de reportes generados (XLSX/HTML) en el storage de reportes.
+
+Cada archivo se guarda bajo una llave derivada del tipo de reporte, el periodo y
+la versión de datos de sus meses (CierreMensual.version, que las señales
+incrementan al cambiar checadas, justificantes, permisos, vacaciones o tiempo
+extra del mes, y en todos los meses al cambiar empleados, nombres de usuario o
+departamentos). Mientras la versión no cambie, una descarga repetida sirve el archivo
+guardado sin volver a consultar los datos del reporte. Solo se guardan periodos
+ya cerrados: los del mes en curso cambian con cada checada.
+"""
+import hashlib
+import logging
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.http import FileResponse, HttpResponseRedirect
+from django.utils import timezone
+
+from checador.storage_backends import get_reportes_storage
+
+from .models import CierreMensual
+
+logger = logging.getLogger(__name__)
+
+TIPOS_CONTENIDO = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'html': 'text/html; charset=utf-8',
+}
+
+
+def _meses(periodo):
+    anio, mes = periodo.inicio.year, periodo.inicio.month
+    ultimo = periodo.ultimo_dia
+    while (anio, mes) <= (ultimo.year, ultimo.month):
+        yield anio, mes
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def version_datos(periodo):
+    """
+    Versión de los datos de un periodo cerrado ("anio-mes:version" de cada mes que toca),
+    o None si el periodo incluye el mes en curso.
+    """
+    if periodo.fin > timezone.localdate().replace(day=1):
+        return None
+
+    meses = list(_meses(periodo))
+    condicion = Q()
+    for anio, mes in meses:
+        condicion |= Q(anio=anio, mes=mes)
+    versiones = dict(
+        ((anio, mes), version)
+        for anio, mes, version in CierreMensual.objects.filter(condicion).values_list('anio', 'mes', 'version')
+    )
+    faltantes = [(anio, mes) for anio, mes in meses if (anio, mes) not in versiones]
+    if faltantes:
+        # Sin cierre todavía: se crea para que las señales puedan invalidarlo desde ahora
+        CierreMensual.objects.bulk_create(
+            [CierreMensual(anio=anio, mes=mes) for anio, mes in faltantes],
+            ignore_conflicts=True
+        )
+        versiones.update(
+            ((anio, mes), version)
+            for anio, mes, version in CierreMensual.objects.filter(condicion).values_list('anio', 'mes', 'version')
+        )
+    return ','.join(f'{anio}-{mes:02d}:{versiones[(anio, mes)]}' for anio, mes in meses)
+
+
+def nombre_artefacto(tipo, periodo, version, extension):
+    """Ruta del archivo en el storage: una carpeta por (tipo, periodo) y un hash de la versión"""
+    huella = hashlib.sha256(f'{tipo}|{periodo.inicio}|{periodo.fin}|{version}'.encode()).hexdigest()[:16]
+    return f'{tipo}/{periodo.inicio:%Y%m%d}_{periodo.ultimo_dia:%Y%m%d}/{huella}.{extension}'
+
+
+def artefacto_existente(tipo, periodo, extension):
+    """(storage, nombre) del reporte ya guardado para la versión actual del periodo, o None"""
+    version = version_datos(periodo)
+    if version is None:
+        return None
+    storage = get_reportes_storage()
+    nombre = nombre_artefacto(tipo, periodo, version, extension)
+    return (storage, nombre) if storage.exists(nombre) else None
+
+
+def obtener_artefacto(tipo, periodo, extension, generar):
+    """
+    Devuelve el nombre del reporte guardado para la versión actual del periodo,
+    generándolo y guardándolo si todavía no existe.
+
+    Args:
+        tipo: str - Identificador del reporte (ej. 'mensual')
+        periodo: periodos.Periodo
+        extension: 'xlsx' o 'html'
+        generar: callable(destino) que escribe el reporte en el archivo binario destino
+
+    Returns:
+        (storage, nombre), o None si el periodo no es cacheable (incluye el mes en curso)
+    """
+    version = version_datos(periodo)
+    if version is None:
+        return None
+
+    storage = get_reportes_storage()
+    nombre = nombre_artefacto(tipo, periodo, version, extension)
+    if storage.exists(nombre):
+        return storage, nombre
+
+    with SpooledTemporaryFile(max_size=settings.REPORTES_SPOOL_MAX_BYTES) as archivo:
+        generar(archivo)
+        archivo.seek(0)
+        guardado = storage.save(nombre, File(archivo, name=os.path.basename(nombre)))
+    logger.info("Reporte guardado en caché: %s", guardado)
+
+    _eliminar_versiones_anteriores(storage, os.path.dirname(nombre), os.path.basename(guardado))
+    return storage, guardado
+
+
+def _eliminar_versiones_anteriores(storage, carpeta, vigente):
+    try:
+        _, archivos = storage.listdir(carpeta)
+        for archivo in archivos:
+            if archivo != vigente:
+                storage.delete(f'{carpeta}/{archivo}')
+    except Exception:
+        logger.exception("No se pudieron limpiar versiones anteriores de %s", carpeta)
+
+
+def respuesta_artefacto(storage, nombre, nombre_descarga):
+    """
+    Respuesta de descarga para un reporte guardado: redirección a una URL firmada
+    cuando el storage las ofrece (Spaces), o el archivo enviado por bloques en otro caso.
+    """
+    extension = nombre.rsplit('.', 1)[-1]
+    if getattr(storage, 'querystring_auth', False):
+        return HttpResponseRedirect(storage.url(nombre, parameters={
+            'ResponseContentDisposition': f'attachment; filename="{nombre_descarga}"',
+            'ResponseContentType': TIPOS_CONTENIDO[extension],
+        }))
+    return FileResponse(
+        storage.open(nombre, 'rb'),
+        as_attachment=True,
+        filename=nombre_descarga,
+        content_type=TIPOS_CONTENIDO[extension]
+    )
@@ -0,0 +1,64 @@
+"""
+Caché en memoria de proceso con tamaño acotado y desalojo LRU.
+
+Cada worker de gunicorn tiene su propia copia; las señales la limpian en el proceso
+que hizo el cambio y el TTL acota cuánto tiempo puede quedar desactualizada en los demás.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_FALTANTE = object()
+
+
+class CacheLRU:
+    """Diccionario acotado: al llenarse desaloja la entrada usada hace más tiempo"""
+
+    def __init__(self, tamano_maximo=1024, ttl=None):
+        self.tamano_maximo = tamano_maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def get(self, clave, default=None):
+        with self._lock:
+            entrada = self._datos.get(clave, _FALTANTE)
+            if entrada is _FALTANTE:
+                return default
+            valor, expira = entrada
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        expira = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano_maximo:
+                self._datos.popitem(last=False)
+
+    def set_many(self, valores):
+        for clave, valor in valores.items():
+            self.set(clave, valor)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def obtener(self, clave, calcular):
+        """Devuelve el valor en caché o lo calcula con calcular() y lo guarda (None también se guarda)"""
+        valor = self.get(clave, _FALTANTE)
+        if valor is _FALTANTE:
+            valor = calcular()
+            self.set(clave, valor)
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
@@ -0,0 +1,49 @@
+"""
+Candados con vencimiento sobre CandadoProceso.
+
+Tomar y renovar el candado es un solo UPDATE condicional (libre, vencido o ya
+nuestro), así que funciona igual en MySQL y SQLite y no depende de que la
+conexión siga abierta, a diferencia de GET_LOCK.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CandadoProceso
+
+
+def adquirir_candado(nombre, propietario, segundos):
+    """
+    Toma o renueva el candado `nombre` por `segundos`.
+
+    Returns:
+        bool: True si `propietario` tiene el candado al terminar
+    """
+    ahora = timezone.now()
+    try:
+        with transaction.atomic():
+            CandadoProceso.objects.get_or_create(nombre=nombre, defaults={'vence': ahora})
+    except IntegrityError:
+        # Otro proceso creó la fila al mismo tiempo
+        pass
+
+    return bool(CandadoProceso.objects.filter(
+        Q(vence__lte=ahora) | Q(propietario=propietario),
+        nombre=nombre
+    ).update(propietario=propietario, vence=ahora + timedelta(seconds=segundos)))
+
+
+def liberar_candado(nombre, propietario):
+    """Libera el candado si todavía pertenece a `propietario`"""
+    CandadoProceso.objects.filter(nombre=nombre, propietario=propietario).update(
+        propietario='', vence=timezone.now()
+    )
+
+
+def propietario_candado(nombre):
+    """(propietario, vence) del candado vigente, o None si está libre"""
+    return CandadoProceso.objects.filter(
+        nombre=nombre, vence__gt=timezone.now()
+    ).values_list('propietario', 'vence').first()
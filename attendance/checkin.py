@@ -0,0 +1,643 @@
+"""
+Pipeline de check-in de empleados para la tablet de recepción.
+
+Toda la información que necesita una checada (empleado, usuario, tipo de horario,
+movimientos del día, resumen del día y ausencias aprobadas) se resuelve en una sola
+consulta; el retardo se calcula antes del único INSERT de Asistencia y el resumen
+diario se actualiza con un upsert.
+
+Cada checada lleva su número en el día del empleado (Asistencia.secuencia, único por
+empleado y fecha): si dos tablets leen el mismo estado a la vez solo una inserta y la otra
+vuelve a leer y decide de nuevo, sin bloquear la tabla. Un segundo escaneo del mismo
+empleado dentro de CHECKIN_ANTIRREBOTE_SEGUNDOS no registra nada.
+
+registrar_lote recibe de una vez los escaneos que la tablet guardó sin conexión (o una
+ráfaga en el cambio de turno): cada escaneo trae su hora y un nonce, así que reenviar
+un lote no duplica checadas.
+
+La identidad del QR escaneado (empleado_por_qr) sale de una caché de fotos del
+empleado que se llena completa en la primera consulta (o al arrancar el worker), así
+que un QR que no es UUID o de visitante se rechaza sin leer la base de datos. El usuario
+de la checada sale de la foto y la consulta del estado del día no lee auth_user; esa misma
+consulta filtra activo=True, de modo que una foto vieja (la caché es por proceso y las
+señales solo la invalidan en el worker que hizo el cambio) nunca registra la checada de un
+empleado dado de baja: se descarta y se rechaza el escaneo.
+"""
+import logging
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FilteredRelation, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    Empleado, Asistencia, TipoMovimiento, ConfiguracionSistema,
+    SolicitudPermiso, SolicitudVacaciones, TipoAusencia
+)
+from .cache import CacheLRU
+from .resumen_diario import ESTADOS_APROBADOS, actualizar_resumen_checada, reconciliar_resumenes
+from .resumen_mensual import invalidar_resumenes_mensuales
+
+logger = logging.getLogger(__name__)
+
+# Lo que la tablet necesita saber de quién escaneó, sin tocar la base de datos
+class FotoEmpleado(namedtuple(
+    'FotoEmpleado', 'id user_id first_name last_name tipo_horario_id activo tiempo_extra_habilitado'
+)):
+    __slots__ = ()
+
+    @property
+    def nombre(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def usuario(self):
+        """User sin consultar la base de datos, suficiente para get_full_name()"""
+        return User(pk=self.user_id, first_name=self.first_name, last_name=self.last_name)
+
+
+class _CacheCompartida:
+    """Interfaz de CacheLRU sobre un cache de Django compartido entre workers (CHECKIN_QR_CACHE_ALIAS)"""
+
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+
+    def _clave(self, qr):
+        # clear() cambia la generación en lugar de borrar claves una por una
+        generacion = caches[self.alias].get_or_set('checkin_qr:generacion', 0, None)
+        return f'checkin_qr:{generacion}:{qr}'
+
+    def get(self, qr, default=None):
+        return caches[self.alias].get(self._clave(qr), default)
+
+    def set(self, qr, valor):
+        caches[self.alias].set(self._clave(qr), valor, self.ttl)
+
+    def set_many(self, valores):
+        caches[self.alias].set_many({self._clave(qr): valor for qr, valor in valores.items()}, self.ttl)
+
+    def delete(self, qr):
+        caches[self.alias].delete(self._clave(qr))
+
+    def clear(self):
+        try:
+            caches[self.alias].incr('checkin_qr:generacion')
+        except ValueError:
+            caches[self.alias].set('checkin_qr:generacion', 1, None)
+
+
+if getattr(settings, 'CHECKIN_QR_CACHE_ALIAS', ''):
+    _cache_qr = _CacheCompartida(settings.CHECKIN_QR_CACHE_ALIAS, settings.CHECKIN_QR_CACHE_TTL)
+else:
+    _cache_qr = CacheLRU(
+        tamano_maximo=getattr(settings, 'CHECKIN_QR_CACHE_TAMANO', 20000),
+        ttl=getattr(settings, 'CHECKIN_QR_CACHE_TTL', 3600)
+    )
+# Cuándo (time.monotonic) cargó este proceso todas las fotos; None obliga a cargarlas en la
+# siguiente búsqueda. Se recargan completas cada CHECKIN_QR_CACHE_TTL, cuando vencen.
+_cache_qr_cargada = None
+
+
+def _fotos_empleados(**filtros):
+    return {
+        str(qr_uuid): FotoEmpleado(*datos)
+        for qr_uuid, *datos in Empleado.objects.filter(**filtros).values_list(
+            'qr_uuid', 'pk', 'user_id', 'user__first_name', 'user__last_name', 'tipo_horario_id', 'activo',
+            'tiempo_extra_habilitado'
+        )
+    }
+
+
+def calentar_cache_qr():
+    """Carga en una consulta las fotos de todos los empleados; devuelve cuántas se cargaron"""
+    global _cache_qr_cargada
+    fotos = _fotos_empleados()
+    _cache_qr.set_many(fotos)
+    _cache_qr_cargada = time.monotonic()
+    return len(fotos)
+
+
+def empleado_por_qr(qr_code):
+    """
+    Resuelve el QR escaneado a la foto del empleado.
+
+    Returns:
+        FotoEmpleado, o None si el texto no es un UUID o no corresponde a ningún empleado
+    """
+    try:
+        qr = str(uuid.UUID(qr_code))
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if _cache_qr_cargada is None or time.monotonic() - _cache_qr_cargada > _cache_qr.ttl:
+        calentar_cache_qr()
+    foto = _cache_qr.get(qr)
+    if foto is None:
+        # Empleado dado de alta en otro worker o entrada vencida por el TTL
+        foto = _fotos_empleados(qr_uuid=qr).get(qr)
+        if foto is not None:
+            _cache_qr.set(qr, foto)
+    return foto
+
+
+def invalidar_empleado_qr(qr_uuid):
+    """Descarta la foto de un empleado (se vuelve a leer en su siguiente escaneo)"""
+    _cache_qr.delete(str(qr_uuid))
+
+
+def _foto_activa(qr_code):
+    """(QR normalizado, FotoEmpleado) del empleado activo del QR, o None"""
+    foto = empleado_por_qr(qr_code)
+    if foto is None:
+        return None
+    qr = str(uuid.UUID(qr_code))
+    if not foto.activo:
+        # Pudo reactivarse en otro worker: se confirma antes de rechazar
+        invalidar_empleado_qr(qr)
+        foto = empleado_por_qr(qr)
+    return (qr, foto) if foto is not None and foto.activo else None
+
+
+def empleado_checkin_por_qr(qr_code, fecha):
+    """
+    Empleado activo del QR escaneado, listo para registrar_checada, en una sola consulta.
+
+    Args:
+        qr_code: str - Texto leído del QR
+        fecha: datetime.date - Día de la checada
+
+    Returns:
+        Empleado con las anotaciones de consulta_empleados_checkin y el usuario de la foto,
+        o None si el QR no es de un empleado activo
+    """
+    encontrado = _foto_activa(qr_code)
+    if encontrado is None:
+        return None
+    qr, foto = encontrado
+    try:
+        empleado = consulta_empleados_checkin(fecha, con_usuario=False).get(pk=foto.id, activo=True)
+    except Empleado.DoesNotExist:
+        # Foto vieja de un empleado dado de baja o borrado en otro worker
+        invalidar_empleado_qr(qr)
+        return None
+    empleado.user = foto.usuario()
+    return empleado
+
+
+def limpiar_cache_qr():
+    """Descarta todas las fotos; la siguiente búsqueda las vuelve a cargar completas"""
+    global _cache_qr_cargada
+    _cache_qr.clear()
+    _cache_qr_cargada = None
+
+
+def consulta_empleados_checkin(fecha, con_usuario=True):
+    """
+    QuerySet de Empleado con user (si con_usuario) y tipo_horario cargados y las anotaciones que
+    necesita una checada en fecha: ultimo_movimiento, ultima_hora, checadas_hoy, ultima_secuencia,
+    vacaciones_inicio, vacaciones_fin, permiso_dia, permiso_hora_inicio, permiso_hora_fin
+    y los campos del resumen del día con prefijo resumen_ (None si aún no existe)
+    """
+    checadas = Asistencia.objects.filter(empleado=OuterRef('pk'), fecha=fecha)
+
+    vacaciones = SolicitudVacaciones.objects.filter(
+        empleado=OuterRef('pk'),
+        fecha_inicio__lte=fecha,
+        fecha_fin__gte=fecha,
+        estado__in=ESTADOS_APROBADOS
+    ).order_by('-fecha_solicitud')
+
+    permisos_dia = SolicitudPermiso.objects.filter(
+        empleado=OuterRef('pk'),
+        tipo_ausencia=TipoAusencia.DIAS_COMPLETOS,
+        fecha_inicio__lte=fecha,
+        fecha_fin__gte=fecha,
+        estado__in=ESTADOS_APROBADOS
+    ).order_by('-fecha_solicitud')
+
+    permisos_horas = SolicitudPermiso.objects.filter(
+        empleado=OuterRef('pk'),
+        tipo_ausencia=TipoAusencia.HORAS,
+        fecha_inicio=fecha,
+        estado__in=ESTADOS_APROBADOS
+    ).order_by('-fecha_solicitud')
+
+    relacionados = ('user', 'tipo_horario') if con_usuario else ('tipo_horario',)
+    return Empleado.objects.select_related(*relacionados).annotate(
+        resumen_hoy=FilteredRelation('resumenes_diarios', condition=Q(resumenes_diarios__fecha=fecha)),
+        ultimo_movimiento=Subquery(checadas.order_by('-hora').values('tipo_movimiento')[:1]),
+        ultima_hora=Subquery(checadas.order_by('-hora').values('hora')[:1]),
+        checadas_hoy=Coalesce(
+            Subquery(checadas.order_by().values('empleado').annotate(total=Count('pk')).values('total')),
+            0
+        ),
+        ultima_secuencia=Coalesce(Subquery(checadas.order_by('-secuencia').values('secuencia')[:1]), 0),
+        vacaciones_inicio=Subquery(vacaciones.values('fecha_inicio')[:1]),
+        vacaciones_fin=Subquery(vacaciones.values('fecha_fin')[:1]),
+        permiso_dia=Subquery(permisos_dia.values('tipo_permiso__nombre')[:1]),
+        permiso_hora_inicio=Subquery(permisos_horas.values('hora_inicio')[:1]),
+        permiso_hora_fin=Subquery(permisos_horas.values('hora_fin')[:1]),
+        resumen_checadas=F('resumen_hoy__checadas'),
+        resumen_primera_entrada=F('resumen_hoy__primera_entrada'),
+        resumen_salida_comida=F('resumen_hoy__salida_comida'),
+        resumen_entrada_comida=F('resumen_hoy__entrada_comida'),
+        resumen_ultima_salida=F('resumen_hoy__ultima_salida'),
+        resumen_retardo=F('resumen_hoy__retardo'),
+        resumen_minutos_retardo=F('resumen_hoy__minutos_retardo'),
+        resumen_minutos_trabajados=F('resumen_hoy__minutos_trabajados'),
+        resumen_ausencia=F('resumen_hoy__ausencia'),
+        resumen_es_dia_laboral=F('resumen_hoy__es_dia_laboral'),
+        resumen_hora_entrada_esperada=F('resumen_hoy__hora_entrada_esperada'),
+    )
+
+
+def cargar_empleado_checkin(fecha, **filtros):
+    """
+    Obtiene el empleado con todo lo necesario para registrar su checada en una consulta.
+
+    Args:
+        fecha: datetime.date - Día de la checada
+        **filtros: Filtros para localizar al empleado (ej. qr_uuid=..., activo=True)
+
+    Returns:
+        Empleado con las anotaciones de consulta_empleados_checkin
+
+    Raises:
+        Empleado.DoesNotExist si no hay empleado con esos filtros
+    """
+    return consulta_empleados_checkin(fecha).get(**filtros)
+
+
+def siguiente_movimiento(ultimo_movimiento, tiene_comida):
+    """Determina el tipo de movimiento que sigue al último registrado en el día"""
+    if not ultimo_movimiento:
+        return TipoMovimiento.ENTRADA
+
+    # Si NO tiene horario de comida, alternar entre ENTRADA y SALIDA solamente
+    if not tiene_comida:
+        if ultimo_movimiento == TipoMovimiento.ENTRADA:
+            return TipoMovimiento.SALIDA
+        # Cualquier otra checada reinicia el ciclo
+        return TipoMovimiento.ENTRADA
+
+    # Horario CON comida: secuencia completa ENTRADA → SALIDA_COMIDA → ENTRADA_COMIDA → SALIDA
+    if ultimo_movimiento == TipoMovimiento.ENTRADA:
+        return TipoMovimiento.SALIDA_COMIDA
+    elif ultimo_movimiento == TipoMovimiento.SALIDA_COMIDA:
+        return TipoMovimiento.ENTRADA_COMIDA
+    elif ultimo_movimiento == TipoMovimiento.ENTRADA_COMIDA:
+        return TipoMovimiento.SALIDA
+    # Si hay algún caso extraño (SALIDA), reiniciar ciclo
+    return TipoMovimiento.ENTRADA
+
+
+# Lecturas del estado del día por checada cuando otra tablet gana la misma secuencia
+INTENTOS_CHECADA = 3
+
+
+def registrar_checada(empleado, ahora=None):
+    """
+    Registra la siguiente checada de un empleado.
+
+    Args:
+        empleado: Empleado obtenido con cargar_empleado_checkin (si no trae las
+            anotaciones se vuelve a cargar)
+        ahora: datetime con zona horaria; por defecto la hora local actual
+
+    Returns:
+        dict: {
+            'asistencia': Asistencia creada o None si la checada fue rechazada o repetida,
+            'avisos': lista de (nivel, texto) con nivel 'warning' o 'info',
+            'error': texto del rechazo o None,
+            'mensaje': texto de confirmación o None,
+            'repetida': True si fue un segundo escaneo dentro de CHECKIN_ANTIRREBOTE_SEGUNDOS
+        }
+    """
+    ahora = timezone.localtime(ahora)
+    if not hasattr(empleado, 'ultima_secuencia'):
+        empleado = cargar_empleado_checkin(ahora.date(), pk=empleado.pk)
+
+    for intento in range(INTENTOS_CHECADA):
+        resultado = preparar_checada(empleado, ahora)
+        if resultado['asistencia'] is None:
+            return resultado
+        try:
+            with transaction.atomic():
+                # El resumen se actualiza con el upsert incremental, no al confirmar (señales)
+                resultado['asistencia'].resumen_diario_al_dia = True
+                resultado['asistencia'].save()
+                actualizar_resumen_checada(empleado, resultado['asistencia'])
+            return resultado
+        except IntegrityError:
+            if intento == INTENTOS_CHECADA - 1:
+                raise
+            # Otra tablet registró una checada del empleado entre la lectura y el INSERT:
+            # se vuelve a leer el día y se decide de nuevo (normalmente queda como repetida)
+            empleado = cargar_empleado_checkin(ahora.date(), pk=empleado.pk)
+
+
+def preparar_checada(empleado, ahora):
+    """
+    Decide el movimiento, el retardo y los mensajes de una checada sin guardarla.
+
+    Args:
+        empleado: Empleado con las anotaciones de consulta_empleados_checkin
+        ahora: datetime con zona horaria
+
+    Returns:
+        dict como registrar_checada, con la Asistencia aún sin guardar
+    """
+    ahora = timezone.localtime(ahora)
+    hoy = ahora.date()
+    hora = ahora.time()
+
+    nombre = empleado.user.get_full_name()
+    resultado = {'asistencia': None, 'avisos': [], 'error': None, 'mensaje': None, 'repetida': False}
+
+    # === ANTIRREBOTE ===
+    # Doble escaneo o la misma persona en dos tablets: no se registra otra checada
+
+    if empleado.ultima_hora and settings.CHECKIN_ANTIRREBOTE_SEGUNDOS:
+        segundos = abs((datetime.combine(hoy, hora) - datetime.combine(hoy, empleado.ultima_hora)).total_seconds())
+        if segundos < settings.CHECKIN_ANTIRREBOTE_SEGUNDOS:
+            resultado['repetida'] = True
+            resultado['mensaje'] = (
+                f"✅ {nombre} - {TipoMovimiento(empleado.ultimo_movimiento).label} ya registrada "
+                f"({empleado.ultima_hora.strftime('%H:%M')})"
+            )
+            return resultado
+
+    # === VALIDAR PERMISOS Y VACACIONES ===
+    # Se permite el registro, pero con advertencia
+
+    if empleado.vacaciones_inicio:
+        resultado['avisos'].append((
+            'warning',
+            f"{nombre} - Tienes vacaciones aprobadas del {empleado.vacaciones_inicio} al {empleado.vacaciones_fin}. No deberías estar registrando asistencia."
+        ))
+
+    if empleado.permiso_dia:
+        resultado['avisos'].append((
+            'warning',
+            f"{nombre} - Tienes permiso aprobado para hoy ({empleado.permiso_dia}). No deberías estar registrando asistencia."
+        ))
+
+    if empleado.permiso_hora_inicio and empleado.permiso_hora_fin:
+        if empleado.permiso_hora_inicio <= hora <= empleado.permiso_hora_fin:
+            resultado['avisos'].append((
+                'info',
+                f"{nombre} - Tienes permiso por horas de {empleado.permiso_hora_inicio.strftime('%H:%M')} a {empleado.permiso_hora_fin.strftime('%H:%M')}."
+            ))
+
+    # === DETERMINAR MOVIMIENTO ===
+
+    tipo_horario = empleado.tipo_horario
+    # Para turnos de 24h nunca hay comida
+    tiene_comida = bool(tipo_horario and not tipo_horario.es_turno_24h and tipo_horario.tiene_horario_comida)
+    tipo = siguiente_movimiento(empleado.ultimo_movimiento, tiene_comida)
+
+    # Validar horario de comida si aplica
+    if tipo == TipoMovimiento.SALIDA_COMIDA:
+        if tipo_horario and tipo_horario.tiene_horario_comida:
+            if tipo_horario.hora_inicio_comida and tipo_horario.hora_fin_comida:
+                if not (tipo_horario.hora_inicio_comida <= hora <= tipo_horario.hora_fin_comida):
+                    resultado['error'] = (
+                        f"No puedes salir a comer fuera del horario permitido ({tipo_horario.hora_inicio_comida.strftime('%H:%M')} - {tipo_horario.hora_fin_comida.strftime('%H:%M')})"
+                    )
+                    return resultado
+        elif tipo_horario and not tipo_horario.tiene_horario_comida:
+            resultado['error'] = "Tu horario no incluye salida a comida"
+            return resultado
+
+    # === PREPARAR (un solo INSERT con el retardo ya calculado) ===
+
+    asistencia = Asistencia(
+        empleado=empleado,
+        fecha=hoy,
+        hora=hora,
+        tipo_movimiento=tipo,
+        secuencia=empleado.ultima_secuencia + 1
+    )
+
+    if tipo == TipoMovimiento.ENTRADA:
+        if tipo_horario and tipo_horario.hora_entrada:
+            asistencia.calcular_retardo(str(tipo_horario.hora_entrada), tipo_horario.minutos_tolerancia)
+        elif tipo_horario:
+            # Horario sin hora de entrada: usar la configuración global como respaldo
+            config = ConfiguracionSistema.objects.first()
+            if config:
+                asistencia.calcular_retardo(str(config.hora_entrada), config.minutos_tolerancia)
+            else:
+                asistencia.calcular_retardo()
+        else:
+            # Sin tipo de horario, obtener_horario_esperado ya usa la configuración global
+            asistencia.calcular_retardo()
+
+    resultado['asistencia'] = asistencia
+
+    # === MENSAJE INFORMATIVO ===
+
+    mensaje = f"✅ {nombre} - {asistencia.get_tipo_movimiento_display()} ({hora.strftime('%H:%M')})"
+
+    if asistencia.retardo:
+        mensaje += f" ⚠️ Retardo: {asistencia.minutos_retardo} min"
+
+    total_checadas_hoy = empleado.checadas_hoy + 1
+
+    if tipo == TipoMovimiento.ENTRADA:
+        mensaje += f" | Checada #{total_checadas_hoy}"
+    elif tipo == TipoMovimiento.SALIDA:
+        if tiene_comida:
+            mensaje += f" (Final del día) | Total checadas: {total_checadas_hoy}"
+        else:
+            mensaje += f" | Checada #{total_checadas_hoy}"
+    elif tipo == TipoMovimiento.SALIDA_COMIDA:
+        mensaje += " 🍽️"
+    elif tipo == TipoMovimiento.ENTRADA_COMIDA:
+        mensaje += " 💼"
+
+    resultado['mensaje'] = mensaje
+    return resultado
+
+
+class EstadoEscaneo:
+    REGISTRADO = 'registrado'
+    DUPLICADO = 'duplicado'
+    RECHAZADO = 'rechazado'
+
+
+def _momento_escaneo(valor, ahora):
+    """datetime con zona horaria del escaneo, o el texto del motivo por el que no se acepta"""
+    try:
+        momento = parse_datetime(valor) if isinstance(valor, str) else None
+    except ValueError:
+        # Formato ISO correcto con valores fuera de rango (p. ej. mes 13)
+        momento = None
+    if momento is None:
+        return 'Hora del escaneo inválida'
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    if momento > ahora + timedelta(seconds=settings.CHECKIN_RELOJ_TOLERANCIA):
+        return 'La hora de la tablet está adelantada'
+    if momento < ahora - timedelta(hours=settings.CHECKIN_LOTE_MAX_HORAS):
+        return 'Escaneo demasiado antiguo para sincronizarse'
+    return timezone.localtime(momento)
+
+
+def registrar_lote(escaneos):
+    """
+    Registra en una transacción un lote de escaneos de empleados de la tablet.
+
+    Los escaneos se aplican en orden de hora por empleado, como si se hubieran hecho en
+    línea; las checadas se insertan con un bulk_create y los resúmenes de los días
+    tocados se reconcilian al final. Un nonce ya registrado (p. ej. un lote reenviado
+    porque se perdió la respuesta) se reporta como duplicado con la checada original, y
+    un escaneo dentro de CHECKIN_ANTIRREBOTE_SEGUNDOS de la checada anterior del empleado,
+    como duplicado de esa checada.
+
+    Un escaneo más antiguo que la última checada ya guardada del empleado (la tablet estuvo
+    sin conexión mientras el empleado checó en otra) se rechaza: insertarlo después
+    cambiaría el tipo de las checadas ya confirmadas, así que se registra en el log para
+    capturarlo a mano. Cualquier escaneo inválido se rechaza solo, sin fallar el lote.
+
+    Args:
+        escaneos: lista de dicts {qr_code, timestamp (ISO 8601), dispositivo, nonce}
+
+    Returns:
+        list de dicts en el mismo orden: {nonce, estado (EstadoEscaneo), movimiento,
+        retardo, minutos_retardo, mensaje, error, avisos}
+    """
+    try:
+        with transaction.atomic():
+            return _registrar_lote(escaneos)
+    except IntegrityError:
+        # Otro lote con los mismos nonces (o una checada en línea con la misma secuencia) se guardó
+        # al mismo tiempo: al repetir se parte del estado ya guardado
+        with transaction.atomic():
+            return _registrar_lote(escaneos)
+
+
+def _registrar_lote(escaneos):
+    ahora = timezone.now()
+    resultados = []
+    pendientes = []
+    for escaneo in escaneos:
+        escaneo = escaneo if isinstance(escaneo, dict) else {}
+        resultado = {
+            'nonce': str(escaneo.get('nonce') or '')[:64], 'estado': EstadoEscaneo.RECHAZADO, 'movimiento': None,
+            'retardo': False, 'minutos_retardo': 0, 'mensaje': None, 'error': None, 'avisos': []
+        }
+        resultados.append(resultado)
+        momento = _momento_escaneo(escaneo.get('timestamp'), ahora)
+        encontrado = _foto_activa(str(escaneo.get('qr_code') or ''))
+        if not resultado['nonce']:
+            resultado['error'] = 'Escaneo sin nonce'
+        elif isinstance(momento, str):
+            resultado['error'] = momento
+        elif encontrado is None:
+            resultado['error'] = 'Código QR no válido'
+        else:
+            pendientes.append((momento, *encontrado, str(escaneo.get('dispositivo') or '')[:64], resultado))
+
+    # Idempotencia: los nonces ya guardados (o repetidos en el mismo lote) no se vuelven a insertar
+    previos = {
+        asistencia['nonce']: asistencia
+        for asistencia in Asistencia.objects.filter(
+            nonce__in=[resultado['nonce'] for *_, resultado in pendientes]
+        ).values('nonce', 'tipo_movimiento', 'retardo', 'minutos_retardo')
+    }
+    nuevos = []
+    repetidos = []
+    primeros = {}
+    for pendiente in pendientes:
+        resultado = pendiente[-1]
+        previo = previos.get(resultado['nonce'])
+        if previo:
+            resultado.update(
+                estado=EstadoEscaneo.DUPLICADO, movimiento=previo['tipo_movimiento'], retardo=previo['retardo'],
+                minutos_retardo=previo['minutos_retardo'], mensaje='Checada ya registrada'
+            )
+        elif resultado['nonce'] in primeros:
+            repetidos.append((resultado, primeros[resultado['nonce']]))
+        else:
+            primeros[resultado['nonce']] = resultado
+            nuevos.append(pendiente)
+
+    asistencias = []
+    nuevos.sort(key=lambda pendiente: pendiente[0])
+    for fecha, del_dia in groupby(nuevos, key=lambda pendiente: pendiente[0].date()):
+        del_dia = list(del_dia)
+        # Estado del día de todos los empleados del lote en una consulta
+        empleados = consulta_empleados_checkin(fecha, con_usuario=False).filter(activo=True).in_bulk(
+            {foto.id for _, _, foto, *_ in del_dia}
+        )
+        tocados = {}
+        asistencias_dia = []
+        for momento, qr, foto, dispositivo, resultado in del_dia:
+            empleado_id = foto.id
+            empleado = empleados.get(empleado_id)
+            if empleado is None:
+                # Foto vieja de un empleado dado de baja o borrado en otro worker
+                invalidar_empleado_qr(qr)
+                resultado['error'] = 'Código QR no válido'
+                continue
+            empleado.user = foto.usuario()
+            checada = preparar_checada(empleado, momento)
+            asistencia = checada['asistencia']
+            if checada['repetida']:
+                resultado.update(
+                    estado=EstadoEscaneo.DUPLICADO, movimiento=empleado.ultimo_movimiento, mensaje=checada['mensaje']
+                )
+                continue
+            if empleado.ultima_hora and momento.time() < empleado.ultima_hora:
+                resultado['error'] = (
+                    f"El escaneo de las {momento:%H:%M} llegó después de la checada de las "
+                    f"{empleado.ultima_hora:%H:%M}; debe capturarse manualmente"
+                )
+                logger.warning(
+                    "Escaneo sin conexión rechazado: empleado %s, %s anterior a su última checada (%s), dispositivo %s",
+                    empleado_id, momento.isoformat(), empleado.ultima_hora.isoformat(), dispositivo or '-'
+                )
+                continue
+            resultado.update(
+                mensaje=checada['mensaje'], error=checada['error'],
+                avisos=[{'nivel': nivel, 'texto': texto} for nivel, texto in checada['avisos']]
+            )
+            if asistencia is None:
+                continue
+            asistencia.nonce = resultado['nonce']
+            asistencia.dispositivo = dispositivo
+            asistencias_dia.append(asistencia)
+            resultado.update(
+                estado=EstadoEscaneo.REGISTRADO, movimiento=asistencia.tipo_movimiento,
+                retardo=asistencia.retardo, minutos_retardo=asistencia.minutos_retardo
+            )
+            # El siguiente escaneo del mismo empleado parte de esta checada
+            empleado.ultimo_movimiento = asistencia.tipo_movimiento
+            empleado.ultima_hora = asistencia.hora
+            empleado.checadas_hoy += 1
+            empleado.ultima_secuencia = asistencia.secuencia
+            tocados[empleado_id] = empleado
+        if asistencias_dia:
+            Asistencia.objects.bulk_create(asistencias_dia, batch_size=500)
+            reconciliar_resumenes(fecha, fecha, empleados=tocados.values())
+            asistencias.extend(asistencias_dia)
+
+    for resultado, primero in repetidos:
+        resultado.update(
+            {campo: primero[campo] for campo in ('movimiento', 'retardo', 'minutos_retardo', 'mensaje', 'error')},
+            estado=EstadoEscaneo.DUPLICADO if primero['estado'] == EstadoEscaneo.REGISTRADO else primero['estado']
+        )
+
+    if asistencias:
+        # bulk_create no dispara las señales de Asistencia
+        invalidar_resumenes_mensuales(asistencias[0].fecha, asistencias[-1].fecha)
+    return resultados
@@ -0,0 +1,167 @@
+"""
+Bandeja de salida de correos (CorreoPendiente).
+
+Las vistas y los jobs no hablan con SendGrid: guardan el correo y regresan. El
+envío reclama lotes con un UPDATE condicional (así dos procesos nunca mandan el
+mismo correo) y los manda sobre una sola conexión SMTP, en lugar de una sesión
+TLS por mensaje. Un correo que falla se reintenta con espera exponencial y, al
+agotar CORREOS_MAX_INTENTOS, queda en FALLIDO para revisarlo desde el admin.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from checador.storage_backends import get_reportes_storage
+
+from .models import CorreoPendiente, EstadoCorreo
+
+logger = logging.getLogger(__name__)
+
+
+def encolar_correos(mensajes):
+    """
+    Guarda en la bandeja de salida una lista de EmailMessage/EmailMultiAlternatives.
+
+    Los adjuntos se guardan en el storage de reportes y el correo solo conserva su nombre.
+
+    Returns:
+        list de CorreoPendiente
+    """
+    correos = []
+    for mensaje in mensajes:
+        html = next(
+            (contenido for contenido, tipo in getattr(mensaje, 'alternatives', []) if tipo == 'text/html'), ''
+        )
+        adjuntos = []
+        if mensaje.attachments:
+            storage = get_reportes_storage()
+            carpeta = f'correos/{uuid.uuid4().hex}'
+            for nombre, contenido, tipo in mensaje.attachments:
+                archivo = storage.save(f'{carpeta}/{nombre}', ContentFile(contenido))
+                adjuntos.append({'archivo': archivo, 'nombre': nombre, 'tipo': tipo})
+        correos.append(CorreoPendiente(
+            asunto=mensaje.subject,
+            texto=mensaje.body,
+            html=html,
+            remitente=mensaje.from_email,
+            destinatarios=list(mensaje.to),
+            adjuntos=adjuntos
+        ))
+    return CorreoPendiente.objects.bulk_create(correos)
+
+
+def reclamar_lote(tamano):
+    """
+    Reclama hasta `tamano` correos listos para enviarse. El reclamo los aparta por
+    CORREOS_TIEMPO_MAXIMO segundos: si el proceso muere a medio envío, vuelven a
+    estar disponibles al vencer.
+
+    Returns:
+        list de CorreoPendiente (vacía si no hay nada por enviar)
+    """
+    ahora = timezone.now()
+    listos = CorreoPendiente.objects.filter(estado=EstadoCorreo.PENDIENTE, siguiente_intento__lte=ahora)
+    candidatos = list(listos.order_by('siguiente_intento', 'pk').values_list('pk', flat=True)[:tamano])
+    if not candidatos:
+        return []
+
+    lote = uuid.uuid4().hex
+    listos.filter(pk__in=candidatos).update(
+        lote=lote,
+        intentos=F('intentos') + 1,
+        siguiente_intento=ahora + timedelta(seconds=settings.CORREOS_TIEMPO_MAXIMO)
+    )
+    return list(CorreoPendiente.objects.filter(lote=lote).order_by('pk'))
+
+
+def _mensaje(correo, conexion):
+    mensaje = EmailMultiAlternatives(
+        correo.asunto, correo.texto, correo.remitente, correo.destinatarios, connection=conexion
+    )
+    if correo.html:
+        mensaje.attach_alternative(correo.html, "text/html")
+    if correo.adjuntos:
+        storage = get_reportes_storage()
+        for adjunto in correo.adjuntos:
+            with storage.open(adjunto['archivo'], 'rb') as archivo:
+                mensaje.attach(adjunto['nombre'], archivo.read(), adjunto['tipo'])
+    return mensaje
+
+
+def _registrar_fallo(correo, error):
+    """Programa el siguiente intento (1, 2, 4... veces CORREOS_REINTENTO_BASE) o lo da por fallido"""
+    if correo.intentos >= settings.CORREOS_MAX_INTENTOS:
+        logger.error("Correo #%s sin más reintentos (%s): %s", correo.pk, correo.asunto, error)
+        cambios = {'estado': EstadoCorreo.FALLIDO}
+    else:
+        espera = settings.CORREOS_REINTENTO_BASE * 2 ** (correo.intentos - 1)
+        logger.warning("Correo #%s falló (intento %s), se reintenta en %s s: %s", correo.pk, correo.intentos, espera, error)
+        cambios = {'siguiente_intento': timezone.now() + timedelta(seconds=espera)}
+    CorreoPendiente.objects.filter(pk=correo.pk).update(error=str(error), lote='', **cambios)
+
+
+def enviar_pendientes(tamano_lote=None):
+    """
+    Envía la bandeja de salida por lotes hasta vaciarla; cada lote usa una conexión SMTP.
+
+    Returns:
+        (enviados, fallidos)
+    """
+    tamano_lote = tamano_lote or settings.CORREOS_LOTE
+    enviados = fallidos = 0
+    while True:
+        lote = reclamar_lote(tamano_lote)
+        if not lote:
+            return enviados, fallidos
+
+        restantes = list(lote)
+        exitosos = []
+        try:
+            with get_connection(fail_silently=False) as conexion:
+                while restantes:
+                    correo = restantes[0]
+                    try:
+                        _mensaje(correo, conexion).send()
+                    except Exception as e:
+                        _registrar_fallo(correo, e)
+                        fallidos += 1
+                    else:
+                        exitosos.append(correo.pk)
+                    restantes.pop(0)
+        except Exception as e:
+            # No se pudo abrir la conexión (o se cayó): los que faltaban se reintentan
+            for correo in restantes:
+                _registrar_fallo(correo, e)
+            fallidos += len(restantes)
+
+        CorreoPendiente.objects.filter(pk__in=exitosos).update(
+            estado=EstadoCorreo.ENVIADO, enviado=timezone.now(), error='', lote=''
+        )
+        enviados += len(exitosos)
+
+
+def enviar_correos(mensajes):
+    """Encola los mensajes y envía en ese momento lo que haya en la bandeja"""
+    encolar_correos(mensajes)
+    return enviar_pendientes()
+
+
+def limpiar_correos_enviados(dias=30):
+    """Elimina los correos enviados hace más de `dias` días y sus adjuntos"""
+    enviados = CorreoPendiente.objects.filter(
+        estado=EstadoCorreo.ENVIADO, enviado__lt=timezone.now() - timedelta(days=dias)
+    )
+    storage = get_reportes_storage()
+    for adjuntos in enviados.values_list('adjuntos', flat=True):
+        for adjunto in adjuntos:
+            try:
+                storage.delete(adjunto['archivo'])
+            except Exception:
+                logger.exception("No se pudo eliminar el adjunto %s", adjunto['archivo'])
+    enviados.delete()
@@ -0,0 +1,375 @@
+"""
+Datos sintéticos realistas para medir los reportes a escala.
+
+generar_datos crea, bajo un prefijo, empleados repartidos entre los cuatro
+sistemas de horario (fijo, personalizado por día, rotativo y 24x24) con sus
+checadas de cada día (incluida la secuencia de comida), retardos, faltas,
+permisos, vacaciones, tiempo extra, asignaciones de turno y visitantes. Todo se
+inserta con bulk_create, así que no se disparan señales: al final se reconstruyen
+los resúmenes diarios como lo haría el job nocturno. borrar_datos elimina lo
+creado con ese prefijo.
+
+Lo usan `manage.py generar_datos_sinteticos` y los comandos de benchmark.
+"""
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import (
+    Asistencia, AsignacionTurnoDiaria, AsignacionTurnoRotativo, Departamento, Empleado, EstadoSolicitud,
+    HorarioDiaSemana, PeriodoVacacional, RegistroVisita, SaldoVacaciones, SolicitudPermiso, SolicitudVacaciones,
+    TiempoExtra, TipoAusencia, TipoHorario, TipoMovimiento, TipoPermiso, TipoSistemaHorario, TurnoRotativo,
+    Visitante
+)
+from .resumen_diario import reconciliar_resumenes
+
+# Reparto de empleados entre sistemas de horario
+PROPORCION_HORARIOS = [
+    (TipoSistemaHorario.FIJO, 0.5),
+    (TipoSistemaHorario.PERSONALIZADO, 0.2),
+    (TipoSistemaHorario.ROTATIVO, 0.2),
+    (TipoSistemaHorario.TURNO_24H, 0.1),
+]
+PROBABILIDAD_FALTA = 0.03
+PROBABILIDAD_RETARDO = 0.1
+PROBABILIDAD_TIEMPO_EXTRA = 0.05
+# Fracción de empleados con un permiso por mes y con una semana de vacaciones en el rango
+FRACCION_PERMISOS = 0.05
+FRACCION_VACACIONES = 0.1
+# Visitantes por día hábil por cada 100 empleados
+VISITANTES_POR_CIEN = 2
+TAMANO_LOTE = 5000
+
+
+@contextmanager
+def _horas_explicitas(*campos):
+    """Permite fijar a mano campos auto_now_add (la entrada de la visita)"""
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+def _dias(fecha_inicio, fecha_fin):
+    fecha = fecha_inicio
+    while fecha <= fecha_fin:
+        yield fecha
+        fecha += timedelta(days=1)
+
+
+def _mas_minutos(hora, minutos):
+    return (datetime.combine(date.min, hora) + timedelta(minutes=minutos)).time()
+
+
+class _Lotes:
+    """Acumula instancias y las inserta con bulk_create cada TAMANO_LOTE"""
+
+    def __init__(self):
+        self.pendientes = {}
+        self.totales = {}
+
+    def agregar(self, objeto):
+        modelo = type(objeto)
+        lote = self.pendientes.setdefault(modelo, [])
+        lote.append(objeto)
+        if len(lote) >= TAMANO_LOTE:
+            self.guardar(modelo)
+
+    def guardar(self, modelo=None):
+        for clase in [modelo] if modelo else list(self.pendientes):
+            lote = self.pendientes.pop(clase, [])
+            clase.objects.bulk_create(lote, batch_size=TAMANO_LOTE)
+            self.totales[clase.__name__] = self.totales.get(clase.__name__, 0) + len(lote)
+
+
+def _crear_horarios(prefijo):
+    """Un TipoHorario por sistema, con sus horarios por día y turnos rotativos"""
+    fijo = TipoHorario.objects.create(
+        nombre=f'{prefijo} Fijo', tipo_sistema=TipoSistemaHorario.FIJO,
+        hora_entrada=time(9, 0), hora_salida=time(18, 0),
+        tiene_horario_comida=True, hora_inicio_comida=time(14, 0), hora_fin_comida=time(15, 0)
+    )
+    personalizado = TipoHorario.objects.create(
+        nombre=f'{prefijo} Personalizado', tipo_sistema=TipoSistemaHorario.PERSONALIZADO,
+        requiere_horario_por_dia=True, hora_entrada=time(8, 0), hora_salida=time(17, 0)
+    )
+    HorarioDiaSemana.objects.bulk_create([
+        HorarioDiaSemana(
+            tipo_horario=personalizado, dia_semana=dia, hora_entrada=time(8, 0), hora_salida=time(17, 0),
+            hora_inicio_comida=time(13, 0), hora_fin_comida=time(14, 0)
+        )
+        for dia in range(5)
+    ] + [
+        HorarioDiaSemana(
+            tipo_horario=personalizado, dia_semana=5, hora_entrada=time(9, 0), hora_salida=time(13, 0),
+            es_medio_dia=True
+        ),
+        HorarioDiaSemana(tipo_horario=personalizado, dia_semana=6, es_dia_laboral=False),
+    ])
+    rotativo = TipoHorario.objects.create(
+        nombre=f'{prefijo} Rotativo', tipo_sistema=TipoSistemaHorario.ROTATIVO,
+        hora_entrada=time(6, 0), hora_salida=time(14, 0)
+    )
+    TurnoRotativo.objects.bulk_create([
+        TurnoRotativo(tipo_horario=rotativo, nombre='Mañana', hora_entrada=time(6, 0), hora_salida=time(14, 0), orden_en_ciclo=1),
+        TurnoRotativo(tipo_horario=rotativo, nombre='Tarde', hora_entrada=time(14, 0), hora_salida=time(22, 0), orden_en_ciclo=2),
+        TurnoRotativo(tipo_horario=rotativo, nombre='Noche', hora_entrada=time(22, 0), hora_salida=time(6, 0), orden_en_ciclo=3),
+    ])
+    turno_24h = TipoHorario.objects.create(
+        nombre=f'{prefijo} 24x24', tipo_sistema=TipoSistemaHorario.TURNO_24H, es_turno_24h=True,
+        hora_entrada=time(8, 0), hora_salida=time(8, 0)
+    )
+    return {
+        TipoSistemaHorario.FIJO: fijo,
+        TipoSistemaHorario.PERSONALIZADO: personalizado,
+        TipoSistemaHorario.ROTATIVO: rotativo,
+        TipoSistemaHorario.TURNO_24H: turno_24h,
+    }
+
+
+def _crear_empleados(prefijo, num_empleados, num_departamentos, horarios, azar):
+    Departamento.objects.bulk_create([
+        Departamento(nombre=f'{prefijo} Departamento {d}', email=f'depto{d}@example.com')
+        for d in range(num_departamentos)
+    ])
+    departamentos = list(Departamento.objects.filter(nombre__startswith=f'{prefijo} Departamento '))
+    # Se vuelven a consultar tras cada bulk_create porque MySQL no devuelve los ids
+    User.objects.bulk_create([
+        User(username=f'{prefijo.lower()}_{i}', first_name='Empleado', last_name=f'Sintético {i}')
+        for i in range(num_empleados)
+    ], batch_size=TAMANO_LOTE)
+    usuarios = User.objects.filter(username__startswith=f'{prefijo.lower()}_').order_by('pk')
+    sistemas, pesos = zip(*PROPORCION_HORARIOS)
+    Empleado.objects.bulk_create([
+        # qr_code con nombre fijo para no generar imágenes en el storage
+        Empleado(
+            user=user, codigo_empleado=f'{prefijo}{i:05d}', qr_code='qr_codes/sintetico.png',
+            departamento=departamentos[i % len(departamentos)] if departamentos else None,
+            tipo_horario=horarios[azar.choices(sistemas, pesos)[0]]
+        )
+        for i, user in enumerate(usuarios)
+    ], batch_size=TAMANO_LOTE)
+    return list(Empleado.objects.filter(codigo_empleado__startswith=prefijo).select_related('tipo_horario'))
+
+
+def _ausencias(prefijo, empleados, fecha_inicio, fecha_fin, lotes, azar):
+    """Permisos de día completo y semanas de vacaciones; devuelve {empleado_id: fechas sin checadas}"""
+    tipo_permiso = TipoPermiso.objects.create(nombre=f'{prefijo} Personal')
+    periodo, _ = PeriodoVacacional.objects.get_or_create(anio=fecha_fin.year, defaults={
+        'fecha_inicio_periodo': date(fecha_fin.year, 1, 1), 'fecha_fin_periodo': date(fecha_fin.year, 12, 31)
+    })
+    sin_checadas = {}
+    dias_rango = (fecha_fin - fecha_inicio).days
+
+    meses = sorted({(dia.year, dia.month) for dia in _dias(fecha_inicio, fecha_fin)})
+    for empleado in azar.sample(empleados, int(len(empleados) * FRACCION_PERMISOS)):
+        for anio, mes in meses:
+            inicio = max(fecha_inicio, date(anio, mes, azar.randint(1, 26)))
+            fin = min(fecha_fin, inicio + timedelta(days=azar.randint(0, 1)))
+            if inicio > fin:
+                continue
+            lotes.agregar(SolicitudPermiso(
+                empleado=empleado, tipo_permiso=tipo_permiso, tipo_ausencia=TipoAusencia.DIAS_COMPLETOS,
+                fecha_inicio=inicio, fecha_fin=fin, total_dias=(fin - inicio).days + 1,
+                motivo='Trámite personal', estado=EstadoSolicitud.APROBADO_JEFE
+            ))
+            sin_checadas.setdefault(empleado.pk, set()).update(_dias(inicio, fin))
+
+    con_vacaciones = azar.sample(empleados, int(len(empleados) * FRACCION_VACACIONES))
+    SaldoVacaciones.objects.bulk_create([
+        SaldoVacaciones(
+            empleado=empleado, periodo_vacacional=periodo, dias_totales=12, dias_tomados=5,
+            fecha_antiguedad=date(fecha_fin.year - 3, 1, 15)
+        )
+        for empleado in con_vacaciones
+    ], batch_size=TAMANO_LOTE)
+    saldos = dict(SaldoVacaciones.objects.filter(
+        empleado__in=con_vacaciones, periodo_vacacional=periodo
+    ).values_list('empleado_id', 'pk'))
+    for empleado in con_vacaciones:
+        inicio = fecha_inicio + timedelta(days=azar.randint(0, max(dias_rango - 4, 0)))
+        fin = min(fecha_fin, inicio + timedelta(days=4))
+        lotes.agregar(SolicitudVacaciones(
+            empleado=empleado, saldo_vacaciones_id=saldos[empleado.pk], fecha_inicio=inicio, fecha_fin=fin,
+            dias_solicitados=(fin - inicio).days + 1, estado=EstadoSolicitud.APROBADO_GERENCIA
+        ))
+        sin_checadas.setdefault(empleado.pk, set()).update(_dias(inicio, fin))
+    return sin_checadas
+
+
+def _turnos_rotativos(empleados, horario, fecha_inicio, fecha_fin, lotes):
+    """Rotación semanal Mañana → Tarde → Noche, de lunes a viernes; devuelve {(empleado_id, fecha): turno}"""
+    turnos = list(horario.turnos_rotativos.order_by('orden_en_ciclo'))
+    turno_del_dia = {}
+    lunes = fecha_inicio - timedelta(days=fecha_inicio.weekday())
+    semana = 0
+    while lunes <= fecha_fin:
+        viernes = lunes + timedelta(days=4)
+        for i, empleado in enumerate(empleados):
+            turno = turnos[(semana + i) % len(turnos)]
+            lotes.agregar(AsignacionTurnoRotativo(
+                empleado=empleado, turno_rotativo=turno, fecha_inicio=lunes, fecha_fin=viernes
+            ))
+            for dia in _dias(max(lunes, fecha_inicio), min(viernes, fecha_fin)):
+                turno_del_dia[(empleado.pk, dia)] = turno
+                lotes.agregar(AsignacionTurnoDiaria(
+                    empleado=empleado, fecha=dia, turno_rotativo=turno,
+                    hora_entrada=turno.hora_entrada, hora_salida=turno.hora_salida,
+                    cruza_medianoche=turno.hora_salida < turno.hora_entrada
+                ))
+        lunes += timedelta(days=7)
+        semana += 1
+    return turno_del_dia
+
+
+def _jornada(empleado, dia, turno_rotativo, horarios_dia):
+    """
+    (entrada, salida, comida) esperadas del empleado en el día, o None si no le toca.
+    comida es (inicio, fin) o None; una salida menor a la entrada termina al día siguiente.
+    """
+    horario = empleado.tipo_horario
+    sistema = horario.tipo_sistema
+    if sistema == TipoSistemaHorario.TURNO_24H:
+        # Un día sí y uno no, alternando entre empleados
+        if (dia.toordinal() + empleado.pk) % 2:
+            return None
+        return horario.hora_entrada, horario.hora_salida, None
+    if sistema == TipoSistemaHorario.ROTATIVO:
+        if turno_rotativo is None:
+            return None
+        return turno_rotativo.hora_entrada, turno_rotativo.hora_salida, None
+    if sistema == TipoSistemaHorario.PERSONALIZADO:
+        horario_dia = horarios_dia.get(dia.weekday())
+        if horario_dia is None or not horario_dia.es_dia_laboral:
+            return None
+        comida = (horario_dia.hora_inicio_comida, horario_dia.hora_fin_comida) if horario_dia.hora_inicio_comida else None
+        return horario_dia.hora_entrada, horario_dia.hora_salida, comida
+    if dia.weekday() >= 5:
+        return None
+    return horario.hora_entrada, horario.hora_salida, (horario.hora_inicio_comida, horario.hora_fin_comida)
+
+
+def generar_datos(num_empleados, fecha_inicio, fecha_fin, prefijo='SINT', num_departamentos=8, semilla=None):
+    """
+    Crea un conjunto de datos sintético bajo `prefijo` entre fecha_inicio y fecha_fin (incluidas).
+
+    Args:
+        num_empleados: int
+        fecha_inicio, fecha_fin: datetime.date - Rango con checadas
+        prefijo: str - Prefijo de códigos, usuarios, departamentos y catálogos creados
+        num_departamentos: int
+        semilla: int opcional para repetir exactamente los mismos datos
+
+    Returns:
+        dict {nombre del modelo: filas creadas}
+    """
+    azar = random.Random(semilla)
+    lotes = _Lotes()
+    horarios = _crear_horarios(prefijo)
+    empleados = _crear_empleados(prefijo, num_empleados, num_departamentos, horarios, azar)
+    sin_checadas = _ausencias(prefijo, empleados, fecha_inicio, fecha_fin, lotes, azar)
+    rotativos = [e for e in empleados if e.tipo_horario.tipo_sistema == TipoSistemaHorario.ROTATIVO]
+    turno_del_dia = _turnos_rotativos(rotativos, horarios[TipoSistemaHorario.ROTATIVO], fecha_inicio, fecha_fin, lotes)
+    horarios_dia = {
+        h.dia_semana: h for h in horarios[TipoSistemaHorario.PERSONALIZADO].horarios_dia.all()
+    }
+
+    departamentos = list(Departamento.objects.filter(nombre__startswith=f'{prefijo} Departamento '))
+    num_visitantes = max(1, num_empleados * VISITANTES_POR_CIEN // 100)
+
+    with _horas_explicitas(RegistroVisita._meta.get_field('hora_entrada')):
+        for dia in _dias(fecha_inicio, fecha_fin):
+            for empleado in empleados:
+                if dia in sin_checadas.get(empleado.pk, ()) or azar.random() < PROBABILIDAD_FALTA:
+                    continue
+                jornada = _jornada(empleado, dia, turno_del_dia.get((empleado.pk, dia)), horarios_dia)
+                if jornada is None:
+                    continue
+                entrada, salida, comida = jornada
+                _checadas_del_dia(empleado, dia, entrada, salida, comida, lotes, azar)
+
+                if empleado.tipo_horario.tipo_sistema != TipoSistemaHorario.TURNO_24H and azar.random() < PROBABILIDAD_TIEMPO_EXTRA:
+                    lotes.agregar(TiempoExtra(
+                        empleado=empleado, fecha=dia, horas_extra=Decimal(azar.choice(['1.00', '1.50', '2.00', '3.00'])),
+                        descripcion='Cierre de operación', aprobado=azar.random() < 0.8
+                    ))
+
+            if dia.weekday() < 5 and departamentos:
+                _visitas_del_dia(prefijo, dia, num_visitantes, departamentos, lotes, azar)
+        lotes.guardar()
+
+    # Los reportes leen ResumenDiarioAsistencia, que en producción mantienen el check-in y el job nocturno
+    reconciliar_resumenes(fecha_inicio, fecha_fin, empleados=empleados)
+    return dict(lotes.totales, Empleado=len(empleados))
+
+
+def _checadas_del_dia(empleado, dia, entrada, salida, comida, lotes, azar):
+    horario = empleado.tipo_horario
+    retardo = azar.random() < PROBABILIDAD_RETARDO and horario.tipo_sistema != TipoSistemaHorario.TURNO_24H
+    if retardo:
+        minutos = azar.randint(horario.minutos_tolerancia + 1, 60)
+    else:
+        minutos = azar.randint(-10, horario.minutos_tolerancia)
+    # Hora real de la entrada con segundos, como la registra el check-in
+    hora_entrada = (datetime.combine(dia, entrada) + timedelta(minutes=minutos, seconds=azar.randint(0, 59))).time()
+    lotes.agregar(Asistencia(
+        empleado=empleado, fecha=dia, hora=hora_entrada, tipo_movimiento=TipoMovimiento.ENTRADA,
+        retardo=retardo, minutos_retardo=minutos if retardo else 0
+    ))
+    if comida:
+        lotes.agregar(Asistencia(
+            empleado=empleado, fecha=dia, hora=_mas_minutos(comida[0], azar.randint(0, 5)),
+            tipo_movimiento=TipoMovimiento.SALIDA_COMIDA
+        ))
+        lotes.agregar(Asistencia(
+            empleado=empleado, fecha=dia, hora=_mas_minutos(comida[1], azar.randint(-5, 5)),
+            tipo_movimiento=TipoMovimiento.ENTRADA_COMIDA
+        ))
+    # Turnos nocturnos y 24x24 checan la salida al día siguiente
+    fecha_salida = dia + timedelta(days=1) if salida <= entrada else dia
+    lotes.agregar(Asistencia(
+        empleado=empleado, fecha=fecha_salida, hora=_mas_minutos(salida, azar.randint(0, 20)),
+        tipo_movimiento=TipoMovimiento.SALIDA
+    ))
+
+
+def _visitas_del_dia(prefijo, dia, num_visitantes, departamentos, lotes, azar):
+    visitantes = [
+        Visitante(
+            nombre=f'{prefijo} Visitante {dia:%Y%m%d}-{v}', email=f'visitante{v}@example.com',
+            empresa='Proveedor', telefono='5555555555', departamento_visita=azar.choice(departamentos),
+            motivo='Junta', fecha_visita=dia, hora_visita=time(azar.randint(9, 16), 0),
+            qr_code='qr_visitantes/sintetico.png', qr_activo=False
+        )
+        for v in range(num_visitantes)
+    ]
+    Visitante.objects.bulk_create(visitantes)
+    lotes.totales['Visitante'] = lotes.totales.get('Visitante', 0) + len(visitantes)
+    for visitante in Visitante.objects.filter(nombre__startswith=f'{prefijo} Visitante {dia:%Y%m%d}-'):
+        hora_entrada = timezone.make_aware(datetime.combine(dia, visitante.hora_visita))
+        lotes.agregar(RegistroVisita(
+            visitante=visitante, hora_entrada=hora_entrada, hora_salida=hora_entrada + timedelta(hours=1)
+        ))
+
+
+def borrar_datos(prefijo='SINT'):
+    """
+    Elimina los datos creados por generar_datos con ese prefijo. Antes se vacía el
+    qr_code de los empleados para que el borrado no intente eliminar la imagen
+    compartida del storage.
+    """
+    Empleado.objects.filter(codigo_empleado__startswith=prefijo).update(qr_code='')
+    Visitante.objects.filter(nombre__startswith=f'{prefijo} Visitante ').update(qr_code='')
+    # SolicitudVacaciones protege a su saldo: se borran antes que los empleados
+    SolicitudVacaciones.objects.filter(empleado__codigo_empleado__startswith=prefijo).delete()
+    User.objects.filter(username__startswith=f'{prefijo.lower()}_').delete()
+    Departamento.objects.filter(nombre__startswith=f'{prefijo} Departamento ').delete()
+    TipoPermiso.objects.filter(nombre=f'{prefijo} Personal').delete()
+    TipoHorario.objects.filter(nombre__startswith=f'{prefijo} ').delete()
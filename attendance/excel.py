@@ -0,0 +1,111 @@
+"""
+Exportación de reportes a Excel en modo streaming.
+
+Los libros se crean con openpyxl en modo write-only: cada fila se serializa al
+archivo temporal de su hoja en cuanto se agrega, así que la memoria no crece con
+el número de filas. Los formatos se registran una sola vez como estilos con nombre
+y cada celda solo guarda una referencia a ellos.
+"""
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+# Filas que se traen de la base de datos por lote al recorrer un queryset con .iterator()
+TAMANO_LOTE = 2000
+
+ESTILO_TITULO = 'titulo'
+ESTILO_CELDA = 'celda'
+
+
+def _borde_delgado():
+    return Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+
+
+class LibroExcel:
+    """Workbook de solo escritura con los estilos compartidos de los reportes"""
+
+    def __init__(self):
+        self.wb = Workbook(write_only=True)
+        self.wb.add_named_style(NamedStyle(name=ESTILO_TITULO, font=Font(bold=True, size=14)))
+        self.wb.add_named_style(NamedStyle(name=ESTILO_CELDA, border=_borde_delgado()))
+
+    def estilo_encabezado(self, color, tamano=11):
+        """Registra (una sola vez) y devuelve el nombre del estilo de encabezado para ese color"""
+        nombre = f'encabezado_{color}_{tamano}'
+        if nombre not in self.wb.named_styles:
+            self.wb.add_named_style(NamedStyle(
+                name=nombre,
+                font=Font(bold=True, color="FFFFFF", size=tamano),
+                fill=PatternFill(start_color=color, end_color=color, fill_type="solid"),
+                alignment=Alignment(horizontal='center', vertical='center'),
+                border=_borde_delgado()
+            ))
+        return nombre
+
+    def hoja(self, titulo, anchos):
+        """
+        Crea una hoja nueva.
+
+        Args:
+            titulo: str - Nombre de la pestaña
+            anchos: list - Ancho de cada columna, empezando por la A. En modo
+                write-only deben definirse antes de escribir la primera fila.
+        """
+        ws = self.wb.create_sheet(titulo)
+        for indice, ancho in enumerate(anchos, start=1):
+            ws.column_dimensions[get_column_letter(indice)].width = ancho
+        return HojaExcel(ws)
+
+    def guardar(self, destino=None):
+        """
+        Escribe el libro en destino (un archivo binario abierto) o en un BytesIO nuevo.
+
+        Returns:
+            El objeto de archivo, posicionado al inicio
+        """
+        if destino is None:
+            destino = BytesIO()
+        self.wb.save(destino)
+        destino.seek(0)
+        return destino
+
+
+class HojaExcel:
+    """Hoja de solo escritura: las filas se agregan en orden y no se pueden modificar después"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.filas = 0
+
+    def _agregar(self, celdas):
+        self.ws.append(celdas)
+        self.filas += 1
+
+    def _celda(self, valor, estilo):
+        celda = WriteOnlyCell(self.ws, value=valor)
+        if estilo:
+            celda.style = estilo
+        return celda
+
+    def titulo(self, texto, columnas, estilo=ESTILO_TITULO):
+        """Agrega una fila con texto combinado a lo ancho de las primeras columnas"""
+        self._agregar([self._celda(texto, estilo)])
+        if columnas > 1:
+            self.ws.merged_cells.add(f'A{self.filas}:{get_column_letter(columnas)}{self.filas}')
+
+    def vacia(self):
+        self._agregar([])
+
+    def encabezados(self, nombres, estilo):
+        self._agregar([self._celda(nombre, estilo) for nombre in nombres])
+
+    def fila(self, valores, estilo=ESTILO_CELDA):
+        self._agregar([self._celda(valor, estilo) for valor in valores])
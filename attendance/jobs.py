@@ -1,14 +1,37 @@
+"""
+Jobs periódicos de attendance.
+
+Solo los importa el proceso dedicado (`manage.py run_scheduler`); los workers web
+no cargan APScheduler.
+"""
 import logging
+from functools import wraps
 
-from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from django.conf import settings
-from django_apscheduler.jobstores import DjangoJobStore
-from django_apscheduler.models import DjangoJobExecution
+from django.db import close_old_connections
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 
+def _conexiones_frescas(job):
+    """
+    Cierra las conexiones caducadas antes y después del job: los hilos del scheduler
+    viven días y MySQL cierra las conexiones inactivas (wait_timeout).
+    """
+    @wraps(job)
+    def envoltura(*args, **kwargs):
+        close_old_connections()
+        try:
+            return job(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return envoltura
+
+
+@_conexiones_frescas
 def job_reporte_diario():
     """Envia reporte diario de asistencia - L-V a las 12:05 PM"""
     from attendance.utils import generar_reporte_diario
@@ -16,6 +39,7 @@ def job_reporte_diario():
     generar_reporte_diario()
 
 
+@_conexiones_frescas
 def job_reporte_semanal():
     """Envia reporte semanal - Jueves a las 12:00 PM"""
     from attendance.utils import generar_reporte_semanal
@@ -23,50 +47,147 @@ def job_reporte_semanal():
     generar_reporte_semanal()
 
 
-def delete_old_job_executions(max_age=604_800):
-    """Limpia ejecuciones de jobs mayores a 7 dias"""
-    DjangoJobExecution.objects.delete_old_job_executions(max_age)
+@_conexiones_frescas
+def job_reconciliar_resumen_diario():
+    """
+    Recalcula desde Asistencia los resúmenes diarios de los últimos días y llena los
+    días históricos que aún no tienen resumen - Diario a la 1:00 AM y al iniciar el scheduler
+    """
+    from datetime import timedelta
+    from attendance.resumen_diario import completar_resumenes_historicos, reconciliar_resumenes
 
+    ayer = timezone.localdate() - timedelta(days=1)
+    desde = ayer - timedelta(days=settings.RESUMEN_DIARIO_DIAS_RECONCILIACION - 1)
+    logger.info("Reconciliando resúmenes diarios del %s al %s", desde, ayer)
+    reconciliar_resumenes(desde, ayer)
+    historicos = completar_resumenes_historicos()
+    if historicos:
+        logger.info("Resúmenes diarios históricos completados: %s", historicos)
 
-def start():
-    try:
-        scheduler = BackgroundScheduler(timezone=settings.TIME_ZONE)
-        scheduler.add_jobstore(DjangoJobStore(), "default")
 
-        scheduler.add_job(
-            job_reporte_diario,
-            trigger=CronTrigger(
-                day_of_week="mon-fri", hour=12, minute=5,
-                timezone=settings.TIME_ZONE,
-            ),
-            id="reporte_diario",
-            max_instances=1,
-            replace_existing=True,
-        )
+@_conexiones_frescas
+def job_resumen_mensual():
+    """Construye el resumen precalculado de los meses cerrados pendientes - Diario a las 2:00 AM"""
+    from attendance.resumen_mensual import construir_resumenes_pendientes
+    construidos = construir_resumenes_pendientes()
+    logger.info("Resúmenes mensuales construidos: %s", construidos)
 
-        scheduler.add_job(
-            job_reporte_semanal,
-            trigger=CronTrigger(
-                day_of_week="thu", hour=12, minute=0,
-                timezone=settings.TIME_ZONE,
-            ),
-            id="reporte_semanal",
-            max_instances=1,
-            replace_existing=True,
-        )
 
+@_conexiones_frescas
+def job_procesar_tareas_reporte():
+    """Genera los reportes encolados desde la web (solo si TAREAS_REPORTE_EN_SCHEDULER)"""
+    from attendance.tareas import procesar_tareas
+    procesar_tareas()
+
+
+@_conexiones_frescas
+def job_limpiar_tareas_antiguas(dias=7):
+    """Limpia tareas de reportes terminadas hace más de 7 dias - Lunes a las 00:00"""
+    from attendance.tareas import limpiar_tareas_antiguas
+    limpiar_tareas_antiguas(dias=dias)
+
+
+@_conexiones_frescas
+def job_enviar_correos():
+    """Envía la bandeja de salida de correos (visitantes y reportes)"""
+    from attendance.correos import enviar_pendientes
+    enviados, fallidos = enviar_pendientes()
+    if enviados or fallidos:
+        logger.info("Correos enviados: %s, fallidos: %s", enviados, fallidos)
+
+
+@_conexiones_frescas
+def job_limpiar_correos_enviados(dias=30):
+    """Limpia los correos enviados hace más de 30 dias - Lunes a las 00:10"""
+    from attendance.correos import limpiar_correos_enviados
+    limpiar_correos_enviados(dias=dias)
+
+
+def configurar_jobs(scheduler):
+    """Registra todos los jobs en el scheduler (sin iniciarlo)"""
+    scheduler.add_job(
+        job_reporte_diario,
+        trigger=CronTrigger(
+            day_of_week="mon-fri", hour=12, minute=5,
+            timezone=settings.TIME_ZONE,
+        ),
+        id="reporte_diario",
+        max_instances=1,
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        job_reporte_semanal,
+        trigger=CronTrigger(
+            day_of_week="thu", hour=12, minute=0,
+            timezone=settings.TIME_ZONE,
+        ),
+        id="reporte_semanal",
+        max_instances=1,
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        job_reconciliar_resumen_diario,
+        trigger=CronTrigger(
+            hour=1, minute=0,
+            timezone=settings.TIME_ZONE,
+        ),
+        id="reconciliar_resumen_diario",
+        max_instances=1,
+        replace_existing=True,
+        # También al iniciar: después de un despliegue los reportes no esperan a la noche
+        next_run_time=timezone.now(),
+    )
+
+    scheduler.add_job(
+        job_resumen_mensual,
+        trigger=CronTrigger(
+            hour=2, minute=0,
+            timezone=settings.TIME_ZONE,
+        ),
+        id="resumen_mensual",
+        max_instances=1,
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        job_limpiar_tareas_antiguas,
+        trigger=CronTrigger(
+            day_of_week="mon", hour=0, minute=0,
+            timezone=settings.TIME_ZONE,
+        ),
+        id="limpiar_tareas_antiguas",
+        max_instances=1,
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        job_enviar_correos,
+        trigger=IntervalTrigger(seconds=settings.CORREOS_INTERVALO),
+        id="enviar_correos",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        job_limpiar_correos_enviados,
+        trigger=CronTrigger(
+            day_of_week="mon", hour=0, minute=10,
+            timezone=settings.TIME_ZONE,
+        ),
+        id="limpiar_correos_enviados",
+        max_instances=1,
+        replace_existing=True,
+    )
+
+    if settings.TAREAS_REPORTE_EN_SCHEDULER:
         scheduler.add_job(
-            delete_old_job_executions,
-            trigger=CronTrigger(
-                day_of_week="mon", hour=0, minute=0,
-                timezone=settings.TIME_ZONE,
-            ),
-            id="delete_old_job_executions",
+            job_procesar_tareas_reporte,
+            trigger=IntervalTrigger(seconds=settings.TAREAS_REPORTE_INTERVALO),
+            id="procesar_tareas_reporte",
             max_instances=1,
+            coalesce=True,
             replace_existing=True,
         )
-
-        scheduler.start()
-        logger.info("Scheduler iniciado con jobs: reporte_diario, reporte_semanal, delete_old_job_executions")
-    except Exception:
-        logger.exception("No se pudo iniciar el scheduler. Verifica que las migraciones esten aplicadas.")
@@ -0,0 +1,101 @@
+import random
+import time as reloj
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from attendance.datos_sinteticos import borrar_datos, generar_datos
+from attendance.periodos import periodo_mes
+from attendance.utils import generar_excel_reporte_mensual
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas y tiempo de generar_excel_reporte_mensual sobre un mes sintético (los datos se descartan al terminar)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empleados',
+            type=int,
+            default=500,
+            help='Número de empleados sintéticos a generar. Por defecto: 500',
+        )
+        parser.add_argument(
+            '--mes',
+            type=int,
+            default=1,
+            help='Mes sintético a generar (1-12). Por defecto: 1',
+        )
+        parser.add_argument(
+            '--anio',
+            type=int,
+            default=2000,
+            help='Año sintético a generar. Por defecto: 2000',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=1,
+            help='Si es mayor a 1, compara el armado en serie contra un pool de ese número de procesos. Por defecto: 1',
+        )
+        parser.add_argument(
+            '--departamentos',
+            type=int,
+            default=8,
+            help='Departamentos sintéticos entre los que se reparten los empleados. Por defecto: 8',
+        )
+
+    def handle(self, *args, **options):
+        mes = options['mes']
+        anio = options['anio']
+
+        if options['procesos'] > 1:
+            self.comparar_procesos(options)
+            return
+
+        # Todo se hace dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            self.stdout.write(f"Generando {options['empleados']} empleados sintéticos para {mes:02d}/{anio}...")
+            total_asistencias = self.generar_mes_sintetico(options['empleados'], mes, anio, options['departamentos'])
+            self.stdout.write(f"✓ {total_asistencias} asistencias generadas")
+
+            self.medir(mes, anio, procesos=1)
+
+            transaction.set_rollback(True)
+
+    def comparar_procesos(self, options):
+        """
+        Los procesos hijos solo ven datos confirmados: aquí el mes sintético se guarda
+        fuera de una transacción y se borra al terminar.
+        """
+        mes, anio = options['mes'], options['anio']
+        self.stdout.write(f"Generando {options['empleados']} empleados sintéticos para {mes:02d}/{anio} (se borran al terminar)...")
+        total_asistencias = self.generar_mes_sintetico(options['empleados'], mes, anio, options['departamentos'])
+        self.stdout.write(f"✓ {total_asistencias} asistencias generadas")
+        try:
+            serie = self.medir(mes, anio, procesos=1)
+            paralelo = self.medir(mes, anio, procesos=options['procesos'])
+            self.stdout.write(self.style.SUCCESS(f"Aceleración con {options['procesos']} procesos: {serie / paralelo:.2f}x"))
+        finally:
+            borrar_datos(self.prefijo)
+
+    def medir(self, mes, anio, procesos):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = reloj.perf_counter()
+            excel_buffer = generar_excel_reporte_mensual(mes, anio, procesos=procesos)
+            duracion = reloj.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"generar_excel_reporte_mensual ({procesos} proceso{'s' if procesos > 1 else ''}): "
+            f"{len(consultas)} consultas, {duracion:.2f} s, {len(excel_buffer.getvalue()) / 1024:.0f} KB"
+        ))
+        return duracion
+
+    def generar_mes_sintetico(self, num_empleados, mes, anio, num_departamentos):
+        """Genera el mes con datos_sinteticos bajo un prefijo aleatorio; devuelve las asistencias creadas"""
+        self.prefijo = f'BENCH{random.randint(0, 10**6)}'
+        periodo = periodo_mes(anio, mes)
+        totales = generar_datos(
+            num_empleados, periodo.inicio, periodo.ultimo_dia, prefijo=self.prefijo, num_departamentos=num_departamentos
+        )
+        return totales['Asistencia']
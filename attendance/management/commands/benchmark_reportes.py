@@ -0,0 +1,190 @@
+import json
+import platform
+import tempfile
+import time as reloj
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.datos_sinteticos import generar_datos
+from attendance.models import ConfiguracionSistema, Empleado
+from attendance.periodos import periodo_mes, periodo_semana
+from attendance.resumen_mensual import calcular_resumen_mensual, construir_resumen_mensual, resumen_mensual_por_empleado
+from attendance.utils import (
+    generar_excel_reporte_mensual, generar_excel_reporte_semanal, generar_reporte_diario, generar_reporte_quincenal,
+    generar_reporte_semanal, generar_reporte_tiempo_extra_mensual
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide tiempo y consultas de los reportes, vistas de gerencia y check-in sobre datos '
+        'sintéticos de varios tamaños y guarda los resultados en JSON (los datos se descartan al terminar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empleados',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+            help='Tamaños a medir. Por defecto: 100 1000 10000',
+        )
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=2,
+            help='Meses completos de historia antes del mes en curso (más lo que va del mes hasta ayer). Por defecto: 2',
+        )
+        parser.add_argument(
+            '--checadas',
+            type=int,
+            default=20,
+            help='Checadas a medir por tamaño, una por una y en un lote (se reporta el promedio por checada). Por defecto: 20',
+        )
+        parser.add_argument(
+            '--salida',
+            default='benchmark_reportes.json',
+            help='Archivo JSON de resultados. Por defecto: benchmark_reportes.json',
+        )
+        parser.add_argument(
+            '--comparar',
+            help='JSON de una corrida anterior para mostrar la diferencia',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=2024,
+            help='Semilla de los datos sintéticos. Por defecto: 2024',
+        )
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as f:
+                anterior = json.load(f)['resultados']
+
+        resultados = {}
+        # Correos en memoria y el host del cliente de pruebas permitido; archivos en una carpeta temporal
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as carpeta, override_settings(USE_SPACES=False, MEDIA_ROOT=carpeta):
+                for num_empleados in options['empleados']:
+                    resultados[str(num_empleados)] = self.medir_tamano(num_empleados, carpeta, options)
+        finally:
+            teardown_test_environment()
+
+        with open(options['salida'], 'w', encoding='utf-8') as f:
+            json.dump({
+                'fecha': timezone.now().isoformat(),
+                'base_de_datos': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'meses': options['meses'],
+                'resultados': resultados,
+            }, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"✓ Resultados guardados en {options['salida']}"))
+
+        if anterior:
+            self.comparar(anterior, resultados)
+
+    def medir_tamano(self, num_empleados, carpeta, options):
+        hoy = timezone.localdate()
+        ayer = hoy - timedelta(days=1)
+        desde = periodo_mes(*self.meses_atras(hoy, options['meses'])).inicio
+        mes_cerrado = self.meses_atras(hoy, 1)
+        semana = periodo_semana(ayer)
+        medidas = {}
+
+        # Todo se hace dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            self.stdout.write(f"Generando {num_empleados} empleados sintéticos del {desde} al {ayer}...")
+            inicio = reloj.perf_counter()
+            totales = generar_datos(num_empleados, desde, ayer, prefijo='BENCH', semilla=options['semilla'])
+            self.stdout.write(
+                f"✓ {', '.join(f'{cantidad} {modelo}' for modelo, cantidad in sorted(totales.items()))} "
+                f"en {reloj.perf_counter() - inicio:.1f} s"
+            )
+            ConfiguracionSistema.objects.update_or_create(pk=1, defaults={
+                'email_gerente': 'gerente@example.com', 'ruta_red_reportes': carpeta
+            })
+
+            # Las checadas de hoy van primero: son las primeras del día para cada empleado
+            cliente = Client()
+            qrs = list(Empleado.objects.filter(codigo_empleado__startswith='BENCH').values_list(
+                'qr_uuid', flat=True
+            )[:options['checadas'] * 2])
+            medidas['checkin_tablet'] = self.medir(
+                lambda: [cliente.post(reverse('checkin_tablet'), {'qr_code': str(qr)}) for qr in qrs[::2]],
+                veces=len(qrs[::2])
+            )
+            # Ráfaga del cambio de turno en un solo lote, por escaneo
+            escaneos = [
+                {'qr_code': str(qr), 'timestamp': timezone.now().isoformat(), 'dispositivo': 'benchmark', 'nonce': str(qr)}
+                for qr in qrs[1::2]
+            ]
+            medidas['checkin_lote'] = self.medir(
+                lambda: cliente.post(reverse('checkin_lote_api'), {'escaneos': escaneos}, content_type='application/json'),
+                veces=len(escaneos)
+            )
+
+            pruebas = {
+                'generar_reporte_diario': generar_reporte_diario,
+                'generar_reporte_semanal': generar_reporte_semanal,
+                'generar_reporte_quincenal': lambda: generar_reporte_quincenal(13),
+                'generar_reporte_tiempo_extra_mensual': generar_reporte_tiempo_extra_mensual,
+                'generar_excel_reporte_semanal': lambda: generar_excel_reporte_semanal(semana.inicio, ayer),
+                'generar_excel_reporte_mensual': lambda: generar_excel_reporte_mensual(mes_cerrado[1], mes_cerrado[0]),
+                'calcular_resumen_mensual': lambda: calcular_resumen_mensual(*mes_cerrado),
+                'construir_resumen_mensual': lambda: construir_resumen_mensual(*mes_cerrado),
+                'resumen_mensual_por_empleado': lambda: resumen_mensual_por_empleado(*mes_cerrado),
+                'vista_dashboard': lambda: cliente.get(reverse('dashboard')),
+                'vista_reporte_mensual': lambda: cliente.get(
+                    reverse('reporte_mensual_detalle', args=[mes_cerrado[1], mes_cerrado[0]])
+                ),
+                'vista_asignacion_turnos': lambda: cliente.get(
+                    reverse('asignacion_turnos', args=[mes_cerrado[1], mes_cerrado[0]])
+                ),
+            }
+            for nombre, funcion in pruebas.items():
+                medidas[nombre] = self.medir(funcion)
+
+            transaction.set_rollback(True)
+
+        for nombre, medida in medidas.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{nombre} ({num_empleados} empleados): {medida['segundos']:.3f} s, {medida['consultas']} consultas"
+            ))
+        return {'totales': totales, 'medidas': medidas}
+
+    def medir(self, funcion, veces=1):
+        """Segundos y consultas de una llamada; con veces > 1 se dividen entre el número de repeticiones"""
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = reloj.perf_counter()
+            funcion()
+            duracion = reloj.perf_counter() - inicio
+        veces = max(veces, 1)
+        return {'segundos': round(duracion / veces, 4), 'consultas': round(len(consultas) / veces, 1)}
+
+    def meses_atras(self, hoy, meses):
+        """(anio, mes) de `meses` meses antes del mes de hoy"""
+        indice = hoy.year * 12 + hoy.month - 1 - meses
+        return indice // 12, indice % 12 + 1
+
+    def comparar(self, anterior, resultados):
+        for tamano, resultado in resultados.items():
+            previo = anterior.get(tamano, {}).get('medidas', {})
+            for nombre, medida in resultado['medidas'].items():
+                if nombre not in previo or not previo[nombre]['segundos']:
+                    continue
+                cambio = medida['segundos'] / previo[nombre]['segundos']
+                self.stdout.write(
+                    f"{nombre} ({tamano}): {previo[nombre]['segundos']:.3f} s → {medida['segundos']:.3f} s "
+                    f"({cambio:.2f}x), {previo[nombre]['consultas']} → {medida['consultas']} consultas"
+                )
@@ -0,0 +1,86 @@
+import random
+import time as reloj
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from attendance.models import Empleado, Departamento, ResumenDiarioAsistencia, TiempoExtra, TipoHorario
+from attendance.utils import (
+    _html_reporte_diario, _html_reporte_semanal, _html_reporte_tiempo_extra
+)
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de renderizar los reportes HTML por correo con filas sintéticas en memoria (sin base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empleados',
+            type=int,
+            nargs='+',
+            default=[1000, 5000],
+            help='Tamaños a medir. Por defecto: 1000 5000',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=3,
+            help='Renderizados por tamaño; se reporta el mejor. Por defecto: 3',
+        )
+
+    def handle(self, *args, **options):
+        for num_empleados in options['empleados']:
+            empleados = self.empleados_sinteticos(num_empleados)
+            hoy = date(2000, 1, 6)
+            resumen = [
+                {
+                    'empleado': empleado,
+                    'dias_asistidos': random.randint(0, 4),
+                    'retardos': random.randint(0, 4),
+                    'minutos_retardo': random.randint(0, 60),
+                    'faltas': random.randint(0, 2),
+                }
+                for empleado in empleados
+            ]
+            retardos = [
+                ResumenDiarioAsistencia(empleado=empleado, fecha=hoy, primera_entrada=time(9, 20), retardo=True, minutos_retardo=20)
+                for empleado in empleados[::5]
+            ]
+            for empleado in empleados[::10]:
+                empleado.retardos = 3
+            tiempos_extra = [
+                TiempoExtra(empleado=empleado, fecha=hoy, horas_extra=Decimal('1.50'), descripcion='Cierre')
+                for empleado in empleados
+            ]
+
+            reportes = {
+                'semanal': lambda: _html_reporte_semanal(hoy - timedelta(days=3), hoy, resumen),
+                'diario': lambda: _html_reporte_diario(hoy, num_empleados, num_empleados, retardos, empleados[::10]),
+                'tiempo_extra': lambda: _html_reporte_tiempo_extra(hoy, tiempos_extra),
+            }
+            for nombre, renderizar in reportes.items():
+                duraciones = []
+                for _ in range(options['repeticiones']):
+                    inicio = reloj.perf_counter()
+                    html = renderizar()
+                    duraciones.append(reloj.perf_counter() - inicio)
+                self.stdout.write(self.style.SUCCESS(
+                    f"{nombre} ({num_empleados} empleados): {min(duraciones) * 1000:.0f} ms, {len(html) / 1024:.0f} KB"
+                ))
+
+    def empleados_sinteticos(self, num_empleados):
+        """Empleados sin guardar, con usuario, departamento y horario en memoria"""
+        departamentos = [Departamento(pk=d, nombre=f'Departamento {d}', email=f'depto{d}@example.com') for d in range(8)]
+        horario = TipoHorario(nombre='Fijo', hora_entrada=time(9, 0))
+        return [
+            Empleado(
+                pk=i,
+                user=User(first_name='Empleado', last_name=f'Sintético {i}'),
+                codigo_empleado=f'BENCH{i:05d}',
+                departamento=departamentos[i % len(departamentos)],
+                tipo_horario=horario
+            )
+            for i in range(num_empleados)
+        ]
@@ -0,0 +1,40 @@
+import time as reloj
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.correos import enviar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Envía la bandeja de salida de correos (CorreoPendiente) por lotes sobre una conexión SMTP'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Vacía la bandeja una vez y termina en lugar de seguir esperando correos',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=settings.CORREOS_INTERVALO,
+            help=f'Segundos de espera cuando la bandeja está vacía. Por defecto: {settings.CORREOS_INTERVALO}',
+        )
+
+    def handle(self, *args, **options):
+        if options['una_vez']:
+            enviados, fallidos = enviar_pendientes()
+            self.stdout.write(self.style.SUCCESS(f'✅ {enviados} correos enviados, {fallidos} fallidos'))
+            return
+
+        self.stdout.write(f"Esperando correos (cada {options['intervalo']} s)...")
+        while True:
+            # Reabre la conexión si la base de datos la cerró durante la espera
+            close_old_connections()
+            enviados, fallidos = enviar_pendientes()
+            if enviados or fallidos:
+                self.stdout.write(f'✓ {enviados} correos enviados, {fallidos} fallidos')
+            else:
+                reloj.sleep(options['intervalo'])
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from attendance.datos_sinteticos import borrar_datos, generar_datos
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera empleados sintéticos con los cuatro sistemas de horario y meses de checadas, permisos, '
+        'vacaciones, tiempo extra, turnos y visitantes (para pruebas de carga; no usar en producción)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empleados',
+            type=int,
+            default=1000,
+            help='Número de empleados a generar. Por defecto: 1000',
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=60,
+            help='Días de historia, terminando ayer. Por defecto: 60',
+        )
+        parser.add_argument(
+            '--departamentos',
+            type=int,
+            default=8,
+            help='Departamentos entre los que se reparten los empleados. Por defecto: 8',
+        )
+        parser.add_argument(
+            '--prefijo',
+            default='SINT',
+            help='Prefijo de los códigos de empleado y catálogos creados. Por defecto: SINT',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            help='Semilla para repetir exactamente los mismos datos',
+        )
+        parser.add_argument(
+            '--borrar',
+            action='store_true',
+            help='Elimina los datos generados antes con el prefijo en lugar de crear nuevos',
+        )
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        if options['borrar']:
+            borrar_datos(prefijo)
+            self.stdout.write(self.style.SUCCESS(f"✓ Datos sintéticos {prefijo} eliminados"))
+            return
+
+        fecha_fin = timezone.localdate() - timedelta(days=1)
+        fecha_inicio = fecha_fin - timedelta(days=options['dias'] - 1)
+        self.stdout.write(f"Generando {options['empleados']} empleados del {fecha_inicio} al {fecha_fin}...")
+        with transaction.atomic():
+            totales = generar_datos(
+                options['empleados'], fecha_inicio, fecha_fin, prefijo=prefijo,
+                num_departamentos=options['departamentos'], semilla=options['semilla']
+            )
+        for modelo, cantidad in sorted(totales.items()):
+            self.stdout.write(f"  {modelo}: {cantidad}")
+        self.stdout.write(self.style.SUCCESS(f"✓ Datos sintéticos {prefijo} generados"))
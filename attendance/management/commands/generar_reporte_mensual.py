@@ -4,9 +4,13 @@ from django.core.mail import EmailMessage
 from django.conf import settings
 from datetime import timedelta
 from calendar import monthrange
+from io import BytesIO
 import os
 
+from attendance.artefactos import obtener_artefacto
+from attendance.correos import enviar_correos
 from attendance.models import ConfiguracionSistema
+from attendance.periodos import periodo_mes
 from attendance.utils import generar_excel_reporte_mensual
 
 
@@ -29,6 +33,11 @@ class Command(BaseCommand):
             type=str,
             help='Email alternativo para enviar el reporte',
         )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            help='Procesos para armar el detalle por departamento. Por defecto: REPORTES_PROCESOS',
+        )
 
     def handle(self, *args, **options):
         # Determinar mes y año
@@ -53,8 +62,19 @@ class Command(BaseCommand):
             return
         
         # Generar Excel
+        procesos = options['procesos']
         try:
-            excel_buffer = generar_excel_reporte_mensual(mes, anio)
+            # Meses cerrados: reutilizar el archivo guardado si sus datos no cambiaron
+            artefacto = obtener_artefacto(
+                'mensual', periodo_mes(anio, mes), 'xlsx',
+                lambda destino: generar_excel_reporte_mensual(mes, anio, destino=destino, procesos=procesos)
+            )
+            if artefacto:
+                storage, nombre = artefacto
+                with storage.open(nombre, 'rb') as archivo:
+                    excel_buffer = BytesIO(archivo.read())
+            else:
+                excel_buffer = generar_excel_reporte_mensual(mes, anio, procesos=procesos)
             nombre_excel = f"reporte_mensual_{anio}_{mes:02d}.xlsx"
             
             self.stdout.write(self.style.SUCCESS(f'✓ Archivo Excel generado: {nombre_excel}'))
@@ -92,7 +112,7 @@ Este reporte se genera automáticamente el día 1 de cada mes.
             )
             
             email.attach(nombre_excel, excel_buffer.read(), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            email.send(fail_silently=False)
+            enviar_correos([email])
             
             self.stdout.write(self.style.SUCCESS(f'✓ Email enviado a: {email_destino}'))
             self.stdout.write(self.style.SUCCESS('✅ Reporte mensual generado exitosamente'))
@@ -0,0 +1,43 @@
+import time as reloj
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.tareas import procesar_tareas
+from checador.storage_backends import get_reportes_storage
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de reportes (TareaReporte) en un proceso aparte de los workers web'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Vacía la cola una vez y termina en lugar de seguir esperando tareas',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=settings.TAREAS_REPORTE_INTERVALO,
+            help=f'Segundos de espera cuando la cola está vacía. Por defecto: {settings.TAREAS_REPORTE_INTERVALO}',
+        )
+
+    def handle(self, *args, **options):
+        # Sin storage compartido falla al arrancar, no con cada tarea ni en la descarga
+        get_reportes_storage()
+        if options['una_vez']:
+            procesadas = procesar_tareas()
+            self.stdout.write(self.style.SUCCESS(f'✅ {procesadas} tareas procesadas'))
+            return
+
+        self.stdout.write(f"Esperando tareas de reporte (cada {options['intervalo']} s)...")
+        while True:
+            # Reabre la conexión si la base de datos la cerró durante la espera
+            close_old_connections()
+            procesadas = procesar_tareas()
+            if procesadas:
+                self.stdout.write(f'✓ {procesadas} tareas procesadas')
+            else:
+                reloj.sleep(options['intervalo'])
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from attendance.models import Asistencia
+from attendance.periodos import periodo_mes
+from attendance.resumen_diario import reconciliar_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye ResumenDiarioAsistencia desde Asistencia para un rango de fechas (por meses)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            type=date.fromisoformat,
+            help='Primer día (AAAA-MM-DD). Por defecto: fecha de la checada más antigua',
+        )
+        parser.add_argument(
+            '--hasta',
+            type=date.fromisoformat,
+            help='Último día (AAAA-MM-DD). Por defecto: hoy',
+        )
+
+    def handle(self, *args, **options):
+        hasta = options['hasta'] or timezone.localdate()
+        desde = options['desde'] or Asistencia.objects.order_by('fecha').values_list('fecha', flat=True).first()
+        if desde is None:
+            self.stdout.write(self.style.WARNING('No hay checadas registradas'))
+            return
+        if desde > hasta:
+            raise CommandError('--desde debe ser anterior o igual a --hasta')
+
+        total = 0
+        inicio = desde
+        # Un mes por transacción para acotar memoria y el tiempo de cada bloqueo
+        while inicio <= hasta:
+            fin = min(periodo_mes(inicio.year, inicio.month).ultimo_dia, hasta)
+            with transaction.atomic():
+                escritos = reconciliar_resumenes(inicio, fin)
+            total += escritos
+            self.stdout.write(f"✓ {inicio} a {fin}: {escritos} resúmenes")
+            inicio = fin + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} resúmenes diarios reconstruidos'))
@@ -0,0 +1,91 @@
+import logging
+import os
+import signal
+import socket
+import time as reloj
+from functools import wraps
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.candados import adquirir_candado, liberar_candado, propietario_candado
+from attendance.jobs import configurar_jobs
+
+logger = logging.getLogger(__name__)
+
+CANDADO = 'scheduler'
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los jobs periódicos en este proceso; solo un scheduler queda activo gracias a un candado en BD'
+
+    def handle(self, *args, **options):
+        self.propietario = f'{socket.gethostname()}:{os.getpid()}'
+        self.segundos = settings.SCHEDULER_CANDADO_SEGUNDOS
+        self.detenido = False
+        signal.signal(signal.SIGTERM, self.detener)
+        signal.signal(signal.SIGINT, self.detener)
+
+        try:
+            while not self.detenido:
+                close_old_connections()
+                if adquirir_candado(CANDADO, self.propietario, self.segundos):
+                    self.ejecutar_scheduler()
+                else:
+                    activo = propietario_candado(CANDADO)
+                    logger.info("Otro scheduler está activo (%s); en espera", activo[0] if activo else '?')
+                    reloj.sleep(self.segundos / 3)
+        finally:
+            liberar_candado(CANDADO, self.propietario)
+            self.stdout.write('Scheduler detenido')
+
+    def ejecutar_scheduler(self):
+        """Corre los jobs mientras se conserve el candado; regresa al perderlo o al detenerse"""
+        self.scheduler = BlockingScheduler(timezone=settings.TIME_ZONE)
+        configurar_jobs(self.scheduler)
+        for job in self.scheduler.get_jobs():
+            job.modify(func=self.con_candado(job.func))
+        self.scheduler.add_job(
+            self.renovar_candado,
+            trigger=IntervalTrigger(seconds=self.segundos / 3),
+            id="renovar_candado_scheduler",
+            max_instances=1,
+            coalesce=True,
+        )
+        logger.info(
+            "Scheduler %s activo con jobs: %s",
+            self.propietario, ', '.join(job.id for job in self.scheduler.get_jobs())
+        )
+        self.scheduler.start()
+
+    def con_candado(self, job):
+        """
+        Corre el job solo si este proceso conserva el candado. Al perderlo, shutdown(wait=False)
+        no detiene los jobs en curso, pero ninguno nuevo arranca mientras otro scheduler
+        puede estar corriendo los mismos (reconciliación, envío de correos).
+        """
+        @wraps(job)
+        def envoltura(*args, **kwargs):
+            close_old_connections()
+            activo = propietario_candado(CANDADO)
+            if not activo or activo[0] != self.propietario:
+                logger.warning("Job %s omitido: este scheduler ya no tiene el candado", job.__name__)
+                return None
+            return job(*args, **kwargs)
+        return envoltura
+
+    def renovar_candado(self):
+        close_old_connections()
+        if not adquirir_candado(CANDADO, self.propietario, self.segundos):
+            # Otro proceso tomó el candado (p. ej. este se quedó sin BD más tiempo del vencimiento)
+            logger.warning("Se perdió el candado del scheduler; deteniendo jobs")
+            self.scheduler.shutdown(wait=False)
+
+    def detener(self, signum, frame):
+        self.detenido = True
+        scheduler = getattr(self, 'scheduler', None)
+        if scheduler and scheduler.running:
+            scheduler.shutdown(wait=False)
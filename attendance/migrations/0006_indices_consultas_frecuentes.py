@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_visitante_qr_activo_asignacionturnodiaria'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['empleado', 'fecha', 'hora'], name='asistencia_emp_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['fecha', 'tipo_movimiento'], name='asistencia_fecha_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['empleado', 'tipo_movimiento', 'fecha'], name='asistencia_emp_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrovisita',
+            index=models.Index(fields=['visitante', 'hora_salida'], name='visita_visitante_salida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudpermiso',
+            index=models.Index(fields=['empleado', 'estado', 'fecha_inicio'], name='permiso_emp_estado_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudvacaciones',
+            index=models.Index(fields=['empleado', 'estado', 'fecha_inicio'], name='vacaciones_emp_estado_ini_idx'),
+        ),
+    ]
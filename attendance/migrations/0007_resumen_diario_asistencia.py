@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('checadas', models.PositiveSmallIntegerField(default=0)),
+                ('primera_entrada', models.TimeField(blank=True, null=True)),
+                ('salida_comida', models.TimeField(blank=True, null=True)),
+                ('entrada_comida', models.TimeField(blank=True, null=True)),
+                ('ultima_salida', models.TimeField(blank=True, null=True)),
+                ('retardo', models.BooleanField(default=False)),
+                ('minutos_retardo', models.IntegerField(default=0)),
+                ('minutos_trabajados', models.IntegerField(default=0)),
+                ('es_dia_laboral', models.BooleanField(default=False, verbose_name='Día laboral según su horario')),
+                ('hora_entrada_esperada', models.TimeField(blank=True, null=True)),
+                ('ausencia', models.CharField(choices=[('NINGUNA', 'Sin ausencia'), ('VACACIONES', 'Vacaciones'), ('PERMISO', 'Permiso'), ('JUSTIFICANTE', 'Justificante')], default='NINGUNA', max_length=20)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='attendance.empleado')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Asistencia',
+                'verbose_name_plural': 'Resúmenes Diarios de Asistencia',
+                'ordering': ['fecha', 'empleado'],
+                'indexes': [models.Index(fields=['fecha'], name='resumen_diario_fecha_idx')],
+                'unique_together': {('empleado', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_resumen_diario_asistencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('mes', models.PositiveSmallIntegerField()),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('version_calculada', models.PositiveIntegerField(default=0)),
+                ('generado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Cierre Mensual',
+                'verbose_name_plural': 'Cierres Mensuales',
+                'ordering': ['-anio', '-mes'],
+                'unique_together': {('anio', 'mes')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenMensualAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dias_asistidos', models.PositiveSmallIntegerField(default=0)),
+                ('retardos', models.PositiveSmallIntegerField(default=0)),
+                ('minutos_retardo', models.IntegerField(default=0)),
+                ('faltas', models.PositiveSmallIntegerField(default=0)),
+                ('permisos', models.PositiveSmallIntegerField(default=0)),
+                ('dias_esperados', models.PositiveSmallIntegerField(default=0)),
+                ('horas_extra', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('cierre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes', to='attendance.cierremensual')),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_mensuales', to='attendance.empleado')),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual de Asistencia',
+                'verbose_name_plural': 'Resúmenes Mensuales de Asistencia',
+                'ordering': ['cierre', 'empleado'],
+                'unique_together': {('cierre', 'empleado')},
+            },
+        ),
+    ]
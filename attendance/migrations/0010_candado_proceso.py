@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_tarea_reporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandadoProceso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('propietario', models.CharField(blank=True, max_length=100)),
+                ('vence', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Candado de Proceso',
+                'verbose_name_plural': 'Candados de Procesos',
+            },
+        ),
+    ]
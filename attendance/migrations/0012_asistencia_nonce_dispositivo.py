@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:29
+
+import attendance.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_correo_pendiente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asistencia',
+            name='dispositivo',
+            field=models.CharField(blank=True, help_text='Tablet que registró la checada', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='asistencia',
+            name='nonce',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='asistencia',
+            name='hora',
+            field=models.TimeField(default=attendance.models.hora_local),
+        ),
+    ]
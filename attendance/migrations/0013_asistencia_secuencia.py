@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:33
+
+from django.db import migrations, models
+
+
+def numerar_checadas(apps, schema_editor):
+    """Numera en orden de hora las checadas existentes de cada empleado y día"""
+    Asistencia = apps.get_model('attendance', 'Asistencia')
+    pendientes = []
+    clave_actual = None
+    secuencia = 0
+    checadas = Asistencia.objects.order_by('empleado_id', 'fecha', 'hora', 'pk').values_list(
+        'pk', 'empleado_id', 'fecha'
+    )
+    for pk, empleado_id, fecha in checadas.iterator(chunk_size=2000):
+        if (empleado_id, fecha) != clave_actual:
+            clave_actual = (empleado_id, fecha)
+            secuencia = 0
+        secuencia += 1
+        pendientes.append(Asistencia(pk=pk, secuencia=secuencia))
+        if len(pendientes) >= 2000:
+            Asistencia.objects.bulk_update(pendientes, ['secuencia'])
+            pendientes = []
+    if pendientes:
+        Asistencia.objects.bulk_update(pendientes, ['secuencia'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0012_asistencia_nonce_dispositivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asistencia',
+            name='secuencia',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(numerar_checadas, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='asistencia',
+            unique_together={('empleado', 'fecha', 'secuencia')},
+        ),
+    ]
@@ -166,14 +166,26 @@ class TipoMovimiento(models.TextChoices):
     ENTRADA_COMIDA = 'ENTRADA_COMIDA', 'Entrada de Comida'
     SALIDA = 'SALIDA', 'Salida'
 
+def hora_local():
+    """Hora local actual; default de Asistencia.hora cuando la checada no trae la suya"""
+    return timezone.localtime().time()
+
 class Asistencia(models.Model):
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     fecha = models.DateField(default=timezone.now)
-    hora = models.TimeField(auto_now_add=True)
+    # Default en lugar de auto_now_add: las checadas sincronizadas desde la tablet conservan la hora del escaneo
+    hora = models.TimeField(default=hora_local)
     tipo_movimiento = models.CharField(max_length=20, choices=TipoMovimiento.choices)
     retardo = models.BooleanField(default=False)
     minutos_retardo = models.IntegerField(default=0)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Identificador que genera la tablet por escaneo: reenviar un lote no duplica checadas
+    nonce = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    dispositivo = models.CharField(max_length=64, blank=True, help_text="Tablet que registró la checada")
+    # Número de la checada en el día del empleado que asigna el check-in; el unique_together hace
+    # que dos tablets que leyeron el mismo estado no puedan insertar las dos (la segunda reintenta).
+    # None en checadas cargadas por otros medios (admin, bulk_create)
+    secuencia = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.empleado.user.get_full_name()} - {self.tipo_movimiento} - {self.fecha}"
@@ -252,6 +264,15 @@ class Asistencia(models.Model):
     class Meta:
         verbose_name_plural = "Asistencias"
         ordering = ['-fecha', '-hora']
+        unique_together = ['empleado', 'fecha', 'secuencia']
+        indexes = [
+            # Checadas de un empleado en un día o rango, ordenadas por hora (check-in, reportes)
+            models.Index(fields=['empleado', 'fecha', 'hora'], name='asistencia_emp_fecha_hora_idx'),
+            # Todas las checadas de un día o mes por tipo (dashboard, reporte mensual)
+            models.Index(fields=['fecha', 'tipo_movimiento'], name='asistencia_fecha_tipo_idx'),
+            # ENTRADAS de un empleado en un rango (retardos, anclas de turnos 24x24)
+            models.Index(fields=['empleado', 'tipo_movimiento', 'fecha'], name='asistencia_emp_tipo_fecha_idx'),
+        ]
 
 class TiempoExtra(models.Model):
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
@@ -320,6 +341,10 @@ class RegistroVisita(models.Model):
     class Meta:
         verbose_name_plural = "Registros de Visitas"
         ordering = ['-hora_entrada']
+        indexes = [
+            # Registro abierto (sin hora de salida) de un visitante
+            models.Index(fields=['visitante', 'hora_salida'], name='visita_visitante_salida_idx'),
+        ]
 
 class ConfiguracionSistema(models.Model):
     hora_entrada = models.TimeField(default="09:00:00")
@@ -420,6 +445,10 @@ class SolicitudPermiso(models.Model):
         verbose_name = "Solicitud de Permiso"
         verbose_name_plural = "Solicitudes de Permisos"
         ordering = ['-fecha_solicitud']
+        indexes = [
+            # Permisos aprobados de un empleado que cubren una fecha (check-in, reportes)
+            models.Index(fields=['empleado', 'estado', 'fecha_inicio'], name='permiso_emp_estado_inicio_idx'),
+        ]
 
 # ========== SISTEMA DE VACACIONES ==========
 
@@ -507,6 +536,10 @@ class SolicitudVacaciones(models.Model):
         verbose_name = "Solicitud de Vacaciones"
         verbose_name_plural = "Solicitudes de Vacaciones"
         ordering = ['-fecha_solicitud']
+        indexes = [
+            # Vacaciones aprobadas de un empleado que cubren una fecha (check-in)
+            models.Index(fields=['empleado', 'estado', 'fecha_inicio'], name='vacaciones_emp_estado_ini_idx'),
+        ]
 
 # ========== SISTEMA DE JUSTIFICANTES ==========
 
@@ -644,3 +677,202 @@ class AsignacionTurnoDiaria(models.Model):
         verbose_name_plural = "Asignaciones de Turnos Diarias"
         unique_together = ['empleado', 'fecha']
         ordering = ['fecha', 'empleado']
+
+# ========== RESUMEN DIARIO DE ASISTENCIA ==========
+
+class AusenciaDia(models.TextChoices):
+    NINGUNA = 'NINGUNA', 'Sin ausencia'
+    VACACIONES = 'VACACIONES', 'Vacaciones'
+    PERMISO = 'PERMISO', 'Permiso'
+    JUSTIFICANTE = 'JUSTIFICANTE', 'Justificante'
+
+class ResumenDiarioAsistencia(models.Model):
+    """
+    Hechos de un empleado en un día, derivados de sus checadas.
+
+    Se actualiza con cada checada (attendance.resumen_diario) y se reconcilia cada
+    noche contra Asistencia; los reportes lo leen en lugar de recorrer las checadas.
+    """
+    empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE, related_name='resumenes_diarios')
+    fecha = models.DateField()
+    checadas = models.PositiveSmallIntegerField(default=0)
+    primera_entrada = models.TimeField(null=True, blank=True)
+    salida_comida = models.TimeField(null=True, blank=True)
+    entrada_comida = models.TimeField(null=True, blank=True)
+    ultima_salida = models.TimeField(null=True, blank=True)
+    retardo = models.BooleanField(default=False)
+    minutos_retardo = models.IntegerField(default=0)
+    minutos_trabajados = models.IntegerField(default=0)
+    es_dia_laboral = models.BooleanField(default=False, verbose_name="Día laboral según su horario")
+    hora_entrada_esperada = models.TimeField(null=True, blank=True)
+    ausencia = models.CharField(max_length=20, choices=AusenciaDia.choices, default=AusenciaDia.NINGUNA)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.empleado} - {self.fecha}"
+
+    @property
+    def es_falta(self):
+        return self.es_dia_laboral and self.primera_entrada is None and self.ausencia == AusenciaDia.NINGUNA
+
+    class Meta:
+        verbose_name = "Resumen Diario de Asistencia"
+        verbose_name_plural = "Resúmenes Diarios de Asistencia"
+        unique_together = ['empleado', 'fecha']
+        ordering = ['fecha', 'empleado']
+        indexes = [
+            # Todos los empleados de un día o rango (reportes)
+            models.Index(fields=['fecha'], name='resumen_diario_fecha_idx'),
+        ]
+
+# ========== RESUMEN MENSUAL DE ASISTENCIA ==========
+
+class CierreMensual(models.Model):
+    """
+    Control del resumen precalculado de un mes cerrado.
+
+    Cada cambio en checadas, justificantes, permisos, vacaciones o tiempo extra del
+    mes incrementa version; el resumen solo es vigente mientras version_calculada
+    coincida con version (attendance.resumen_mensual).
+    """
+    anio = models.PositiveSmallIntegerField()
+    mes = models.PositiveSmallIntegerField()
+    version = models.PositiveIntegerField(default=1)
+    version_calculada = models.PositiveIntegerField(default=0)
+    generado = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.mes:02d}/{self.anio}"
+
+    @property
+    def vigente(self):
+        return self.version_calculada == self.version
+
+    class Meta:
+        verbose_name = "Cierre Mensual"
+        verbose_name_plural = "Cierres Mensuales"
+        unique_together = ['anio', 'mes']
+        ordering = ['-anio', '-mes']
+
+class ResumenMensualAsistencia(models.Model):
+    """Indicadores de un empleado en un mes cerrado, precalculados desde ResumenDiarioAsistencia"""
+    cierre = models.ForeignKey(CierreMensual, on_delete=models.CASCADE, related_name='resumenes')
+    empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE, related_name='resumenes_mensuales')
+    dias_asistidos = models.PositiveSmallIntegerField(default=0)
+    retardos = models.PositiveSmallIntegerField(default=0)
+    minutos_retardo = models.IntegerField(default=0)
+    faltas = models.PositiveSmallIntegerField(default=0)
+    permisos = models.PositiveSmallIntegerField(default=0)
+    dias_esperados = models.PositiveSmallIntegerField(default=0)
+    horas_extra = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.empleado} - {self.cierre}"
+
+    class Meta:
+        verbose_name = "Resumen Mensual de Asistencia"
+        verbose_name_plural = "Resúmenes Mensuales de Asistencia"
+        unique_together = ['cierre', 'empleado']
+        ordering = ['cierre', 'empleado']
+
+# ========== TAREAS DE REPORTES ==========
+
+class TipoTareaReporte(models.TextChoices):
+    MENSUAL = 'MENSUAL', 'Reporte mensual (Excel)'
+
+class EstadoTarea(models.TextChoices):
+    PENDIENTE = 'PENDIENTE', 'Pendiente'
+    EN_PROCESO = 'EN_PROCESO', 'En proceso'
+    TERMINADA = 'TERMINADA', 'Terminada'
+    ERROR = 'ERROR', 'Error'
+
+class TareaReporte(models.Model):
+    """
+    Reporte solicitado desde la web que genera un proceso aparte (attendance.tareas)
+    para no ocupar los workers de gunicorn que atienden a las tablets.
+    """
+    tipo = models.CharField(max_length=20, choices=TipoTareaReporte.choices)
+    parametros = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=EstadoTarea.choices, default=EstadoTarea.PENDIENTE)
+    progreso = models.PositiveSmallIntegerField(default=0, verbose_name="Progreso (%)")
+    intentos = models.PositiveSmallIntegerField(default=0)
+    trabajador = models.CharField(max_length=100, blank=True)
+    archivo = models.CharField(max_length=255, blank=True, help_text="Nombre del archivo en el storage de reportes")
+    nombre_descarga = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    solicitado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas_reporte')
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} - {self.get_estado_display()}"
+
+    class Meta:
+        verbose_name = "Tarea de Reporte"
+        verbose_name_plural = "Tareas de Reportes"
+        ordering = ['-creada']
+        indexes = [
+            # Siguiente tarea por reclamar (cola FIFO)
+            models.Index(fields=['estado', 'creada'], name='tarea_reporte_estado_idx'),
+        ]
+
+# ========== CANDADOS DE PROCESOS ==========
+
+class CandadoProceso(models.Model):
+    """
+    Candado con vencimiento en base de datos: garantiza que un solo proceso
+    (ej. el scheduler) esté activo aunque se arranquen varios. El dueño lo renueva
+    antes de que venza; si el proceso muere, otro lo toma al vencer.
+    """
+    nombre = models.CharField(max_length=50, unique=True)
+    propietario = models.CharField(max_length=100, blank=True)
+    vence = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.nombre} - {self.propietario or 'libre'}"
+
+    class Meta:
+        verbose_name = "Candado de Proceso"
+        verbose_name_plural = "Candados de Procesos"
+
+# ========== BANDEJA DE SALIDA DE CORREOS ==========
+
+class EstadoCorreo(models.TextChoices):
+    PENDIENTE = 'PENDIENTE', 'Pendiente'
+    ENVIADO = 'ENVIADO', 'Enviado'
+    FALLIDO = 'FALLIDO', 'Fallido (sin más reintentos)'
+
+class CorreoPendiente(models.Model):
+    """
+    Correo por enviar: las vistas y los jobs lo guardan aquí y un solo proceso los
+    envía por lotes sobre una conexión SMTP (attendance.correos).
+    """
+    asunto = models.CharField(max_length=255)
+    texto = models.TextField()
+    html = models.TextField(blank=True)
+    remitente = models.CharField(max_length=254)
+    destinatarios = models.JSONField(default=list)
+    adjuntos = models.JSONField(
+        default=list, blank=True,
+        help_text="Lista de {archivo, nombre, tipo}; archivo es el nombre en el storage de reportes"
+    )
+    estado = models.CharField(max_length=20, choices=EstadoCorreo.choices, default=EstadoCorreo.PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    siguiente_intento = models.DateTimeField(default=timezone.now)
+    lote = models.CharField(max_length=32, blank=True, help_text="Lote del envío que lo reclamó")
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.asunto} → {', '.join(self.destinatarios)} ({self.get_estado_display()})"
+
+    class Meta:
+        verbose_name = "Correo Pendiente"
+        verbose_name_plural = "Correos Pendientes"
+        ordering = ['-creado']
+        indexes = [
+            # Siguiente lote por enviar
+            models.Index(fields=['estado', 'siguiente_intento'], name='correo_estado_idx'),
+        ]
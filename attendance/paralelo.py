@@ -0,0 +1,87 @@
+"""
+Construcción de filas de reportes repartida por departamento entre procesos.
+
+Cada departamento es una tarea de un ProcessPoolExecutor: el proceso consulta y
+da formato a las filas de sus empleados con su propia conexión a la base de
+datos y las devuelve ordenadas; el proceso principal las intercala en el orden
+global (heapq.merge) y las escribe en el libro.
+
+Este módulo no importa modelos al cargarse porque los procesos hijos lo importan
+antes de ejecutar django.setup().
+"""
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection, connections
+
+
+def _inicializar_proceso():
+    """Prepara Django en cada proceso hijo; ninguna conexión se comparte con el padre"""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def particiones_por_departamento():
+    """
+    Ids de departamento con empleados, del más grande al más chico para repartir
+    primero las tareas largas. None agrupa a los empleados sin departamento. Incluye
+    a los inactivos: el detalle del periodo lista también sus checadas, así que el
+    libro queda igual que en serie.
+    """
+    from django.db.models import Count
+    from .models import Empleado
+
+    return [
+        [departamento_id]
+        for departamento_id in Empleado.objects.values('departamento').annotate(
+            empleados=Count('id')
+        ).order_by('-empleados').values_list('departamento', flat=True)
+    ]
+
+
+def filtro_departamentos(departamentos, campo='empleado__departamento'):
+    """Q que limita una consulta a los departamentos de una partición (None = sin departamento)"""
+    from django.db.models import Q
+
+    condicion = Q(**{f'{campo}__in': [d for d in departamentos if d is not None]})
+    if None in departamentos:
+        condicion |= Q(**{f'{campo}__isnull': True})
+    return condicion
+
+
+def _lista(funcion, *args):
+    return list(funcion(*args))
+
+
+def filas_por_departamento(funcion, *args, procesos=None):
+    """
+    Ejecuta funcion(*args, departamentos=...) por partición y devuelve sus filas en el orden global.
+
+    Args:
+        funcion: función a nivel de módulo (se importa en los hijos) cuyo último
+            argumento es departamentos y que genera (clave, fila) ordenadas por clave;
+            con departamentos=None cubre a todos
+        procesos: procesos del pool; por defecto settings.REPORTES_PROCESOS. Con 1,
+            o dentro de una transacción (los hijos no verían sus cambios), se ejecuta
+            una sola vez en este proceso.
+
+    Returns:
+        iterador de filas
+    """
+    procesos = procesos or settings.REPORTES_PROCESOS
+    particiones = particiones_por_departamento() if procesos > 1 and not connection.in_atomic_block else []
+    if len(particiones) <= 1:
+        return (fila for _, fila in funcion(*args, departamentos=None))
+
+    with ProcessPoolExecutor(
+        max_workers=min(procesos, len(particiones)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_inicializar_proceso
+    ) as pool:
+        partes = list(pool.map(partial(_lista, funcion, *args), particiones))
+    return (fila for _, fila in heapq.merge(*partes, key=itemgetter(0)))
@@ -0,0 +1,68 @@
+"""
+Periodos de reporte como rangos de fechas semiabiertos [inicio, fin).
+
+Filtrar con fecha >= inicio AND fecha < fin permite usar los índices sobre la
+columna fecha; fecha__month / fecha__year se traducen a EXTRACT() y obligan a
+revisar todas las filas.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from django.db.models import Q
+
+# Los reportes quincenales se envían los días 13 y 28: la primera quincena termina el 13
+DIA_CORTE_QUINCENA = 13
+
+
+class Periodo(NamedTuple):
+    inicio: date  # Primer día (incluido)
+    fin: date     # Día siguiente al último (excluido)
+
+    @property
+    def ultimo_dia(self):
+        """Último día incluido, para funciones que reciben rangos cerrados"""
+        return self.fin - timedelta(days=1)
+
+    @property
+    def num_dias(self):
+        return (self.fin - self.inicio).days
+
+    def __contains__(self, fecha):
+        return self.inicio <= fecha < self.fin
+
+    def filtro(self, campo='fecha'):
+        """Q con la condición de rango sobre campo (ej. 'fecha' o 'asistencia__fecha')"""
+        return Q(**{f'{campo}__gte': self.inicio, f'{campo}__lt': self.fin})
+
+    def dias(self):
+        """Itera cada día del periodo"""
+        for desplazamiento in range(self.num_dias):
+            yield self.inicio + timedelta(days=desplazamiento)
+
+
+def periodo_mes(anio, mes):
+    """Mes calendario completo"""
+    inicio = date(anio, mes, 1)
+    return Periodo(inicio, inicio + timedelta(days=monthrange(anio, mes)[1]))
+
+
+def periodo_quincena(anio, mes, primera):
+    """Primera quincena (del 1 al día de corte) o segunda (del día siguiente a fin de mes)"""
+    mes_completo = periodo_mes(anio, mes)
+    corte = date(anio, mes, DIA_CORTE_QUINCENA + 1)
+    if primera:
+        return Periodo(mes_completo.inicio, corte)
+    return Periodo(corte, mes_completo.fin)
+
+
+def periodo_semana(fecha):
+    """Semana ISO (lunes a domingo) que contiene fecha"""
+    inicio = fecha - timedelta(days=fecha.weekday())
+    return Periodo(inicio, inicio + timedelta(days=7))
+
+
+def periodo_semana_iso(anio, semana):
+    """Semana ISO por número (1-53) del año ISO"""
+    inicio = date.fromisocalendar(anio, semana, 1)
+    return Periodo(inicio, inicio + timedelta(days=7))
@@ -0,0 +1,315 @@
+"""
+Mantenimiento de ResumenDiarioAsistencia.
+
+Cada checada aplica su movimiento al resumen del día con un solo upsert
+(actualizar_resumen_checada) y un job nocturno recalcula los últimos días desde
+Asistencia (reconciliar_resumenes) para corregir ediciones manuales y completar
+los días sin checadas. Ambos caminos usan aplicar_movimiento y resuelven el
+horario con obtener_horarios_esperados (asignaciones diarias y ciclo 24x24
+incluidos), así que un día reconciliado queda igual que uno construido checada
+por checada. completar_resumenes_historicos llena, un mes a la vez, los días
+anteriores al primer resumen (las checadas previas a que existiera la tabla).
+
+Las ediciones fuera de la tablet (checadas, justificantes, permisos, vacaciones y
+turnos del día desde el admin o las vistas) reconcilian los días del empleado que
+tocan al confirmar su transacción (reconciliar_al_confirmar, desde las señales), sin
+esperar al job ni limitarse a los últimos días. Como la invalidación de los meses
+cerrados, los días de una transacción se acumulan y se reconcilian una vez por empleado.
+"""
+import threading
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Empleado, Asistencia, TipoMovimiento, ResumenDiarioAsistencia, AusenciaDia,
+    SolicitudPermiso, SolicitudVacaciones, Justificante, EstadoJustificante,
+    EstadoSolicitud, TipoAusencia
+)
+from .periodos import periodo_mes
+from .utils import obtener_horarios_esperados
+
+# Días por reconciliar en la transacción en curso de cada hilo
+_pendientes = threading.local()
+
+ESTADOS_APROBADOS = [EstadoSolicitud.APROBADO_JEFE, EstadoSolicitud.APROBADO_GERENCIA]
+
+# Columnas que se sobrescriben en el upsert (todas salvo la llave empleado/fecha)
+CAMPOS_RESUMEN = [
+    'checadas', 'primera_entrada', 'salida_comida', 'entrada_comida', 'ultima_salida',
+    'retardo', 'minutos_retardo', 'minutos_trabajados', 'es_dia_laboral',
+    'hora_entrada_esperada', 'ausencia', 'actualizado'
+]
+
+MOVIMIENTOS_ENTRADA = (TipoMovimiento.ENTRADA, TipoMovimiento.ENTRADA_COMIDA)
+MOVIMIENTOS_SALIDA = (TipoMovimiento.SALIDA_COMIDA, TipoMovimiento.SALIDA)
+
+
+def _minutos_entre(inicio, fin):
+    """Minutos de inicio a fin; si fin es menor se asume que cruzó la medianoche"""
+    minutos = (fin.hour * 60 + fin.minute) - (inicio.hour * 60 + inicio.minute)
+    return minutos if minutos >= 0 else minutos + 24 * 60
+
+
+def aplicar_movimiento(resumen, tipo_movimiento, hora, retardo, minutos_retardo,
+                       movimiento_anterior=None, hora_anterior=None):
+    """
+    Incorpora una checada al resumen del día (en memoria, sin guardar).
+
+    Args:
+        resumen: ResumenDiarioAsistencia con el estado previo del día
+        tipo_movimiento, hora, retardo, minutos_retardo: datos de la checada
+        movimiento_anterior, hora_anterior: checada previa del mismo día, si existe;
+            una salida suma a minutos_trabajados el tramo desde la entrada anterior
+    """
+    resumen.checadas += 1
+
+    if tipo_movimiento == TipoMovimiento.ENTRADA:
+        # El retardo del día es el de la primera entrada
+        if resumen.primera_entrada is None:
+            resumen.primera_entrada = hora
+            resumen.retardo = retardo
+            resumen.minutos_retardo = minutos_retardo if retardo else 0
+    elif tipo_movimiento == TipoMovimiento.SALIDA_COMIDA:
+        resumen.salida_comida = hora
+    elif tipo_movimiento == TipoMovimiento.ENTRADA_COMIDA:
+        resumen.entrada_comida = hora
+    elif tipo_movimiento == TipoMovimiento.SALIDA:
+        resumen.ultima_salida = hora
+
+    if tipo_movimiento in MOVIMIENTOS_SALIDA and movimiento_anterior in MOVIMIENTOS_ENTRADA and hora_anterior:
+        resumen.minutos_trabajados += _minutos_entre(hora_anterior, hora)
+
+
+def guardar_resumenes(resumenes, batch_size=1000):
+    """Inserta o sobrescribe los resúmenes por (empleado, fecha) con un upsert por lote"""
+    opciones = {}
+    # MySQL resuelve el conflicto con ON DUPLICATE KEY y no acepta indicar la llave
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = ['empleado', 'fecha']
+    ResumenDiarioAsistencia.objects.bulk_create(
+        resumenes,
+        batch_size=batch_size,
+        update_conflicts=True,
+        update_fields=CAMPOS_RESUMEN,
+        **opciones
+    )
+
+
+def actualizar_resumen_checada(empleado, asistencia):
+    """
+    Aplica una checada recién guardada al resumen de su día con un solo upsert.
+
+    empleado debe venir de checkin.consulta_empleados_checkin (trae el resumen del día,
+    el último movimiento y las ausencias como anotaciones). Si el resumen no refleja
+    todas las checadas previas del día (registros capturados por otra vía), el día se
+    recalcula completo desde Asistencia.
+    """
+    if (empleado.resumen_checadas or 0) != empleado.checadas_hoy:
+        reconciliar_resumenes(asistencia.fecha, asistencia.fecha, empleados=[empleado])
+        return
+
+    if empleado.resumen_checadas is not None:
+        # El resumen del día ya trae el horario resuelto (por la primera checada o la reconciliación)
+        es_dia_laboral = empleado.resumen_es_dia_laboral
+        hora_entrada_esperada = empleado.resumen_hora_entrada_esperada
+    else:
+        horarios = obtener_horarios_esperados([empleado], asistencia.fecha, asistencia.fecha)
+        es_dia_laboral = horarios.es_dia_laboral(empleado.id, asistencia.fecha)
+        hora_entrada_esperada = horarios.hora_entrada(empleado.id, asistencia.fecha)
+
+    if empleado.vacaciones_inicio:
+        ausencia = AusenciaDia.VACACIONES
+    elif empleado.permiso_dia:
+        ausencia = AusenciaDia.PERMISO
+    else:
+        ausencia = empleado.resumen_ausencia or AusenciaDia.NINGUNA
+
+    resumen = ResumenDiarioAsistencia(
+        empleado=empleado,
+        fecha=asistencia.fecha,
+        checadas=empleado.checadas_hoy,
+        primera_entrada=empleado.resumen_primera_entrada,
+        salida_comida=empleado.resumen_salida_comida,
+        entrada_comida=empleado.resumen_entrada_comida,
+        ultima_salida=empleado.resumen_ultima_salida,
+        retardo=bool(empleado.resumen_retardo),
+        minutos_retardo=empleado.resumen_minutos_retardo or 0,
+        minutos_trabajados=empleado.resumen_minutos_trabajados or 0,
+        es_dia_laboral=es_dia_laboral,
+        hora_entrada_esperada=hora_entrada_esperada,
+        ausencia=ausencia
+    )
+    aplicar_movimiento(
+        resumen, asistencia.tipo_movimiento, asistencia.hora, asistencia.retardo, asistencia.minutos_retardo,
+        empleado.ultimo_movimiento, empleado.ultima_hora
+    )
+    guardar_resumenes([resumen])
+
+
+def _ausencias_por_dia(empleado_ids, fecha_inicio, fecha_fin):
+    """{(empleado_id, fecha): AusenciaDia} con vacaciones, permisos de día completo y justificantes aprobados"""
+    ausencias = {}
+
+    def marcar(empleado_id, inicio, fin, ausencia):
+        dia = max(inicio, fecha_inicio)
+        while dia <= min(fin or inicio, fecha_fin):
+            # Prioridad: vacaciones > permiso > justificante
+            ausencias.setdefault((empleado_id, dia), ausencia)
+            dia += timedelta(days=1)
+
+    for empleado_id, inicio, fin in SolicitudVacaciones.objects.filter(
+        empleado_id__in=empleado_ids,
+        estado__in=ESTADOS_APROBADOS,
+        fecha_inicio__lte=fecha_fin,
+        fecha_fin__gte=fecha_inicio
+    ).values_list('empleado_id', 'fecha_inicio', 'fecha_fin'):
+        marcar(empleado_id, inicio, fin, AusenciaDia.VACACIONES)
+
+    for empleado_id, inicio, fin in SolicitudPermiso.objects.filter(
+        Q(fecha_fin__gte=fecha_inicio) | Q(fecha_fin__isnull=True, fecha_inicio__gte=fecha_inicio),
+        empleado_id__in=empleado_ids,
+        estado__in=ESTADOS_APROBADOS,
+        tipo_ausencia=TipoAusencia.DIAS_COMPLETOS,
+        fecha_inicio__lte=fecha_fin
+    ).values_list('empleado_id', 'fecha_inicio', 'fecha_fin'):
+        marcar(empleado_id, inicio, fin, AusenciaDia.PERMISO)
+
+    for empleado_id, fecha in Justificante.objects.filter(
+        empleado_id__in=empleado_ids,
+        estado=EstadoJustificante.APROBADO,
+        tipo_justificante__cancela_penalizacion=True,
+        fecha_incidente__gte=fecha_inicio,
+        fecha_incidente__lte=fecha_fin
+    ).values_list('empleado_id', 'fecha_incidente'):
+        marcar(empleado_id, fecha, fecha, AusenciaDia.JUSTIFICANTE)
+
+    return ausencias
+
+
+def reconciliar_resumenes(fecha_inicio, fecha_fin, empleados=None):
+    """
+    Recalcula desde Asistencia los resúmenes de cada empleado y día del rango y los guarda.
+
+    Args:
+        fecha_inicio: datetime.date - Primer día (incluido)
+        fecha_fin: datetime.date - Último día (incluido)
+        empleados: lista de Empleado; por defecto los activos más cualquiera con
+            checadas en el rango
+
+    Returns:
+        int: número de resúmenes escritos
+    """
+    if empleados is None:
+        empleados = Empleado.objects.filter(
+            Q(activo=True) | Q(asistencia__fecha__gte=fecha_inicio, asistencia__fecha__lte=fecha_fin)
+        ).distinct().select_related('tipo_horario')
+    empleados = list(empleados)
+    ids = [e.id for e in empleados]
+
+    horarios = obtener_horarios_esperados(empleados, fecha_inicio, fecha_fin)
+    ausencias = _ausencias_por_dia(ids, fecha_inicio, fecha_fin)
+
+    resumenes = {}
+    for empleado in empleados:
+        for fecha in (fecha_inicio + timedelta(days=d) for d in range(horarios.num_dias)):
+            resumenes[(empleado.id, fecha)] = ResumenDiarioAsistencia(
+                empleado_id=empleado.id,
+                fecha=fecha,
+                es_dia_laboral=horarios.es_dia_laboral(empleado.id, fecha),
+                hora_entrada_esperada=horarios.hora_entrada(empleado.id, fecha),
+                ausencia=ausencias.get((empleado.id, fecha), AusenciaDia.NINGUNA)
+            )
+
+    checadas = Asistencia.objects.filter(
+        empleado_id__in=ids,
+        fecha__gte=fecha_inicio,
+        fecha__lte=fecha_fin
+    ).order_by('empleado_id', 'fecha', 'hora').values_list(
+        'empleado_id', 'fecha', 'tipo_movimiento', 'hora', 'retardo', 'minutos_retardo'
+    )
+    for llave, checadas_dia in groupby(checadas.iterator(chunk_size=2000), key=lambda c: (c[0], c[1])):
+        resumen = resumenes[llave]
+        movimiento_anterior = hora_anterior = None
+        for _, _, tipo_movimiento, hora, retardo, minutos_retardo in checadas_dia:
+            aplicar_movimiento(
+                resumen, tipo_movimiento, hora, retardo, minutos_retardo, movimiento_anterior, hora_anterior
+            )
+            movimiento_anterior, hora_anterior = tipo_movimiento, hora
+
+    guardar_resumenes(list(resumenes.values()))
+    return len(resumenes)
+
+
+def reconciliar_al_confirmar(empleado_id, fecha_inicio, fecha_fin=None):
+    """
+    Reconcilia los resúmenes de un empleado en el rango cuando se confirme la transacción
+    en curso (de inmediato fuera de una transacción).
+    """
+    lote = getattr(_pendientes, 'lote', None)
+    if lote is not None and lote.registrado():
+        lote.agregar(empleado_id, fecha_inicio, fecha_fin or fecha_inicio)
+    else:
+        lote = _pendientes.lote = _LoteReconciliacion()
+        lote.agregar(empleado_id, fecha_inicio, fecha_fin or fecha_inicio)
+        transaction.on_commit(lote.aplicar)
+
+
+class _LoteReconciliacion:
+    """Rango de días por empleado que se reconcilia al confirmar la transacción que lo acumuló"""
+
+    def __init__(self):
+        self.rangos = {}
+
+    def agregar(self, empleado_id, fecha_inicio, fecha_fin):
+        inicio, fin = self.rangos.get(empleado_id, (fecha_inicio, fecha_fin))
+        self.rangos[empleado_id] = (min(inicio, fecha_inicio), max(fin, fecha_fin))
+
+    def registrado(self):
+        """True si el callback sigue pendiente en el savepoint actual (ver resumen_mensual)"""
+        conexion = transaction.get_connection()
+        savepoints = set(conexion.savepoint_ids)
+        return any(
+            callback[1] == self.aplicar and callback[0] == savepoints
+            for callback in conexion.run_on_commit
+        )
+
+    def aplicar(self):
+        if getattr(_pendientes, 'lote', None) is self:
+            del _pendientes.lote
+        # Los empleados borrados en la misma transacción (checadas en cascada) ya no se reconcilian
+        empleados = Empleado.objects.filter(pk__in=self.rangos).select_related('tipo_horario')
+        for empleado in empleados:
+            reconciliar_resumenes(*self.rangos[empleado.pk], empleados=[empleado])
+
+
+def completar_resumenes_historicos():
+    """
+    Reconcilia los días con checadas anteriores al primer resumen guardado, del mes más
+    reciente al más antiguo y un mes por transacción: si se interrumpe, la siguiente
+    llamada continúa donde se quedó. Sin días faltantes solo cuesta dos consultas.
+
+    Returns:
+        int: número de resúmenes escritos
+    """
+    # Importación tardía: resumen_mensual depende de este módulo
+    from .resumen_mensual import invalidar_resumenes_mensuales
+
+    primera_checada = Asistencia.objects.order_by('fecha').values_list('fecha', flat=True).first()
+    if primera_checada is None:
+        return 0
+    primer_resumen = ResumenDiarioAsistencia.objects.order_by('fecha').values_list('fecha', flat=True).first()
+    hasta = primer_resumen - timedelta(days=1) if primer_resumen else timezone.localdate()
+
+    total = 0
+    while hasta >= primera_checada:
+        desde = max(periodo_mes(hasta.year, hasta.month).inicio, primera_checada)
+        with transaction.atomic():
+            total += reconciliar_resumenes(desde, hasta)
+            # Un resumen mensual construido antes de llenar sus días quedó en ceros
+            invalidar_resumenes_mensuales(desde, hasta)
+        hasta = desde - timedelta(days=1)
+    return total
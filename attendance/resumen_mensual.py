@@ -0,0 +1,237 @@
+"""
+Resumen mensual precalculado de los meses cerrados.
+
+Un mes cerrado solo cambia cuando se editan sus checadas, justificantes,
+permisos, vacaciones, tiempo extra o turnos asignados por día. El job nocturno construye el resumen de
+cada empleado una vez (construir_resumen_mensual) y las señales de esos modelos
+lo invalidan incrementando CierreMensual.version; mientras siga vigente, los
+reportes del mes lo leen con una sola consulta en lugar de recalcularlo. Los
+cambios de empleados, nombres de usuario, departamentos y horarios aparecen en
+todos los meses, así que invalidan todos los cierres.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import Empleado, TiempoExtra, CierreMensual, ResumenMensualAsistencia
+from .periodos import periodo_mes
+from .resumen_diario import reconciliar_resumenes
+from .utils import resumen_asistencias_por_empleado
+
+# Lote de meses por invalidar en la transacción en curso de cada hilo
+_pendientes = threading.local()
+
+CAMPOS_INDICADORES = ['dias_asistidos', 'retardos', 'minutos_retardo', 'faltas', 'permisos', 'dias_esperados']
+
+
+def _mes_anterior(anio, mes):
+    return (anio - 1, 12) if mes == 1 else (anio, mes - 1)
+
+
+def meses_cerrados(cantidad, hoy=None):
+    """Los últimos `cantidad` meses ya terminados, del más reciente al más antiguo"""
+    hoy = hoy or timezone.localdate()
+    anio, mes = hoy.year, hoy.month
+    meses = []
+    for _ in range(cantidad):
+        anio, mes = _mes_anterior(anio, mes)
+        meses.append((anio, mes))
+    return meses
+
+
+def invalidar_resumenes_mensuales(fecha_inicio, fecha_fin=None):
+    """
+    Marca como desactualizados los resúmenes de los meses cerrados que tocan el rango.
+
+    Las fechas del mes en curso no generan consultas: ese mes nunca tiene resumen
+    precalculado, así que las checadas del día no pagan la invalidación. Los meses
+    se acumulan y se invalidan con un solo UPDATE al confirmar la transacción, así
+    que borrar o editar miles de checadas en bloque no cuesta una consulta por fila.
+    """
+    fecha_fin = fecha_fin or fecha_inicio
+    primer_dia_mes_actual = timezone.localdate().replace(day=1)
+    if fecha_inicio >= primer_dia_mes_actual:
+        return
+
+    fecha_fin = min(fecha_fin, primer_dia_mes_actual - timedelta(days=1))
+    meses = set()
+    anio, mes = fecha_inicio.year, fecha_inicio.month
+    while (anio, mes) <= (fecha_fin.year, fecha_fin.month):
+        meses.add((anio, mes))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+    _agregar_al_lote(meses=meses)
+
+
+def invalidar_todos_los_resumenes():
+    """
+    Marca como desactualizados los resúmenes de todos los meses cerrados: para cambios
+    que se ven en cualquier periodo (empleados activos, nombres, departamentos).
+    Como invalidar_resumenes_mensuales, se aplica con un solo UPDATE al confirmar.
+    """
+    _agregar_al_lote(todos=True)
+
+
+def _agregar_al_lote(meses=frozenset(), todos=False):
+    lote = getattr(_pendientes, 'lote', None)
+    if lote is not None and lote.registrado():
+        lote.meses |= meses
+        lote.todos = lote.todos or todos
+    else:
+        lote = _pendientes.lote = _LoteInvalidacion(meses, todos)
+        # Fuera de una transacción se aplica en este momento
+        transaction.on_commit(lote.aplicar)
+
+
+class _LoteInvalidacion:
+    """Meses que se invalidan juntos al confirmar la transacción que los acumuló"""
+
+    def __init__(self, meses, todos=False):
+        self.meses = set(meses)
+        self.todos = todos
+
+    def registrado(self):
+        """
+        True si el callback del lote sigue pendiente en el mismo savepoint actual: se
+        confirma o se revierte junto con lo que se agregue ahora. Tras un rollback
+        Django descarta el callback y el lote ya no se aplicaría.
+        """
+        conexion = transaction.get_connection()
+        savepoints = set(conexion.savepoint_ids)
+        return any(
+            callback[1] == self.aplicar and callback[0] == savepoints
+            for callback in conexion.run_on_commit
+        )
+
+    def aplicar(self):
+        if getattr(_pendientes, 'lote', None) is self:
+            del _pendientes.lote
+        if self.todos:
+            CierreMensual.objects.update(version=F('version') + 1)
+            return
+        condicion = Q()
+        for anio, mes in self.meses:
+            condicion |= Q(anio=anio, mes=mes)
+        CierreMensual.objects.filter(condicion).update(version=F('version') + 1)
+
+
+def _horas_extra_por_empleado(empleado_ids, periodo):
+    return dict(
+        TiempoExtra.objects.filter(
+            periodo.filtro(),
+            empleado_id__in=empleado_ids,
+            aprobado=True
+        ).values('empleado').annotate(total=Sum('horas_extra')).values_list('empleado', 'total')
+    )
+
+
+def calcular_resumen_mensual(anio, mes):
+    """
+    Calcula los indicadores del mes de cada empleado activo desde los resúmenes diarios.
+
+    Returns:
+        list: un dict por empleado (ordenados por código) con las claves de
+        resumen_asistencias_por_empleado más horas_extra
+    """
+    periodo = periodo_mes(anio, mes)
+    resumen = resumen_asistencias_por_empleado(
+        Empleado.objects.filter(activo=True).order_by('codigo_empleado'),
+        periodo.inicio,
+        periodo.ultimo_dia
+    )
+    horas_extra = _horas_extra_por_empleado([fila['empleado'].id for fila in resumen], periodo)
+    for fila in resumen:
+        fila['horas_extra'] = horas_extra.get(fila['empleado'].id) or 0
+    return resumen
+
+
+def construir_resumen_mensual(anio, mes):
+    """
+    Reconcilia los resúmenes diarios del mes y guarda su resumen mensual precalculado.
+
+    Si el mes se invalida mientras se calcula, el cierre queda desactualizado y el
+    siguiente job lo vuelve a construir.
+
+    Returns:
+        int: número de empleados en el resumen
+    """
+    cierre, _ = CierreMensual.objects.get_or_create(anio=anio, mes=mes)
+    version = cierre.version
+    periodo = periodo_mes(anio, mes)
+
+    with transaction.atomic():
+        reconciliar_resumenes(periodo.inicio, periodo.ultimo_dia)
+        resumen = calcular_resumen_mensual(anio, mes)
+
+        cierre.resumenes.all().delete()
+        ResumenMensualAsistencia.objects.bulk_create([
+            ResumenMensualAsistencia(
+                cierre=cierre,
+                empleado=fila['empleado'],
+                horas_extra=fila['horas_extra'],
+                **{campo: fila[campo] for campo in CAMPOS_INDICADORES}
+            )
+            for fila in resumen
+        ], batch_size=1000)
+        CierreMensual.objects.filter(pk=cierre.pk, version=version).update(
+            version_calculada=version,
+            generado=timezone.now()
+        )
+    return len(resumen)
+
+
+def construir_resumenes_pendientes(meses=None):
+    """
+    Construye los resúmenes de los últimos meses cerrados que no existen o fueron invalidados.
+
+    Args:
+        meses: cuántos meses cerrados revisar; por defecto settings.RESUMEN_MENSUAL_MESES
+
+    Returns:
+        list: (anio, mes) construidos
+    """
+    candidatos = meses_cerrados(meses or settings.RESUMEN_MENSUAL_MESES)
+    vigentes = set(
+        CierreMensual.objects.filter(
+            version_calculada=F('version'),
+            anio__gte=candidatos[-1][0]
+        ).values_list('anio', 'mes')
+    )
+    construidos = []
+    for anio, mes in reversed(candidatos):
+        if (anio, mes) not in vigentes:
+            construir_resumen_mensual(anio, mes)
+            construidos.append((anio, mes))
+    return construidos
+
+
+def resumen_mensual_por_empleado(anio, mes):
+    """
+    Indicadores del mes por empleado: el resumen precalculado si está vigente
+    (una sola consulta) o el cálculo en vivo en otro caso (mes en curso o invalidado).
+
+    Returns:
+        list: mismo formato que calcular_resumen_mensual
+    """
+    if periodo_mes(anio, mes).fin > timezone.localdate():
+        return calcular_resumen_mensual(anio, mes)
+
+    precalculados = ResumenMensualAsistencia.objects.filter(
+        cierre__anio=anio,
+        cierre__mes=mes,
+        cierre__version_calculada=F('cierre__version')
+    ).select_related('empleado__user', 'empleado__departamento').order_by('empleado__codigo_empleado')
+
+    resumen = [
+        dict(
+            empleado=fila.empleado,
+            horas_extra=fila.horas_extra,
+            **{campo: getattr(fila, campo) for campo in CAMPOS_INDICADORES}
+        )
+        for fila in precalculados
+    ]
+    return resumen or calcular_resumen_mensual(anio, mes)
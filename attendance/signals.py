@@ -0,0 +1,119 @@
+"""
+Señales de la app attendance.
+
+Se conectan desde AttendanceConfig.ready().
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Departamento, Empleado, TipoHorario, HorarioDiaSemana, TurnoRotativo, AsignacionTurnoRotativo,
+    AsignacionTurnoDiaria, ConfiguracionSistema, Asistencia, TiempoExtra, Justificante, SolicitudPermiso,
+    SolicitudVacaciones
+)
+
+
+@receiver([post_save, post_delete], sender=TipoHorario)
+@receiver([post_save, post_delete], sender=HorarioDiaSemana)
+@receiver([post_save, post_delete], sender=TurnoRotativo)
+@receiver([post_save, post_delete], sender=AsignacionTurnoRotativo)
+@receiver([post_save, post_delete], sender=ConfiguracionSistema)
+def invalidar_cache_horarios(sender, **kwargs):
+    """
+    Limpia la caché de obtener_horario_esperado cuando cambia cualquier dato de horarios.
+    Los horarios deciden días laborales, faltas y retardos de cualquier mes cerrado.
+    """
+    from .resumen_mensual import invalidar_todos_los_resumenes
+    from .utils import limpiar_cache_horarios
+    limpiar_cache_horarios()
+    invalidar_todos_los_resumenes()
+
+
+@receiver([post_save, post_delete], sender=AsignacionTurnoDiaria)
+def invalidar_resumen_mensual_por_turno_diario(sender, instance, **kwargs):
+    """El turno asignado a un día solo cambia el horario esperado de ese día"""
+    from .resumen_mensual import invalidar_resumenes_mensuales
+    invalidar_resumenes_mensuales(instance.fecha)
+
+
+@receiver([post_save, post_delete], sender=Asistencia)
+@receiver([post_save, post_delete], sender=TiempoExtra)
+def invalidar_resumen_mensual_por_fecha(sender, instance, **kwargs):
+    """Desactualiza el resumen precalculado del mes cerrado de la checada o el tiempo extra"""
+    from .resumen_mensual import invalidar_resumenes_mensuales
+    invalidar_resumenes_mensuales(instance.fecha)
+
+
+@receiver([post_save, post_delete], sender=Justificante)
+def invalidar_resumen_mensual_por_justificante(sender, instance, **kwargs):
+    from .resumen_mensual import invalidar_resumenes_mensuales
+    invalidar_resumenes_mensuales(instance.fecha_incidente)
+
+
+@receiver([post_save, post_delete], sender=Asistencia)
+@receiver([post_save, post_delete], sender=AsignacionTurnoDiaria)
+def reconciliar_resumen_diario(sender, instance, **kwargs):
+    """
+    Ediciones de checadas o del turno de un día fuera de la tablet; la checada de la
+    tablet ya actualizó su resumen y lo indica con resumen_diario_al_dia
+    """
+    if getattr(instance, 'resumen_diario_al_dia', False):
+        return
+    from .resumen_diario import reconciliar_al_confirmar
+    reconciliar_al_confirmar(instance.empleado_id, instance.fecha)
+
+
+@receiver([post_save, post_delete], sender=Justificante)
+def reconciliar_resumen_diario_por_justificante(sender, instance, **kwargs):
+    from .resumen_diario import reconciliar_al_confirmar
+    reconciliar_al_confirmar(instance.empleado_id, instance.fecha_incidente)
+
+
+@receiver([post_save, post_delete], sender=SolicitudPermiso)
+@receiver([post_save, post_delete], sender=SolicitudVacaciones)
+def reconciliar_resumen_diario_por_ausencia(sender, instance, **kwargs):
+    """Aprobar, rechazar o borrar la solicitud cambia la ausencia de los días que cubre"""
+    from .resumen_diario import reconciliar_al_confirmar
+    reconciliar_al_confirmar(instance.empleado_id, instance.fecha_inicio, instance.fecha_fin)
+
+
+@receiver([post_save, post_delete], sender=SolicitudPermiso)
+@receiver([post_save, post_delete], sender=SolicitudVacaciones)
+def invalidar_resumen_mensual_por_ausencia(sender, instance, **kwargs):
+    """Desactualiza los meses cerrados que cubre el permiso o las vacaciones"""
+    from .resumen_mensual import invalidar_resumenes_mensuales
+    invalidar_resumenes_mensuales(instance.fecha_inicio, instance.fecha_fin)
+
+
+@receiver([post_save, post_delete], sender=Empleado)
+@receiver([post_save, post_delete], sender=Departamento)
+def invalidar_resumenes_por_catalogo(sender, **kwargs):
+    """Nombres, departamentos y empleados activos salen en los reportes de todos los meses"""
+    from .resumen_mensual import invalidar_todos_los_resumenes
+    invalidar_todos_los_resumenes()
+
+
+@receiver([post_save, post_delete], sender=Empleado)
+def invalidar_qr_empleado(sender, instance, **kwargs):
+    """La foto del empleado en la caché de QR se vuelve a leer en su siguiente escaneo"""
+    from .checkin import invalidar_empleado_qr
+    invalidar_empleado_qr(instance.qr_uuid)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_qr_por_usuario(sender, instance, update_fields=None, **kwargs):
+    """Cambios de nombre del usuario; el login (solo last_login) no invalida nada"""
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    from .checkin import limpiar_cache_qr
+    from .resumen_mensual import invalidar_todos_los_resumenes
+    limpiar_cache_qr()
+    invalidar_todos_los_resumenes()
+
+
+@receiver([post_save, post_delete], sender=TipoHorario)
+def invalidar_qr_por_horario(sender, **kwargs):
+    """Borrar un horario deja a sus empleados sin horario con un UPDATE que no dispara señales de Empleado"""
+    from .checkin import limpiar_cache_qr
+    limpiar_cache_qr()
@@ -0,0 +1,210 @@
+"""
+Cola de reportes en base de datos (TareaReporte).
+
+Las vistas solo encolan la tarea y devuelven su id; un proceso aparte
+(`manage.py procesar_tareas_reporte` o el job del scheduler) reclama cada tarea
+con un UPDATE condicional, así que dos trabajadores nunca generan la misma, y
+deja el archivo en el storage de reportes. Los workers web quedan libres para
+las checadas de las tablets.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from checador.storage_backends import get_reportes_storage
+
+from .artefactos import obtener_artefacto
+from .models import TareaReporte, TipoTareaReporte, EstadoTarea
+from .periodos import periodo_mes
+
+logger = logging.getLogger(__name__)
+
+# Una tarea en proceso cuyo trabajador murió se vuelve a intentar hasta este número de veces
+MAX_INTENTOS = 3
+
+ESTADOS_ACTIVOS = [EstadoTarea.PENDIENTE, EstadoTarea.EN_PROCESO]
+
+
+def encolar_tarea(tipo, parametros, usuario=None):
+    """
+    Crea una tarea pendiente, o devuelve la que ya está en cola con los mismos parámetros.
+    Una tarea igual que agotó sus intentos se cierra con error y no cuenta como en cola.
+    """
+    cerrar_tareas_agotadas(tipo=tipo, parametros=parametros)
+    existente = TareaReporte.objects.filter(tipo=tipo, parametros=parametros, estado__in=ESTADOS_ACTIVOS).first()
+    if existente:
+        return existente
+    return TareaReporte.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        solicitado_por=usuario if usuario and usuario.is_authenticated else None
+    )
+
+
+def estado_tarea(tarea):
+    """Representación JSON de una tarea para el polling desde el navegador"""
+    datos = {
+        'id': tarea.pk,
+        'tipo': tarea.tipo,
+        'estado': tarea.estado,
+        'progreso': tarea.progreso,
+        'error': tarea.error,
+        'estado_url': reverse('tarea_reporte_estado', args=[tarea.pk]),
+    }
+    if tarea.estado == EstadoTarea.TERMINADA:
+        datos['descarga_url'] = reverse('tarea_reporte_descarga', args=[tarea.pk])
+    return datos
+
+
+def _disponibles():
+    """Pendientes, o en proceso desde hace demasiado (trabajador caído) con intentos restantes"""
+    limite = timezone.now() - timedelta(seconds=settings.TAREAS_REPORTE_TIEMPO_MAXIMO)
+    return Q(estado=EstadoTarea.PENDIENTE) | Q(
+        estado=EstadoTarea.EN_PROCESO, iniciada__lt=limite, intentos__lt=MAX_INTENTOS
+    )
+
+
+def _agotadas():
+    """En proceso desde hace demasiado y sin intentos restantes: su trabajador murió en cada intento"""
+    limite = timezone.now() - timedelta(seconds=settings.TAREAS_REPORTE_TIEMPO_MAXIMO)
+    return Q(estado=EstadoTarea.EN_PROCESO, iniciada__lt=limite, intentos__gte=MAX_INTENTOS)
+
+
+def cerrar_tareas_agotadas(**filtros):
+    """
+    Marca con error las tareas agotadas, que ningún trabajador volverá a tomar.
+
+    Returns:
+        int: número de tareas cerradas
+    """
+    cerradas = TareaReporte.objects.filter(_agotadas(), **filtros).update(
+        estado=EstadoTarea.ERROR,
+        error=f'El trabajador se detuvo en los {MAX_INTENTOS} intentos; vuelve a solicitar el reporte',
+        terminada=timezone.now()
+    )
+    if cerradas:
+        logger.warning("%s tareas de reporte cerradas tras %s intentos fallidos", cerradas, MAX_INTENTOS)
+    return cerradas
+
+
+def reclamar_tarea(trabajador):
+    """
+    Toma la tarea disponible más antigua. El UPDATE solo afecta la fila si sigue
+    disponible, así que si otro trabajador la ganó se intenta con la siguiente.
+
+    Returns:
+        TareaReporte o None si no hay tareas disponibles
+    """
+    cerrar_tareas_agotadas()
+    candidatas = TareaReporte.objects.filter(_disponibles()).order_by('creada').values_list('pk', flat=True)[:10]
+    for tarea_id in candidatas:
+        reclamada = TareaReporte.objects.filter(_disponibles(), pk=tarea_id).update(
+            estado=EstadoTarea.EN_PROCESO,
+            trabajador=trabajador,
+            iniciada=timezone.now(),
+            progreso=0,
+            intentos=F('intentos') + 1
+        )
+        if reclamada:
+            return TareaReporte.objects.get(pk=tarea_id)
+    return None
+
+
+def _generar_reporte_mensual(tarea, progreso):
+    from .utils import generar_excel_reporte_mensual
+
+    mes, anio = tarea.parametros['mes'], tarea.parametros['anio']
+    tarea.nombre_descarga = f"reporte_mensual_{anio}_{mes:02d}.xlsx"
+
+    def generar(destino):
+        generar_excel_reporte_mensual(mes, anio, destino=destino, progreso=progreso)
+
+    # Meses cerrados: el archivo queda en la caché por versión y lo reutilizan otras descargas
+    artefacto = obtener_artefacto('mensual', periodo_mes(anio, mes), 'xlsx', generar)
+    if artefacto:
+        return artefacto[1]
+
+    with SpooledTemporaryFile(max_size=settings.REPORTES_SPOOL_MAX_BYTES) as archivo:
+        generar(archivo)
+        archivo.seek(0)
+        return get_reportes_storage().save(
+            f'tareas/{tarea.pk}/{tarea.nombre_descarga}',
+            File(archivo, name=tarea.nombre_descarga)
+        )
+
+
+GENERADORES = {
+    TipoTareaReporte.MENSUAL: _generar_reporte_mensual,
+}
+
+
+def ejecutar_tarea(tarea):
+    """Genera el reporte de una tarea reclamada y registra el resultado"""
+    pendientes = TareaReporte.objects.filter(pk=tarea.pk)
+    ultimo = [0]
+
+    def progreso(porcentaje):
+        # Solo se escribe cuando cambia, para no hacer un UPDATE por cada llamada
+        if porcentaje != ultimo[0]:
+            ultimo[0] = porcentaje
+            pendientes.update(progreso=porcentaje)
+
+    try:
+        archivo = GENERADORES[tarea.tipo](tarea, progreso)
+    except Exception as e:
+        logger.exception("Error generando la tarea de reporte #%s", tarea.pk)
+        pendientes.update(estado=EstadoTarea.ERROR, error=str(e), terminada=timezone.now())
+        return False
+
+    pendientes.update(
+        estado=EstadoTarea.TERMINADA,
+        progreso=100,
+        archivo=archivo,
+        nombre_descarga=tarea.nombre_descarga,
+        terminada=timezone.now()
+    )
+    return True
+
+
+def procesar_tareas(max_tareas=None, trabajador=None):
+    """
+    Reclama y ejecuta tareas hasta vaciar la cola (o hasta max_tareas).
+
+    Returns:
+        int: número de tareas procesadas
+    """
+    trabajador = trabajador or f'{socket.gethostname()}:{os.getpid()}'
+    procesadas = 0
+    while max_tareas is None or procesadas < max_tareas:
+        tarea = reclamar_tarea(trabajador)
+        if tarea is None:
+            break
+        logger.info("Procesando tarea de reporte #%s (%s)", tarea.pk, tarea.tipo)
+        ejecutar_tarea(tarea)
+        procesadas += 1
+    return procesadas
+
+
+def limpiar_tareas_antiguas(dias=7):
+    """Elimina las tareas terminadas hace más de `dias` días y los archivos que generaron"""
+    cerrar_tareas_agotadas()
+    limite = timezone.now() - timedelta(days=dias)
+    storage = get_reportes_storage()
+    antiguas = TareaReporte.objects.filter(
+        estado__in=[EstadoTarea.TERMINADA, EstadoTarea.ERROR],
+        creada__lt=limite
+    )
+    for archivo in antiguas.filter(archivo__startswith='tareas/').values_list('archivo', flat=True):
+        try:
+            storage.delete(archivo)
+        except Exception:
+            logger.exception("No se pudo eliminar el archivo de tarea %s", archivo)
+    antiguas.delete()
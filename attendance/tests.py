@@ -1,3 +1,1156 @@
-from django.test import TestCase
+import heapq
+import re
+import tempfile
+import uuid
+from datetime import datetime, time, date, timedelta
+from io import BytesIO, StringIO
+from operator import itemgetter
+from smtplib import SMTPException
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.mail import get_connection
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from checador.storage_backends import FILE_FIELDS
+
+from .artefactos import obtener_artefacto
+from .cache import CacheLRU
+from .candados import adquirir_candado, liberar_candado, propietario_candado
+from .checkin import (
+    calentar_cache_qr, cargar_empleado_checkin, consulta_empleados_checkin, empleado_por_qr, registrar_checada
+)
+from .correos import enviar_pendientes
+from .datos_sinteticos import borrar_datos, generar_datos
+from .models import (
+    Empleado, Asistencia, TipoMovimiento, TipoHorario, TipoPermiso,
+    SolicitudPermiso, EstadoSolicitud, TipoAusencia, TipoSistemaHorario,
+    HorarioDiaSemana, TurnoRotativo, AsignacionTurnoRotativo, AsignacionTurnoDiaria, ConfiguracionSistema,
+    Departamento, Visitante, RegistroVisita, ResumenDiarioAsistencia, AusenciaDia, TiempoExtra, Justificante,
+    TipoJustificante, EstadoJustificante, CierreMensual, TareaReporte, TipoTareaReporte, EstadoTarea, CandadoProceso,
+    CorreoPendiente, EstadoCorreo
+)
+from .resumen_diario import completar_resumenes_historicos, reconciliar_resumenes
+from .resumen_mensual import (
+    calcular_resumen_mensual, construir_resumen_mensual, invalidar_resumenes_mensuales, resumen_mensual_por_empleado
+)
+from .paralelo import filas_por_departamento, particiones_por_departamento
+from .tareas import encolar_tarea, procesar_tareas, reclamar_tarea
+from .periodos import periodo_mes, periodo_quincena, periodo_semana, periodo_semana_iso
+from .utils import (
+    obtener_horario_esperado, obtener_horarios_esperados, limpiar_cache_horarios,
+    resumen_asistencias_por_empleado, generar_excel_reporte_mensual, generar_excel_reporte_semanal,
+    enviar_email_visitante, generar_reporte_tiempo_extra_mensual, generar_reporte_diario, generar_reporte_quincenal,
+    generar_reporte_semanal, empleados_con_retardos, filas_reporte_semanal, filas_detalle_mensual
+)
+
+ZONA = ZoneInfo('America/Mexico_City')
+
+
+def crear_empleado(codigo, tipo_horario=None, **kwargs):
+    """Crea un empleado de prueba sin generar su QR en el storage"""
+    user = User.objects.create(username=codigo, first_name='Empleado', last_name=codigo)
+    return Empleado.objects.create(
+        user=user,
+        codigo_empleado=codigo,
+        tipo_horario=tipo_horario,
+        qr_code=f'qr_codes/qr_{codigo}.png',
+        **kwargs
+    )
+
+
+class CheckinEmpleadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.horario_fijo = TipoHorario.objects.create(
+            nombre='Oficina', hora_entrada=time(9, 0), hora_salida=time(18, 0), minutos_tolerancia=15
+        )
+        cls.horario_comida = TipoHorario.objects.create(
+            nombre='Oficina con comida', hora_entrada=time(9, 0), hora_salida=time(18, 0),
+            tiene_horario_comida=True, hora_inicio_comida=time(14, 0), hora_fin_comida=time(16, 0)
+        )
+        cls.empleado = crear_empleado('EMP001', cls.horario_fijo)
+        cls.empleado_comida = crear_empleado('EMP002', cls.horario_comida)
+
+    def checar(self, empleado, hora):
+        ahora = datetime(2025, 3, 4, hora.hour, hora.minute, tzinfo=ZONA)
+        empleado = cargar_empleado_checkin(ahora.date(), pk=empleado.pk)
+        return registrar_checada(empleado, ahora)
+
+    def test_entrada_con_retardo_se_calcula_antes_de_insertar(self):
+        resultado = self.checar(self.empleado, time(9, 40))
+
+        asistencia = Asistencia.objects.get(pk=resultado['asistencia'].pk)
+        self.assertEqual(asistencia.tipo_movimiento, TipoMovimiento.ENTRADA)
+        self.assertTrue(asistencia.retardo)
+        self.assertEqual(asistencia.minutos_retardo, 40)
+        self.assertIn('Checada #1', resultado['mensaje'])
+
+    def test_secuencia_sin_comida_alterna_entrada_y_salida(self):
+        tipos = [self.checar(self.empleado, time(9, m))['asistencia'].tipo_movimiento for m in range(3)]
+        self.assertEqual(tipos, [TipoMovimiento.ENTRADA, TipoMovimiento.SALIDA, TipoMovimiento.ENTRADA])
+
+    def test_salida_a_comida_fuera_de_horario_se_rechaza(self):
+        self.checar(self.empleado_comida, time(9, 0))
+        resultado = self.checar(self.empleado_comida, time(11, 0))
+
+        self.assertIsNone(resultado['asistencia'])
+        self.assertIn('fuera del horario permitido', resultado['error'])
+        self.assertEqual(Asistencia.objects.filter(empleado=self.empleado_comida).count(), 1)
+
+    def test_permiso_de_dia_completo_genera_aviso(self):
+        SolicitudPermiso.objects.create(
+            empleado=self.empleado,
+            tipo_permiso=TipoPermiso.objects.create(nombre='Personal'),
+            tipo_ausencia=TipoAusencia.DIAS_COMPLETOS,
+            fecha_inicio=date(2025, 3, 4),
+            fecha_fin=date(2025, 3, 4),
+            motivo='Trámite',
+            estado=EstadoSolicitud.APROBADO_JEFE
+        )
+        resultado = self.checar(self.empleado, time(9, 0))
+
+        self.assertEqual(resultado['avisos'][0][0], 'warning')
+        self.assertIn('Personal', resultado['avisos'][0][1])
+
+    @override_settings(CHECKIN_ANTIRREBOTE_SEGUNDOS=0)
+    def test_checada_desde_tablet_usa_tres_consultas(self):
+        # Regresión: la identidad sale de la caché de QR; una consulta para el estado del día,
+        # un solo INSERT y el upsert del resumen diario (más el SAVEPOINT y su RELEASE que
+        # permiten reintentar si otra tablet ganó la secuencia). La primera checada del día
+        # además resuelve el horario esperado; las siguientes lo toman del resumen
+        calentar_cache_qr()
+        with self.assertNumQueries(6):
+            response = self.client.post('/', {'qr_code': str(self.empleado.qr_uuid)})
+        self.assertEqual(response.status_code, 302)
+
+        with self.assertNumQueries(5):
+            self.client.post('/', {'qr_code': str(self.empleado.qr_uuid)})
+        self.assertEqual(
+            list(Asistencia.objects.filter(empleado=self.empleado).order_by('pk').values_list('tipo_movimiento', flat=True)),
+            [TipoMovimiento.ENTRADA, TipoMovimiento.SALIDA]
+        )
+
+    def test_api_de_checkin_responde_json_sin_redirigir(self):
+        calentar_cache_qr()
+        with self.assertNumQueries(6):
+            response = self.client.post('/checkin/api/', {'qr_code': str(self.empleado.qr_uuid)})
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertTrue(datos['ok'])
+        self.assertEqual(datos['tipo'], 'empleado')
+        self.assertEqual(datos['movimiento'], TipoMovimiento.ENTRADA)
+        self.assertIn('Empleado EMP001', datos['mensaje'])
+        self.assertNotIn('messages', response.cookies)
+
+        response = self.client.post('/checkin/api/', {'qr_code': str(uuid.uuid4())})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.json()['ok'])
+
+    def test_dos_tablets_con_el_mismo_estado_no_duplican_la_entrada(self):
+        ahora = datetime(2025, 3, 4, 9, 0, tzinfo=ZONA)
+        # Las dos tablets leen el día antes de que cualquiera inserte
+        tablet_1 = cargar_empleado_checkin(ahora.date(), pk=self.empleado.pk)
+        tablet_2 = cargar_empleado_checkin(ahora.date(), pk=self.empleado.pk)
+
+        self.assertIsNotNone(registrar_checada(tablet_1, ahora)['asistencia'])
+        # La segunda pierde la secuencia, vuelve a leer y queda como escaneo repetido
+        resultado = registrar_checada(tablet_2, ahora + timedelta(seconds=5))
+        self.assertTrue(resultado['repetida'])
+        self.assertIsNone(resultado['asistencia'])
+        self.assertIn('Entrada ya registrada', resultado['mensaje'])
+
+        # Fuera de la ventana de antirrebote la segunda lectura decide el movimiento siguiente
+        tablet_3 = cargar_empleado_checkin(ahora.date(), pk=self.empleado.pk)
+        self.checar(self.empleado, time(9, 5))
+        resultado = registrar_checada(tablet_3, ahora + timedelta(minutes=10))
+        self.assertEqual(resultado['asistencia'].tipo_movimiento, TipoMovimiento.ENTRADA)
+        self.assertEqual(
+            list(Asistencia.objects.order_by('secuencia').values_list('secuencia', 'tipo_movimiento')),
+            [(1, TipoMovimiento.ENTRADA), (2, TipoMovimiento.SALIDA), (3, TipoMovimiento.ENTRADA)]
+        )
+
+    @override_settings(CHECKIN_LOTE_MAX_HORAS=10 ** 6)
+    def test_lote_sin_conexion_es_idempotente_y_conserva_la_hora(self):
+        escaneos = [
+            {'qr_code': str(self.empleado.qr_uuid), 'timestamp': '2025-03-04T18:05:00-06:00', 'dispositivo': 'tablet-1', 'nonce': 'b'},
+            {'qr_code': str(self.empleado.qr_uuid), 'timestamp': '2025-03-04T09:40:00-06:00', 'dispositivo': 'tablet-1', 'nonce': 'a'},
+            {'qr_code': str(self.empleado.qr_uuid), 'timestamp': '2025-03-04T09:40:00-06:00', 'dispositivo': 'tablet-1', 'nonce': 'a'},
+            {'qr_code': str(uuid.uuid4()), 'timestamp': '2025-03-04T09:00:00-06:00', 'nonce': 'c'},
+            {'qr_code': str(self.empleado_comida.qr_uuid), 'timestamp': '2025-03-04T09:00:00-06:00'},
+        ]
+        response = self.client.post('/checkin/api/lote/', {'escaneos': escaneos}, content_type='application/json')
+        resultados = response.json()['resultados']
+
+        self.assertEqual([r['estado'] for r in resultados], ['registrado', 'registrado', 'duplicado', 'rechazado', 'rechazado'])
+        # Se aplican en orden de hora aunque lleguen desordenados
+        self.assertEqual([r['movimiento'] for r in resultados[:3]], [TipoMovimiento.SALIDA, TipoMovimiento.ENTRADA, TipoMovimiento.ENTRADA])
+        self.assertTrue(resultados[1]['retardo'])
+        self.assertEqual(resultados[1]['minutos_retardo'], 40)
+        self.assertEqual(
+            list(Asistencia.objects.order_by('hora').values_list('hora', 'dispositivo')),
+            [(time(9, 40), 'tablet-1'), (time(18, 5), 'tablet-1')]
+        )
+        resumen = ResumenDiarioAsistencia.objects.get(empleado=self.empleado, fecha=date(2025, 3, 4))
+        self.assertEqual((resumen.checadas, resumen.primera_entrada, resumen.minutos_retardo), (2, time(9, 40), 40))
+
+        # Reenviar el lote (p. ej. se perdió la respuesta) no duplica checadas
+        response = self.client.post('/checkin/api/lote/', {'escaneos': escaneos[:3]}, content_type='application/json')
+        self.assertEqual([r['estado'] for r in response.json()['resultados']], ['duplicado'] * 3)
+        self.assertEqual(Asistencia.objects.count(), 2)
+
+    @override_settings(CHECKIN_LOTE_MAX_HORAS=10 ** 6)
+    def test_lote_rechaza_escaneos_invalidos_o_tardios_uno_por_uno(self):
+        calentar_cache_qr()
+        self.checar(self.empleado, time(10, 0))
+        # Baja hecha en otro worker: la foto en caché sigue diciendo activo
+        Empleado.objects.filter(pk=self.empleado_comida.pk).update(activo=False)
+        escaneos = [
+            {'qr_code': str(self.empleado.qr_uuid), 'timestamp': '2025-03-04T09:30:00-06:00', 'nonce': 'tarde'},
+            {'qr_code': str(self.empleado.qr_uuid), 'timestamp': '2025-13-45T09:00:00-06:00', 'nonce': 'fecha'},
+            {'qr_code': str(self.empleado_comida.qr_uuid), 'timestamp': '2025-03-04T09:00:00-06:00', 'nonce': 'baja'},
+            {'qr_code': str(self.empleado.qr_uuid), 'timestamp': '2025-03-04T18:00:00-06:00', 'nonce': 'salida'},
+        ]
+        with self.assertLogs('attendance.checkin', 'WARNING'):
+            response = self.client.post('/checkin/api/lote/', {'escaneos': escaneos}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        resultados = response.json()['resultados']
+
+        self.assertEqual([r['estado'] for r in resultados], ['rechazado', 'rechazado', 'rechazado', 'registrado'])
+        self.assertIn('capturarse manualmente', resultados[0]['error'])
+        self.assertEqual(resultados[1]['error'], 'Hora del escaneo inválida')
+        self.assertEqual(resultados[2]['error'], 'Código QR no válido')
+        # La entrada de las 10:00 conserva su tipo
+        self.assertEqual(
+            list(Asistencia.objects.order_by('hora').values_list('hora', 'tipo_movimiento')),
+            [(time(10, 0), TipoMovimiento.ENTRADA), (time(18, 0), TipoMovimiento.SALIDA)]
+        )
+
+    def test_qr_invalido_o_inactivo_se_rechaza(self):
+        inactivo = crear_empleado('EMP003', self.horario_fijo, activo=False)
+        calentar_cache_qr()
+        with self.assertNumQueries(0):
+            self.client.post('/checkin/', {'qr_code': 'no-es-un-qr'})
+        # Un UUID desconocido puede ser un alta hecha en otro worker y un inactivo, una
+        # reactivación: se confirman con una consulta
+        with self.assertNumQueries(1):
+            self.client.post('/checkin/', {'qr_code': str(uuid.uuid4())})
+        with self.assertNumQueries(1):
+            self.client.post('/checkin/', {'qr_code': str(inactivo.qr_uuid)})
+        self.assertFalse(Asistencia.objects.exists())
+
+    @override_settings(CHECKIN_ANTIRREBOTE_SEGUNDOS=0)
+    def test_foto_vieja_de_otro_worker_se_valida_al_registrar(self):
+        calentar_cache_qr()
+        qr = str(self.empleado.qr_uuid)
+        # update() no dispara señales, como un cambio hecho en otro worker
+        Empleado.objects.filter(pk=self.empleado.pk).update(activo=False)
+        response = self.client.post('/checkin/api/', {'qr_code': qr})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Asistencia.objects.exists())
+        self.assertFalse(empleado_por_qr(qr).activo)
+
+        Empleado.objects.filter(pk=self.empleado.pk).update(activo=True)
+        response = self.client.post('/checkin/api/', {'qr_code': qr})
+        self.assertTrue(response.json()['ok'])
+        self.assertIn('Empleado EMP001', response.json()['mensaje'])
+
+    def test_cache_qr_se_invalida_al_cambiar_empleado_o_usuario(self):
+        calentar_cache_qr()
+        self.assertEqual(empleado_por_qr(str(self.empleado.qr_uuid)).nombre, 'Empleado EMP001')
+
+        self.empleado.user.first_name = 'Ana'
+        self.empleado.user.save()
+        self.assertEqual(empleado_por_qr(str(self.empleado.qr_uuid)).nombre, 'Ana EMP001')
+
+        # El login solo actualiza last_login y conserva la caché
+        self.empleado.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            empleado_por_qr(str(self.empleado.qr_uuid))
+
+        self.empleado.activo = False
+        self.empleado.save()
+        self.assertFalse(empleado_por_qr(str(self.empleado.qr_uuid)).activo)
+
+    def test_checadas_mantienen_resumen_igual_al_reconciliado(self):
+        # Turno asignado para el día: ambos caminos resuelven el horario igual
+        AsignacionTurnoDiaria.objects.create(
+            empleado=self.empleado_comida, fecha=date(2025, 3, 4), hora_entrada=time(9, 30), hora_salida=time(18, 0)
+        )
+        for hora in (time(9, 40), time(14, 30), time(15, 15), time(18, 5)):
+            self.checar(self.empleado_comida, hora)
+
+        campos = [f.name for f in ResumenDiarioAsistencia._meta.fields if f.name not in ('id', 'actualizado')]
+        incremental = ResumenDiarioAsistencia.objects.filter(empleado=self.empleado_comida).values(*campos).get()
+        self.assertEqual(incremental['checadas'], 4)
+        self.assertTrue(incremental['retardo'])
+        self.assertEqual(incremental['minutos_retardo'], 40)
+
+        ResumenDiarioAsistencia.objects.all().delete()
+        reconciliar_resumenes(date(2025, 3, 4), date(2025, 3, 4), empleados=[self.empleado_comida])
+        reconciliado = ResumenDiarioAsistencia.objects.filter(empleado=self.empleado_comida).values(*campos).get()
+        self.assertEqual(incremental, reconciliado)
+        self.assertEqual(reconciliado['hora_entrada_esperada'], time(9, 30))
+
+    def test_dias_anteriores_al_primer_resumen_se_completan(self):
+        Asistencia.objects.create(empleado=self.empleado, fecha=date(2025, 2, 27), tipo_movimiento=TipoMovimiento.ENTRADA)
+        self.checar(self.empleado, time(9, 0))
+
+        # Del 27 de febrero al 3 de marzo para los dos empleados activos
+        self.assertEqual(completar_resumenes_historicos(), 10)
+        resumen = ResumenDiarioAsistencia.objects.get(empleado=self.empleado, fecha=date(2025, 2, 27))
+        self.assertEqual(resumen.checadas, 1)
+        with self.assertNumQueries(2):
+            self.assertEqual(completar_resumenes_historicos(), 0)
+
+    def test_checadas_sin_resumen_recalculan_el_dia(self):
+        # Checada capturada por otra vía: el resumen no la refleja y se recalcula el día completo
+        Asistencia.objects.create(empleado=self.empleado, fecha=date(2025, 3, 4), tipo_movimiento=TipoMovimiento.ENTRADA)
+        self.checar(self.empleado, time(18, 0))
+
+        resumen = ResumenDiarioAsistencia.objects.get(empleado=self.empleado, fecha=date(2025, 3, 4))
+        self.assertEqual(resumen.checadas, 2)
+        self.assertIsNotNone(resumen.primera_entrada)
+        self.assertIsNotNone(resumen.ultima_salida)
+
+
+class CacheHorariosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.personalizado = TipoHorario.objects.create(
+            nombre='Sábados medio día', tipo_sistema=TipoSistemaHorario.PERSONALIZADO,
+            hora_entrada=time(9, 0), hora_salida=time(18, 0)
+        )
+        HorarioDiaSemana.objects.create(
+            tipo_horario=cls.personalizado, dia_semana=5, hora_entrada=time(8, 0), hora_salida=time(13, 0)
+        )
+        cls.rotativo = TipoHorario.objects.create(nombre='Rotativo', tipo_sistema=TipoSistemaHorario.ROTATIVO)
+        cls.turno_noche = TurnoRotativo.objects.create(
+            tipo_horario=cls.rotativo, nombre='Noche', hora_entrada=time(22, 0), hora_salida=time(6, 0), orden_en_ciclo=1
+        )
+        cls.empleado = crear_empleado('EMP010', cls.personalizado)
+        cls.empleado_rotativo = crear_empleado('EMP011', cls.rotativo)
+
+    def setUp(self):
+        limpiar_cache_horarios()
+
+    def test_horario_por_dia_se_consulta_una_sola_vez(self):
+        sabado = date(2025, 3, 8)
+        with self.assertNumQueries(1):
+            obtener_horario_esperado(self.empleado, sabado)
+        with self.assertNumQueries(0):
+            horario = obtener_horario_esperado(self.empleado, sabado)
+        self.assertEqual(horario['hora_entrada'], time(8, 0))
+
+    def test_guardar_horario_por_dia_invalida_la_cache(self):
+        sabado = date(2025, 3, 8)
+        obtener_horario_esperado(self.empleado, sabado)
+
+        HorarioDiaSemana.objects.filter(tipo_horario=self.personalizado).get().delete()
+
+        horario = obtener_horario_esperado(self.empleado, sabado)
+        self.assertEqual(horario['hora_entrada'], time(9, 0))
+
+    def test_asignacion_rotativa_invalida_la_cache(self):
+        fecha = date(2025, 3, 10)
+        self.assertFalse(obtener_horario_esperado(self.empleado_rotativo, fecha)['es_dia_laboral'])
+
+        AsignacionTurnoRotativo.objects.create(
+            empleado=self.empleado_rotativo, turno_rotativo=self.turno_noche,
+            fecha_inicio=date(2025, 3, 1), fecha_fin=date(2025, 3, 31)
+        )
+
+        with self.assertNumQueries(1):
+            horario = obtener_horario_esperado(self.empleado_rotativo, fecha)
+        self.assertTrue(horario['es_dia_laboral'])
+        self.assertEqual(horario['hora_entrada'], time(22, 0))
+
+    def test_cache_lru_desaloja_la_entrada_menos_usada(self):
+        cache = CacheLRU(tamano_maximo=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+
+class HorariosMasivosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fijo = TipoHorario.objects.create(nombre='Fijo', hora_entrada=time(9, 0), hora_salida=time(18, 0))
+        cls.turno_24h = TipoHorario.objects.create(
+            nombre='24x24', tipo_sistema=TipoSistemaHorario.TURNO_24H, es_turno_24h=True, hora_entrada=time(8, 0)
+        )
+        cls.personalizado = TipoHorario.objects.create(
+            nombre='Personalizado', tipo_sistema=TipoSistemaHorario.PERSONALIZADO, hora_entrada=time(9, 0)
+        )
+        HorarioDiaSemana.objects.create(
+            tipo_horario=cls.personalizado, dia_semana=5, hora_entrada=time(8, 0), hora_salida=time(13, 0)
+        )
+        rotativo = TipoHorario.objects.create(nombre='Rotativo', tipo_sistema=TipoSistemaHorario.ROTATIVO)
+        cls.turno = TurnoRotativo.objects.create(
+            tipo_horario=rotativo, nombre='Tarde', hora_entrada=time(14, 0), hora_salida=time(22, 0), orden_en_ciclo=1
+        )
+
+        cls.empleado_fijo = crear_empleado('EMP020', cls.fijo)
+        cls.empleado_24h = crear_empleado('EMP021', cls.turno_24h)
+        cls.empleado_personalizado = crear_empleado('EMP022', cls.personalizado)
+        cls.empleado_rotativo = crear_empleado('EMP023', rotativo)
+        AsignacionTurnoRotativo.objects.create(
+            empleado=cls.empleado_rotativo, turno_rotativo=cls.turno,
+            fecha_inicio=date(2025, 3, 3), fecha_fin=date(2025, 3, 9)
+        )
+        # Última entrada del 24x24 antes del periodo: trabaja los días pares desde el 28 de febrero
+        Asistencia.objects.create(
+            empleado=cls.empleado_24h, fecha=date(2025, 2, 28), tipo_movimiento=TipoMovimiento.ENTRADA
+        )
+
+    def setUp(self):
+        limpiar_cache_horarios()
+
+    def resolver(self):
+        return obtener_horarios_esperados(Empleado.objects.all(), date(2025, 3, 1), date(2025, 3, 31))
+
+    def test_dias_laborales_por_tipo_de_sistema(self):
+        horarios = self.resolver()
+
+        self.assertEqual(horarios.dias_laborales(self.empleado_fijo.id), 21)
+        self.assertEqual(horarios.dias_laborales(self.empleado_24h.id), 15)
+        self.assertTrue(horarios.es_dia_laboral(self.empleado_24h.id, date(2025, 3, 2)))
+        self.assertFalse(horarios.es_dia_laboral(self.empleado_24h.id, date(2025, 3, 3)))
+        # 21 días de lunes a viernes + 5 sábados configurados
+        self.assertEqual(horarios.dias_laborales(self.empleado_personalizado.id), 26)
+        self.assertEqual(horarios.hora_entrada(self.empleado_personalizado.id, date(2025, 3, 8)), time(8, 0))
+        self.assertEqual(horarios.dias_laborales(self.empleado_rotativo.id), 7)
+        self.assertEqual(horarios.hora_entrada(self.empleado_rotativo.id, date(2025, 3, 5)), time(14, 0))
+
+    def test_coincide_con_obtener_horario_esperado(self):
+        horarios = self.resolver()
+        for empleado in Empleado.objects.select_related('tipo_horario').exclude(pk=self.empleado_24h.pk):
+            for dia in range(1, 32):
+                fecha = date(2025, 3, dia)
+                esperado = obtener_horario_esperado(empleado, fecha)
+                celda = horarios.horario(empleado.id, fecha)
+                self.assertEqual(celda['es_dia_laboral'], esperado['es_dia_laboral'], (empleado, fecha))
+                self.assertEqual(celda['hora_entrada'], esperado['hora_entrada'], (empleado, fecha))
+
+    def test_asignacion_diaria_tiene_prioridad(self):
+        AsignacionTurnoDiaria.objects.create(empleado=self.empleado_fijo, fecha=date(2025, 3, 3), es_descanso=True)
+        AsignacionTurnoDiaria.objects.create(
+            empleado=self.empleado_fijo, fecha=date(2025, 3, 8), hora_entrada=time(7, 0), hora_salida=time(15, 0)
+        )
+        horarios = self.resolver()
+
+        self.assertFalse(horarios.es_dia_laboral(self.empleado_fijo.id, date(2025, 3, 3)))
+        self.assertTrue(horarios.es_dia_laboral(self.empleado_fijo.id, date(2025, 3, 8)))
+        self.assertEqual(horarios.hora_entrada(self.empleado_fijo.id, date(2025, 3, 8)), time(7, 0))
+        self.assertEqual(horarios.dias_laborales(self.empleado_fijo.id), 21)
+
+    def test_numero_de_consultas_no_depende_de_empleados(self):
+        # empleados + horarios por día + rotativos + anclas 24x24 + asignaciones diarias
+        with self.assertNumQueries(5):
+            self.resolver()
+        for i in range(10):
+            crear_empleado(f'EMP1{i:02d}', self.personalizado)
+        with self.assertNumQueries(5):
+            self.resolver()
+
+
+class ReporteMensualTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fijo = TipoHorario.objects.create(nombre='Fijo', hora_entrada=time(9, 0), hora_salida=time(18, 0))
+        cls.puntual = crear_empleado('EMP030', cls.fijo)
+        cls.impuntual = crear_empleado('EMP031', cls.fijo)
+        for dia in (3, 4, 5):
+            Asistencia.objects.create(
+                empleado=cls.puntual, fecha=date(2025, 3, dia), tipo_movimiento=TipoMovimiento.ENTRADA
+            )
+            Asistencia.objects.create(
+                empleado=cls.puntual, fecha=date(2025, 3, dia), tipo_movimiento=TipoMovimiento.SALIDA
+            )
+        Asistencia.objects.create(
+            empleado=cls.impuntual, fecha=date(2025, 3, 3), tipo_movimiento=TipoMovimiento.ENTRADA,
+            retardo=True, minutos_retardo=20
+        )
+        tipo_permiso = TipoPermiso.objects.create(nombre='Personal')
+        SolicitudPermiso.objects.create(
+            empleado=cls.impuntual, tipo_permiso=tipo_permiso, tipo_ausencia=TipoAusencia.DIAS_COMPLETOS,
+            fecha_inicio=date(2025, 3, 4), fecha_fin=date(2025, 3, 4), motivo='Trámite',
+            estado=EstadoSolicitud.APROBADO_JEFE
+        )
+        reconciliar_resumenes(date(2025, 3, 1), date(2025, 3, 31))
+
+    def setUp(self):
+        limpiar_cache_horarios()
+        # Los reportes cacheados se guardan en una carpeta temporal (sin Spaces en pruebas)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_resumen_agrupado_por_empleado(self):
+        resumen = {
+            fila['empleado'].id: fila
+            for fila in resumen_asistencias_por_empleado(
+                Empleado.objects.all(), date(2025, 3, 1), date(2025, 3, 31)
+            )
+        }
+
+        self.assertEqual(resumen[self.puntual.id]['dias_asistidos'], 3)
+        self.assertEqual(resumen[self.puntual.id]['retardos'], 0)
+        self.assertEqual(resumen[self.puntual.id]['faltas'], 18)
+        self.assertEqual(resumen[self.impuntual.id]['retardos'], 1)
+        self.assertEqual(resumen[self.impuntual.id]['minutos_retardo'], 20)
+        self.assertEqual(resumen[self.impuntual.id]['permisos'], 1)
+        self.assertEqual(resumen[self.impuntual.id]['faltas'], 19)
+
+    def test_excel_mensual_no_consulta_por_empleado(self):
+        with CaptureQueriesContext(connection) as inicial:
+            generar_excel_reporte_mensual(3, 2025)
+        for i in range(10):
+            empleado = crear_empleado(f'EMP2{i:02d}', self.fijo)
+            Asistencia.objects.create(empleado=empleado, fecha=date(2025, 3, 3), tipo_movimiento=TipoMovimiento.ENTRADA)
+        limpiar_cache_horarios()
+        with self.assertNumQueries(len(inicial)):
+            generar_excel_reporte_mensual(3, 2025)
+
+    def test_excel_semanal_una_fila_por_empleado_y_dia(self):
+        with self.assertNumQueries(1):
+            buffer = generar_excel_reporte_semanal(date(2025, 3, 3), date(2025, 3, 7))
+        ws = load_workbook(buffer)['Reporte Semanal']
+        filas = list(ws.iter_rows(min_row=5, values_only=True))
+
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas[0][:3], ('03/03/2025', 'Empleado EMP030', 'EMP030'))
+        self.assertEqual(filas[1][1], 'Empleado EMP031')
+        self.assertIn('Retardo: 20 min', filas[1][4])
+        self.assertIsNotNone(filas[0][7])
+        self.assertEqual(ws['E4'].style, 'encabezado_3B82F6_12')
+
+    def test_excel_mensual_incluye_detalle(self):
+        ws = load_workbook(generar_excel_reporte_mensual(3, 2025))['Detalle de Asistencias']
+        filas = list(ws.iter_rows(min_row=4, values_only=True))
+
+        self.assertEqual(len(filas), 7)
+        self.assertEqual(filas[0][3], 'Entrada')
+        self.assertEqual(ws['A4'].style, 'celda')
+
+    def test_filas_por_departamento_intercaladas_igual_que_en_serie(self):
+        ventas = Departamento.objects.create(nombre='Ventas', email='ventas@example.com')
+        Empleado.objects.filter(pk=self.impuntual.pk).update(departamento=ventas)
+        # Departamento con solo empleados dados de baja: sus checadas del periodo siguen en el detalle
+        bajas = Departamento.objects.create(nombre='Bajas', email='bajas@example.com')
+        dado_de_baja = crear_empleado('EMP033', self.fijo, activo=False, departamento=bajas)
+        Asistencia.objects.create(empleado=dado_de_baja, fecha=date(2025, 3, 4), tipo_movimiento=TipoMovimiento.ENTRADA)
+        particiones = particiones_por_departamento()
+        self.assertCountEqual(particiones, [[None], [ventas.pk], [bajas.pk]])
+
+        for funcion in (filas_reporte_semanal, filas_detalle_mensual):
+            serie = list(funcion(date(2025, 3, 1), date(2025, 3, 31), departamentos=None))
+            partes = [list(funcion(date(2025, 3, 1), date(2025, 3, 31), departamentos=p)) for p in particiones]
+            self.assertEqual(list(heapq.merge(*partes, key=itemgetter(0))), serie)
+            # Dentro de una transacción (como en las pruebas) no se abre el pool
+            self.assertEqual(
+                list(filas_por_departamento(funcion, date(2025, 3, 1), date(2025, 3, 31), procesos=4)),
+                [fila for _, fila in serie]
+            )
+
+    def test_exportar_excel_encola_y_descarga_al_terminar(self):
+        response = self.client.get('/reporte/mensual/3/2025/?formato=excel')
+        self.assertEqual(response.status_code, 202)
+        tarea = response.json()
+        self.assertEqual(tarea['estado'], EstadoTarea.PENDIENTE)
+        self.assertEqual(self.client.get(tarea['estado_url']).json()['progreso'], 0)
+        self.assertEqual(self.client.get(f"/reporte/tareas/{tarea['id']}/descarga/").status_code, 409)
+
+        self.assertEqual(procesar_tareas(), 1)
+        estado = self.client.get(tarea['estado_url']).json()
+        self.assertEqual(estado['estado'], EstadoTarea.TERMINADA)
+        self.assertEqual(estado['progreso'], 100)
+
+        response = self.client.get(estado['descarga_url'])
+        self.assertTrue(response.streaming)
+        self.assertIn('reporte_mensual_2025_03.xlsx', response['Content-Disposition'])
+        contenido = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(contenido))
+        self.assertIn('Resumen', load_workbook(BytesIO(contenido)).sheetnames)
+
+    def test_tarea_encolada_la_termina_el_trabajador_desplegado(self):
+        # El consumidor de la cola es el proceso worker de App Platform, no la vista
+        with open(settings.BASE_DIR / '.do' / 'app.yaml', encoding='utf-8') as f:
+            comandos = re.findall(r'run_command: python manage.py (\S+)', f.read())
+        self.assertIn('procesar_tareas_reporte', comandos)
+
+        tarea = self.client.get('/reporte/mensual/3/2025/?formato=excel').json()
+        call_command('procesar_tareas_reporte', '--una-vez', stdout=StringIO())
+        estado = self.client.get(tarea['estado_url']).json()
+        self.assertEqual(estado['estado'], EstadoTarea.TERMINADA)
+
+    def test_scheduler_sin_candado_no_arranca_jobs(self):
+        from .management.commands.run_scheduler import CANDADO, Command
+
+        scheduler = Command()
+        scheduler.propietario = 'scheduler-1'
+        job = mock.Mock(__name__='job_reconciliar_resumen_diario')
+        envoltura = scheduler.con_candado(job)
+        adquirir_candado(CANDADO, 'scheduler-1', 60)
+        envoltura()
+        self.assertEqual(job.call_count, 1)
+
+        # El candado venció y lo tomó otro scheduler mientras este seguía vivo
+        CandadoProceso.objects.filter(nombre=CANDADO).update(vence=timezone.now())
+        adquirir_candado(CANDADO, 'scheduler-2', 60)
+        with self.assertLogs('attendance.management.commands.run_scheduler', 'WARNING'):
+            envoltura()
+        self.assertEqual(job.call_count, 1)
+
+    def test_trabajador_desplegado_exige_storage_compartido(self):
+        # Web y worker son contenedores distintos: el archivo debe quedar en Spaces
+        with open(settings.BASE_DIR / '.do' / 'app.yaml', encoding='utf-8') as f:
+            variables = set(re.findall(r'- key: (\S+)', f.read()))
+        self.assertLessEqual({'SPACES_KEY', 'SPACES_SECRET', 'SPACES_BUCKET', 'REPORTES_STORAGE_COMPARTIDO'}, variables)
+
+        encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': 3, 'anio': 2025})
+        with override_settings(USE_SPACES=False, REPORTES_STORAGE_COMPARTIDO=True):
+            with self.assertRaises(ImproperlyConfigured):
+                call_command('procesar_tareas_reporte', '--una-vez', stdout=StringIO())
+        self.assertEqual(TareaReporte.objects.get().estado, EstadoTarea.PENDIENTE)
+
+    def test_descarga_repetida_sirve_el_archivo_guardado(self):
+        self.client.get('/reporte/mensual/3/2025/?formato=excel')
+        procesar_tareas()
+        primera = b''.join(self.client.get(f'/reporte/tareas/{TareaReporte.objects.get().pk}/descarga/').streaming_content)
+
+        # Solo se consulta la versión del mes; el reporte no se vuelve a generar ni se encola
+        with self.assertNumQueries(1):
+            response = self.client.get('/reporte/mensual/3/2025/?formato=excel')
+        self.assertEqual(b''.join(response.streaming_content), primera)
+
+    def test_tarea_se_reclama_una_sola_vez(self):
+        tarea = encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': 3, 'anio': 2025})
+        self.assertEqual(encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': 3, 'anio': 2025}), tarea)
+
+        self.assertEqual(reclamar_tarea('trabajador-1'), tarea)
+        self.assertIsNone(reclamar_tarea('trabajador-2'))
+        self.assertEqual(TareaReporte.objects.get().trabajador, 'trabajador-1')
+
+    def test_tarea_cuyo_trabajador_muere_en_cada_intento_se_cierra(self):
+        tarea = encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': 3, 'anio': 2025})
+        abandonada = timezone.now() - timedelta(seconds=settings.TAREAS_REPORTE_TIEMPO_MAXIMO + 1)
+        for intento in range(3):
+            # Mientras le queden intentos sigue siendo la tarea en cola
+            self.assertEqual(encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': 3, 'anio': 2025}), tarea)
+            self.assertEqual(reclamar_tarea(f'trabajador-{intento}'), tarea)
+            # El trabajador muere sin terminarla
+            TareaReporte.objects.filter(pk=tarea.pk).update(iniciada=abandonada)
+
+        with self.assertLogs('attendance.tareas', level='WARNING'):
+            nueva = encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': 3, 'anio': 2025})
+        self.assertNotEqual(nueva, tarea)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, EstadoTarea.ERROR)
+        self.assertTrue(self.client.get(f'/reporte/tareas/{tarea.pk}/').json()['error'])
+        self.assertEqual(procesar_tareas(), 1)
+
+    def test_tarea_con_error_queda_registrada(self):
+        encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': 13, 'anio': 2025})
+        with self.assertLogs('attendance.tareas', level='ERROR'):
+            procesar_tareas()
+
+        tarea = TareaReporte.objects.get()
+        self.assertEqual(tarea.estado, EstadoTarea.ERROR)
+        self.assertTrue(tarea.error)
+
+    def test_cambios_del_mes_generan_otra_version_del_archivo(self):
+        periodo = periodo_mes(2025, 3)
+        generar = lambda destino: generar_excel_reporte_mensual(3, 2025, destino=destino)
+        storage, anterior = obtener_artefacto('mensual', periodo, 'xlsx', generar)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Asistencia.objects.create(empleado=self.puntual, fecha=date(2025, 3, 6), tipo_movimiento=TipoMovimiento.ENTRADA)
+        _, nuevo = obtener_artefacto('mensual', periodo, 'xlsx', generar)
+
+        self.assertNotEqual(nuevo, anterior)
+        self.assertFalse(storage.exists(anterior))
+        hoy = timezone.localdate()
+        self.assertIsNone(obtener_artefacto('mensual', periodo_mes(hoy.year, hoy.month), 'xlsx', generar))
+
+    def test_cambios_de_empleados_o_departamentos_generan_otra_version(self):
+        periodo = periodo_mes(2025, 3)
+        generar = lambda destino: generar_excel_reporte_mensual(3, 2025, destino=destino)
+        _, anterior = obtener_artefacto('mensual', periodo, 'xlsx', generar)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.puntual.user.first_name = 'Ana'
+            self.puntual.user.save()
+            self.puntual.departamento = Departamento.objects.create(nombre='Ventas')
+            self.puntual.save()
+        # Un solo UPDATE para todo el lote de cambios
+        self.assertEqual(len(callbacks), 1)
+        _, renombrado = obtener_artefacto('mensual', periodo, 'xlsx', generar)
+        self.assertNotEqual(renombrado, anterior)
+        ws = load_workbook(BytesIO(b''.join(
+            self.client.get('/reporte/mensual/3/2025/?formato=excel').streaming_content
+        )))['Resumen']
+        self.assertIn('Ana EMP030', [celda.value for celda in ws['A']])
+
+    def test_cambios_de_horario_generan_otra_version(self):
+        periodo = periodo_mes(2025, 3)
+        generar = lambda destino: generar_excel_reporte_mensual(3, 2025, destino=destino)
+        _, anterior = obtener_artefacto('mensual', periodo, 'xlsx', generar)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fijo.minutos_tolerancia = 30
+            self.fijo.save()
+        _, con_tolerancia = obtener_artefacto('mensual', periodo, 'xlsx', generar)
+        self.assertNotEqual(con_tolerancia, anterior)
+
+        # El turno de un día (editado desde la vista de asignaciones) solo toca su mes
+        with self.captureOnCommitCallbacks(execute=True):
+            AsignacionTurnoDiaria.objects.create(empleado=self.puntual, fecha=date(2025, 3, 5), es_descanso=True)
+        _, con_descanso = obtener_artefacto('mensual', periodo, 'xlsx', generar)
+        self.assertNotEqual(con_descanso, con_tolerancia)
+
+    def test_vista_mensual_agrega_en_una_consulta(self):
+        solo_salida = crear_empleado('EMP032', self.fijo)
+        Asistencia.objects.create(empleado=solo_salida, fecha=date(2025, 3, 3), tipo_movimiento=TipoMovimiento.SALIDA)
+        reconciliar_resumenes(date(2025, 3, 3), date(2025, 3, 3))
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/reporte/mensual/3/2025/')
+        filas = {fila['empleado'].codigo_empleado: fila for fila in response.context['empleados_data']}
+
+        self.assertEqual(filas['EMP030']['total_dias'], 3)
+        self.assertEqual(filas['EMP031']['retardos'], 1)
+        self.assertEqual(filas['EMP031']['total_minutos_retardo'], 20)
+        self.assertEqual(filas['EMP032']['total_dias'], 0)
+        self.assertEqual(filas['EMP032']['total_minutos_retardo'], 0)
+        self.assertEqual(response.context['total_retardos'], 1)
+
+    def test_mes_cerrado_se_lee_del_resumen_precalculado(self):
+        TiempoExtra.objects.create(empleado=self.puntual, fecha=date(2025, 3, 5), horas_extra=2, aprobado=True)
+        en_vivo = calcular_resumen_mensual(2025, 3)
+        construir_resumen_mensual(2025, 3)
+
+        with self.assertNumQueries(1):
+            precalculado = resumen_mensual_por_empleado(2025, 3)
+
+        self.assertEqual(precalculado, en_vivo)
+        self.assertEqual(precalculado[0]['horas_extra'], 2)
+        ws = load_workbook(generar_excel_reporte_mensual(3, 2025))['Resumen']
+        self.assertEqual(ws['I4'].value, 2)
+
+    def test_cambios_del_mes_invalidan_el_resumen(self):
+        construir_resumen_mensual(2025, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Justificante.objects.create(
+                empleado=self.puntual, tipo_justificante=TipoJustificante.objects.create(nombre='Médico'),
+                fecha_incidente=date(2025, 3, 6), motivo='Consulta'
+            )
+        self.assertFalse(CierreMensual.objects.get(anio=2025, mes=3).vigente)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Asistencia.objects.create(empleado=self.puntual, fecha=date(2025, 3, 6), tipo_movimiento=TipoMovimiento.ENTRADA)
+        construir_resumen_mensual(2025, 3)
+        self.assertTrue(CierreMensual.objects.get(anio=2025, mes=3).vigente)
+        self.assertEqual(resumen_mensual_por_empleado(2025, 3)[0]['dias_asistidos'], 4)
+
+    def test_borrado_en_bloque_invalida_con_una_consulta(self):
+        construir_resumen_mensual(2025, 3)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Asistencia.objects.filter(empleado=self.puntual).delete()
+
+        # Un UPDATE de los meses cerrados y una reconciliación por empleado
+        self.assertEqual(len(callbacks), 2)
+        self.assertFalse(CierreMensual.objects.get(anio=2025, mes=3).vigente)
+        self.assertFalse(ResumenDiarioAsistencia.objects.filter(empleado=self.puntual, checadas__gt=0).exists())
+
+    def test_ediciones_fuera_de_la_tablet_reconcilian_el_dia(self):
+        # Días de hace meses: el job nocturno solo recorre los últimos días
+        with self.captureOnCommitCallbacks(execute=True):
+            entrada = Asistencia.objects.get(empleado=self.impuntual, fecha=date(2025, 3, 3))
+            entrada.retardo, entrada.minutos_retardo = False, 0
+            entrada.save()
+        resumen = ResumenDiarioAsistencia.objects.get(empleado=self.impuntual, fecha=date(2025, 3, 3))
+        self.assertEqual((resumen.retardo, resumen.minutos_retardo), (False, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Justificante.objects.create(
+                empleado=self.impuntual, fecha_incidente=date(2025, 3, 6), motivo='Consulta',
+                tipo_justificante=TipoJustificante.objects.create(nombre='Médico', cancela_penalizacion=True),
+                estado=EstadoJustificante.APROBADO
+            )
+        resumen = ResumenDiarioAsistencia.objects.get(empleado=self.impuntual, fecha=date(2025, 3, 6))
+        self.assertEqual(resumen.ausencia, AusenciaDia.JUSTIFICANTE)
+
+        # La checada de la tablet ya actualizó su resumen: no se reconcilia otra vez
+        ahora = datetime(2025, 3, 7, 9, 0, tzinfo=ZONA)
+        with self.captureOnCommitCallbacks() as callbacks:
+            registrar_checada(cargar_empleado_checkin(ahora.date(), pk=self.puntual.pk), ahora)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_checadas_del_mes_en_curso_no_invalidan(self):
+        with self.assertNumQueries(0):
+            invalidar_resumenes_mensuales(timezone.localdate())
+
+
+class PeriodosTests(TestCase):
+
+    def test_rangos_semiabiertos(self):
+        febrero = periodo_mes(2024, 2)
+        self.assertEqual(febrero, (date(2024, 2, 1), date(2024, 3, 1)))
+        self.assertEqual(febrero.ultimo_dia, date(2024, 2, 29))
+        self.assertEqual(periodo_mes(2024, 12).fin, date(2025, 1, 1))
+        self.assertEqual(periodo_quincena(2025, 3, primera=True), (date(2025, 3, 1), date(2025, 3, 14)))
+        self.assertEqual(periodo_quincena(2025, 3, primera=False), (date(2025, 3, 14), date(2025, 4, 1)))
+        self.assertEqual(periodo_semana(date(2025, 3, 6)), (date(2025, 3, 3), date(2025, 3, 10)))
+        self.assertEqual(periodo_semana_iso(2025, 1), (date(2024, 12, 30), date(2025, 1, 6)))
+        self.assertNotIn(date(2025, 3, 10), periodo_semana(date(2025, 3, 6)))
+
+    def assertSinExtract(self, consultas):
+        for consulta in consultas:
+            self.assertNotIn('extract', consulta['sql'].lower(), consulta['sql'])
+
+    def test_reportes_mensuales_filtran_por_rango(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/reporte/mensual/3/2025/')
+            self.client.get('/turnos/asignacion/3/2025/')
+            generar_excel_reporte_mensual(3, 2025)
+            with tempfile.TemporaryDirectory() as ruta:
+                ConfiguracionSistema.objects.create(email_gerente='gerente@example.com', ruta_red_reportes=ruta)
+                generar_reporte_tiempo_extra_mensual()
+
+        self.assertTrue(any('"fecha" >=' in consulta['sql'] for consulta in consultas))
+        self.assertSinExtract(consultas)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Los planes se leen con el formato de EXPLAIN QUERY PLAN de SQLite')
+class IndicesTests(TestCase):
+    """Las consultas frecuentes deben resolverse con índices (SEARCH), nunca recorriendo la tabla (SCAN)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        horario = TipoHorario.objects.create(nombre='Fijo', hora_entrada=time(9, 0))
+        cls.empleados = [crear_empleado(f'EMP04{i}', horario) for i in range(5)]
+        for empleado in cls.empleados:
+            for dia in range(1, 11):
+                Asistencia.objects.create(
+                    empleado=empleado, fecha=date(2025, 3, dia), tipo_movimiento=TipoMovimiento.ENTRADA
+                )
+        departamento = Departamento.objects.create(nombre='Ventas', email='ventas@example.com')
+        cls.visitante = Visitante.objects.create(
+            nombre='Visitante', email='visitante@example.com', telefono='5555555555',
+            departamento_visita=departamento, motivo='Junta', fecha_visita=date(2025, 3, 4),
+            hora_visita=time(10, 0), qr_code='qr_visitantes/qr_visitante.png'
+        )
+        RegistroVisita.objects.create(visitante=cls.visitante)
+
+    def assertSinRecorridos(self, queryset):
+        plan = queryset.explain()
+        recorridos = [linea for linea in plan.splitlines() if ' SCAN ' in f' {linea} ']
+        self.assertEqual(recorridos, [], plan)
+
+    def test_checkin_usa_indices(self):
+        empleado = self.empleados[0]
+        self.assertSinRecorridos(
+            consulta_empleados_checkin(date(2025, 3, 4)).filter(qr_uuid=empleado.qr_uuid, activo=True)
+        )
+
+    def test_consultas_de_asistencia_usan_indices(self):
+        empleado = self.empleados[0]
+        consultas = [
+            # Dashboard y reporte diario
+            Asistencia.objects.filter(fecha=date(2025, 3, 4), tipo_movimiento=TipoMovimiento.ENTRADA),
+            # Racha de retardos de un empleado
+            Asistencia.objects.filter(
+                empleado=empleado, fecha__gte=date(2025, 3, 1), fecha__lte=date(2025, 3, 5),
+                tipo_movimiento=TipoMovimiento.ENTRADA, retardo=True
+            ),
+            # Última entrada previa de un turno 24x24
+            Asistencia.objects.filter(
+                empleado=empleado, tipo_movimiento=TipoMovimiento.ENTRADA, fecha__lt=date(2025, 3, 5)
+            ).order_by('-fecha', '-hora'),
+            # Detalle del reporte mensual
+            Asistencia.objects.filter(periodo_mes(2025, 3).filtro()).order_by('fecha', 'hora'),
+            # Resumen agrupado por empleado
+            Asistencia.objects.filter(
+                empleado_id__in=[e.id for e in self.empleados], tipo_movimiento=TipoMovimiento.ENTRADA,
+                fecha__gte=date(2025, 3, 1), fecha__lte=date(2025, 3, 31)
+            ).values('empleado').annotate(total=Count('id')),
+        ]
+        for queryset in consultas:
+            with self.subTest(sql=str(queryset.query)):
+                self.assertSinRecorridos(queryset)
+
+    def test_registro_de_visita_abierto_usa_indice(self):
+        self.assertSinRecorridos(RegistroVisita.objects.filter(visitante=self.visitante, hora_salida__isnull=True))
+
+
+class DashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.now().date()
+        cls.recurrente = crear_empleado('EMP050')
+        cls.ocasional = crear_empleado('EMP051')
+        cls.inactivo = crear_empleado('EMP052', activo=False)
+        for dias_atras, empleados in ((0, [cls.recurrente, cls.ocasional, cls.inactivo]),
+                                      (1, [cls.recurrente, cls.ocasional, cls.inactivo]),
+                                      (2, [cls.recurrente, cls.inactivo]),
+                                      (7, [cls.ocasional])):
+            for empleado in empleados:
+                Asistencia.objects.create(
+                    empleado=empleado, fecha=hoy - timedelta(days=dias_atras),
+                    tipo_movimiento=TipoMovimiento.ENTRADA, retardo=True, minutos_retardo=20
+                )
+                # Las salidas no cuentan como retardo aunque vengan marcadas
+                Asistencia.objects.create(
+                    empleado=empleado, fecha=hoy - timedelta(days=dias_atras),
+                    tipo_movimiento=TipoMovimiento.SALIDA, retardo=True
+                )
+        reconciliar_resumenes(hoy - timedelta(days=7), hoy)
+
+    def test_retardos_recurrentes_en_una_consulta(self):
+        hoy = timezone.now().date()
+        with self.assertNumQueries(1):
+            empleados = list(empleados_con_retardos(hoy - timedelta(days=5), hoy))
+
+        self.assertEqual([(e.codigo_empleado, e.retardos) for e in empleados], [('EMP050', 3)])
+
+    def test_dashboard_no_consulta_por_empleado(self):
+        with CaptureQueriesContext(connection) as inicial:
+            response = self.client.get('/dashboard/')
+        self.assertEqual([item['retardos'] for item in response.context['empleados_retardos']], [3])
+
+        for i in range(10):
+            crear_empleado(f'EMP3{i:02d}')
+        with self.assertNumQueries(len(inicial)):
+            self.client.get('/dashboard/')
+
+
+class ReportesDepartamentoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ConfiguracionSistema.objects.create(email_gerente='gerente@example.com')
+        horario = TipoHorario.objects.create(nombre='Fijo', hora_entrada=time(9, 0))
+        cls.ventas = Departamento.objects.create(nombre='Ventas', email='ventas@example.com')
+        cls.almacen = Departamento.objects.create(nombre='Almacén', email='almacen@example.com')
+        hoy = timezone.now().date()
+        for codigo, departamento in (('EMP070', cls.ventas), ('EMP071', cls.almacen), ('EMP072', None)):
+            empleado = crear_empleado(codigo, horario, departamento=departamento)
+            Asistencia.objects.create(
+                empleado=empleado, fecha=hoy, tipo_movimiento=TipoMovimiento.ENTRADA,
+                retardo=True, minutos_retardo=15
+            )
+        reconciliar_resumenes(hoy, hoy)
+
+    def setUp(self):
+        # El Excel adjunto se guarda en el storage de reportes mientras espera en la bandeja
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def assertCorreosPorDepartamento(self):
+        self.assertEqual([correo.to for correo in mail.outbox], [
+            ['gerente@example.com', 'zuly.becerra@loginco.com.mx'], ['ventas@example.com'], ['almacen@example.com']
+        ])
+        html_ventas = mail.outbox[1].alternatives[0][0]
+        self.assertIn('EMP070', html_ventas)
+        self.assertNotIn('EMP071', html_ventas)
+        self.assertNotIn('EMP072', html_ventas)
+        self.assertIn('EMP072', mail.outbox[0].alternatives[0][0])
+
+    def test_reporte_diario_por_departamento_en_una_conexion(self):
+        with mock.patch('attendance.correos.get_connection', wraps=get_connection) as conexion:
+            generar_reporte_diario()
+
+        conexion.assert_called_once()
+        self.assertCorreosPorDepartamento()
+
+    def test_reporte_semanal_por_departamento_en_una_conexion(self):
+        with mock.patch('attendance.correos.get_connection', wraps=get_connection) as conexion:
+            generar_reporte_semanal()
+
+        conexion.assert_called_once()
+        self.assertCorreosPorDepartamento()
+        self.assertEqual(len(mail.outbox[0].attachments), 1)
+        self.assertEqual(mail.outbox[1].attachments, [])
+
+    def test_reporte_quincenal_se_renderiza_con_la_plantilla_y_escapa(self):
+        User.objects.filter(username='EMP070').update(last_name='<b>Pérez</b>')
+        generar_reporte_quincenal(13)
+
+        html = mail.outbox[0].alternatives[0][0]
+        self.assertIn('Reporte de Asistencias - Primera Quincena', html)
+        self.assertIn('border-collapse: collapse', html)
+        self.assertIn('Empleado &lt;b&gt;Pérez&lt;/b&gt;', html)
+
+    @override_settings(REPORTES_POR_DEPARTAMENTO=False)
+    def test_sin_reportes_por_departamento_solo_al_gerente(self):
+        generar_reporte_diario()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(CORREOS_MAX_INTENTOS=2, CORREOS_REINTENTO_BASE=60)
+class CorreosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        departamento = Departamento.objects.create(nombre='Ventas', email='ventas@example.com')
+        cls.visitante = Visitante.objects.create(
+            nombre='Visitante', email='visitante@example.com', telefono='5555555555',
+            departamento_visita=departamento, motivo='Junta', fecha_visita=date(2025, 3, 4),
+            hora_visita=time(10, 0), qr_code='qr_visitantes/qr_visitante.png'
+        )
+
+    def setUp(self):
+        # El QR vive en Spaces, que no está configurado en pruebas
+        url_qr = mock.patch('checador.storage_backends.MediaStorage.url', return_value='https://cdn.example.com/qr.png')
+        url_qr.start()
+        self.addCleanup(url_qr.stop)
+
+    def test_visita_encola_y_el_envio_usa_una_conexion(self):
+        enviar_email_visitante(self.visitante)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(CorreoPendiente.objects.filter(estado=EstadoCorreo.PENDIENTE).count(), 2)
+
+        with mock.patch('attendance.correos.get_connection', wraps=get_connection) as conexion:
+            self.assertEqual(enviar_pendientes(), (2, 0))
+
+        conexion.assert_called_once()
+        self.assertEqual([correo.to for correo in mail.outbox], [['visitante@example.com'], ['ventas@example.com']])
+        self.assertIn('Visita Confirmada', mail.outbox[0].alternatives[0][0])
+        self.assertFalse(CorreoPendiente.objects.exclude(estado=EstadoCorreo.ENVIADO).exists())
+
+    def test_fallo_se_reintenta_con_espera_y_termina_en_fallido(self):
+        enviar_email_visitante(self.visitante)
+        with mock.patch('attendance.correos.EmailMultiAlternatives.send', side_effect=SMTPException('550')):
+            with self.assertLogs('attendance.correos', 'WARNING'):
+                self.assertEqual(enviar_pendientes(), (0, 2))
+            correo = CorreoPendiente.objects.first()
+            self.assertEqual((correo.estado, correo.intentos), (EstadoCorreo.PENDIENTE, 1))
+            self.assertGreater(correo.siguiente_intento, timezone.now() + timedelta(seconds=50))
+            # Todavía no toca reintentar
+            self.assertEqual(enviar_pendientes(), (0, 0))
+
+            CorreoPendiente.objects.update(siguiente_intento=timezone.now())
+            with self.assertLogs('attendance.correos', 'ERROR'):
+                enviar_pendientes()
+
+        self.assertEqual(CorreoPendiente.objects.filter(estado=EstadoCorreo.FALLIDO, error='550').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_sin_conexion_el_lote_completo_se_reintenta(self):
+        enviar_email_visitante(self.visitante)
+        with mock.patch('attendance.correos.get_connection', side_effect=ConnectionRefusedError):
+            with self.assertLogs('attendance.correos', 'WARNING'):
+                self.assertEqual(enviar_pendientes(), (0, 2))
+
+        CorreoPendiente.objects.update(siguiente_intento=timezone.now())
+        self.assertEqual(enviar_pendientes(), (2, 0))
+        self.assertEqual(CorreoPendiente.objects.filter(estado=EstadoCorreo.ENVIADO, lote='').count(), 2)
+
+
+class CandadosTests(TestCase):
+
+    def test_un_solo_propietario_hasta_que_vence(self):
+        self.assertTrue(adquirir_candado('scheduler', 'web-1:10', 60))
+        self.assertFalse(adquirir_candado('scheduler', 'web-2:20', 60))
+        # El dueño puede renovarlo
+        self.assertTrue(adquirir_candado('scheduler', 'web-1:10', 60))
+        self.assertEqual(propietario_candado('scheduler')[0], 'web-1:10')
+
+        CandadoProceso.objects.update(vence=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(adquirir_candado('scheduler', 'web-2:20', 60))
+        self.assertFalse(adquirir_candado('scheduler', 'web-1:10', 60))
+
+    def test_liberar_solo_afecta_al_propietario(self):
+        adquirir_candado('scheduler', 'web-1:10', 60)
+        liberar_candado('scheduler', 'web-2:20')
+        self.assertIsNotNone(propietario_candado('scheduler'))
+
+        liberar_candado('scheduler', 'web-1:10')
+        self.assertIsNone(propietario_candado('scheduler'))
+        self.assertTrue(adquirir_candado('scheduler', 'web-2:20', 60))
+
+
+class DatosSinteticosTests(TestCase):
+
+    def test_genera_los_cuatro_horarios_y_resumenes_consistentes(self):
+        fecha_inicio, fecha_fin = date(2024, 3, 4), date(2024, 3, 17)
+        totales = generar_datos(40, fecha_inicio, fecha_fin, prefijo='PRUEBA', semilla=7)
+
+        empleados = Empleado.objects.filter(codigo_empleado__startswith='PRUEBA')
+        self.assertEqual(empleados.count(), 40)
+        self.assertEqual(
+            set(empleados.values_list('tipo_horario__tipo_sistema', flat=True)), set(TipoSistemaHorario.values)
+        )
+        self.assertEqual(Asistencia.objects.count(), totales['Asistencia'])
+        self.assertTrue(Asistencia.objects.filter(tipo_movimiento=TipoMovimiento.SALIDA_COMIDA).exists())
+        # Las checadas conservan su hora y la entrada de la visita también, aunque sea auto_now_add
+        entradas_fijo = Asistencia.objects.filter(
+            tipo_movimiento=TipoMovimiento.ENTRADA, empleado__tipo_horario__tipo_sistema=TipoSistemaHorario.FIJO
+        )
+        self.assertFalse(entradas_fijo.exclude(hora__range=(time(8, 50), time(10, 1))).exists())
+        self.assertTrue(RegistroVisita._meta.get_field('hora_entrada').auto_now_add)
+        self.assertFalse(RegistroVisita.objects.filter(hora_entrada__date=timezone.localdate()).exists())
+
+        # Los resúmenes reconstruidos coinciden con las entradas generadas
+        self.assertEqual(
+            ResumenDiarioAsistencia.objects.filter(primera_entrada__isnull=False).count(),
+            Asistencia.objects.filter(tipo_movimiento=TipoMovimiento.ENTRADA).count()
+        )
+
+        borrar_datos('PRUEBA')
+        self.assertFalse(Empleado.objects.exists())
+        self.assertFalse(TipoHorario.objects.filter(nombre__startswith='PRUEBA ').exists())
+
+
+@mock.patch('checador.storage_backends.delete_file_from_storage')
+class LimpiezaArchivosTests(TestCase):
+
+    def test_modelos_sin_archivos_no_pagan_consultas_extra(self, borrar_archivo):
+        self.assertEqual(FILE_FIELDS[Empleado], ['qr_code'])
+        self.assertNotIn(Asistencia, FILE_FIELDS)
+
+        empleado = crear_empleado('EMP0801')
+        asignacion = AsignacionTurnoDiaria.objects.create(empleado=empleado, fecha=date(2025, 3, 4))
+        asignacion.es_descanso = True
+        with self.assertNumQueries(1):
+            asignacion.save()
+        # Sin el campo de archivo en update_fields tampoco se lee la fila anterior
+        empleado.activo = False
+        with self.assertNumQueries(1):
+            empleado.save(update_fields=['activo'])
+        borrar_archivo.assert_not_called()
+
+    def test_borra_el_archivo_reemplazado_y_el_del_registro_eliminado(self, borrar_archivo):
+        empleado = crear_empleado('EMP0802')
+        empleado.qr_code = 'qr_codes/nuevo.png'
+        empleado.save()
+        borrar_archivo.assert_called_once_with('qr_codes/qr_EMP0802.png')
+
+        empleado.user.delete()
+        borrar_archivo.assert_called_with('qr_codes/nuevo.png')
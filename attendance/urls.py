@@ -9,6 +9,8 @@ urlpatterns = [
     # Tablet de recepción
     path('checkin/', views.checkin_view, name='checkin'),
     path('', views.checkin_view_tablet, name='checkin_tablet'),
+    path('checkin/api/', views.checkin_api, name='checkin_api'),
+    path('checkin/api/lote/', views.checkin_lote_api, name='checkin_lote_api'),
 
     # Registro de visitantes (público)
     path('visitante/registro/', views.VisitanteCreateView.as_view(), name='visitante_registro'),
@@ -25,6 +27,8 @@ urlpatterns = [
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('reporte/mensual/', views.reporte_mensual_view, name='reporte_mensual'),
     path('reporte/mensual/<int:mes>/<int:anio>/', views.reporte_mensual_view, name='reporte_mensual_detalle'),
+    path('reporte/tareas/<int:tarea_id>/', views.tarea_reporte_estado, name='tarea_reporte_estado'),
+    path('reporte/tareas/<int:tarea_id>/descarga/', views.tarea_reporte_descarga, name='tarea_reporte_descarga'),
     
     # Asignación de turnos
     path('turnos/asignacion/', views.asignacion_turnos_mensual, name='asignacion_turnos'),
@@ -1,17 +1,64 @@
 from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils import timezone
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, time
+from array import array
+from operator import attrgetter
+from django.db.models import Count, F, Max, Min, Q, QuerySet, Sum
 from .models import (
-    Asistencia, TipoMovimiento, Empleado, ConfiguracionSistema, TiempoExtra, TipoHorario,
-    HorarioDiaSemana, AsignacionTurnoRotativo, TipoSistemaHorario
+    Asistencia, TipoMovimiento, Empleado, Departamento, ConfiguracionSistema, TiempoExtra, TipoHorario,
+    HorarioDiaSemana, AsignacionTurnoRotativo, TipoSistemaHorario, ResumenDiarioAsistencia, AusenciaDia
 )
+from .cache import CacheLRU
+from .correos import encolar_correos, enviar_correos
+from .periodos import periodo_mes, periodo_quincena, periodo_semana
 import os
 from django.conf import settings
 
+# Caché de resolución de horarios: se limpia con señales (ver signals.py) y el TTL
+# acota la desactualización en los demás workers
+_cache_horarios = CacheLRU(
+    tamano_maximo=getattr(settings, 'HORARIOS_CACHE_TAMANO', 1024),
+    ttl=getattr(settings, 'HORARIOS_CACHE_TTL', 300)
+)
+
+def limpiar_cache_horarios():
+    """Invalida los horarios resueltos en este proceso"""
+    _cache_horarios.clear()
+
+def _config_horario_global():
+    """Hora de entrada y tolerancia de ConfiguracionSistema, o None si no existe"""
+    config = ConfiguracionSistema.objects.first()
+    if config:
+        return (config.hora_entrada, config.minutos_tolerancia)
+    return None
+
+def _horario_dia_semana(tipo_horario_id, dia_semana):
+    """Valores de HorarioDiaSemana para el tipo de horario y día, o None si no está configurado"""
+    return HorarioDiaSemana.objects.filter(
+        tipo_horario_id=tipo_horario_id,
+        dia_semana=dia_semana
+    ).values_list(
+        'hora_entrada', 'hora_salida', 'es_dia_laboral', 'hora_inicio_comida', 'hora_fin_comida'
+    ).first()
+
+def _asignaciones_rotativas(empleado_id):
+    """Asignaciones de turno rotativo activas del empleado, de la más reciente a la más antigua"""
+    return tuple(
+        AsignacionTurnoRotativo.objects.filter(
+            empleado_id=empleado_id,
+            activo=True
+        ).order_by('-fecha_inicio').values_list(
+            'fecha_inicio', 'fecha_fin', 'turno_rotativo__hora_entrada', 'turno_rotativo__hora_salida'
+        )
+    )
+
 def obtener_horario_esperado(empleado, fecha):
     """
     Obtiene el horario esperado de un empleado para una fecha específica.
+
+    Las consultas a ConfiguracionSistema, HorarioDiaSemana y AsignacionTurnoRotativo
+    se guardan en una caché LRU por proceso.
     
     Args:
         empleado: Instancia de Empleado
@@ -37,30 +84,22 @@ def obtener_horario_esperado(empleado, fecha):
     
     # Si no tiene tipo de horario asignado, usar configuración global
     if not tipo_horario:
-        config = ConfiguracionSistema.objects.first()
+        config = _cache_horarios.obtener(('config',), _config_horario_global)
         if config:
-            return {
-                'hora_entrada': config.hora_entrada,
-                'hora_salida': None,
-                'es_dia_laboral': fecha.weekday() < 5,  # Lunes a viernes
-                'tolerancia_minutos': config.minutos_tolerancia,
-                'tiene_horario_comida': False,
-                'hora_inicio_comida': None,
-                'hora_fin_comida': None,
-                'tipo_sistema': 'FIJO'
-            }
+            hora_entrada, tolerancia = config
         else:
             # Fallback si no hay configuración
-            return {
-                'hora_entrada': datetime.strptime('09:00:00', '%H:%M:%S').time(),
-                'hora_salida': None,
-                'es_dia_laboral': fecha.weekday() < 5,
-                'tolerancia_minutos': 15,
-                'tiene_horario_comida': False,
-                'hora_inicio_comida': None,
-                'hora_fin_comida': None,
-                'tipo_sistema': 'FIJO'
-            }
+            hora_entrada, tolerancia = datetime.strptime('09:00:00', '%H:%M:%S').time(), 15
+        return {
+            'hora_entrada': hora_entrada,
+            'hora_salida': None,
+            'es_dia_laboral': fecha.weekday() < 5,  # Lunes a viernes
+            'tolerancia_minutos': tolerancia,
+            'tiene_horario_comida': False,
+            'hora_inicio_comida': None,
+            'hora_fin_comida': None,
+            'tipo_sistema': 'FIJO'
+        }
     
     # Según el tipo de sistema
     tipo_sistema = tipo_horario.tipo_sistema
@@ -83,18 +122,19 @@ def obtener_horario_esperado(empleado, fecha):
     # HORARIO ROTATIVO
     elif tipo_sistema == TipoSistemaHorario.ROTATIVO:
         # Buscar la asignación de turno activa para la fecha
-        asignacion = AsignacionTurnoRotativo.objects.filter(
-            empleado=empleado,
-            fecha_inicio__lte=fecha,
-            fecha_fin__gte=fecha,
-            activo=True
-        ).select_related('turno_rotativo').first()
+        asignaciones = _cache_horarios.obtener(
+            ('rotativo', empleado.pk),
+            lambda: _asignaciones_rotativas(empleado.pk)
+        )
+        turno = next(
+            ((entrada, salida) for inicio, fin, entrada, salida in asignaciones if inicio <= fecha <= fin),
+            None
+        )
         
-        if asignacion:
-            turno = asignacion.turno_rotativo
+        if turno:
             return {
-                'hora_entrada': turno.hora_entrada,
-                'hora_salida': turno.hora_salida,
+                'hora_entrada': turno[0],
+                'hora_salida': turno[1],
                 'es_dia_laboral': True,
                 'tolerancia_minutos': tipo_horario.minutos_tolerancia,
                 'tiene_horario_comida': tipo_horario.tiene_horario_comida,
@@ -120,20 +160,21 @@ def obtener_horario_esperado(empleado, fecha):
         # Buscar configuración para el día de la semana
         dia_semana = fecha.weekday()  # 0=Lunes, 6=Domingo
         
-        horario_dia = HorarioDiaSemana.objects.filter(
-            tipo_horario=tipo_horario,
-            dia_semana=dia_semana
-        ).first()
+        horario_dia = _cache_horarios.obtener(
+            ('dia', tipo_horario.pk, dia_semana),
+            lambda: _horario_dia_semana(tipo_horario.pk, dia_semana)
+        )
         
         if horario_dia:
+            hora_entrada, hora_salida, es_dia_laboral, inicio_comida, fin_comida = horario_dia
             return {
-                'hora_entrada': horario_dia.hora_entrada,
-                'hora_salida': horario_dia.hora_salida,
-                'es_dia_laboral': horario_dia.es_dia_laboral,
+                'hora_entrada': hora_entrada,
+                'hora_salida': hora_salida,
+                'es_dia_laboral': es_dia_laboral,
                 'tolerancia_minutos': tipo_horario.minutos_tolerancia,
-                'tiene_horario_comida': bool(horario_dia.hora_inicio_comida and horario_dia.hora_fin_comida),
-                'hora_inicio_comida': horario_dia.hora_inicio_comida,
-                'hora_fin_comida': horario_dia.hora_fin_comida,
+                'tiene_horario_comida': bool(inicio_comida and fin_comida),
+                'hora_inicio_comida': inicio_comida,
+                'hora_fin_comida': fin_comida,
                 'tipo_sistema': 'PERSONALIZADO'
             }
         else:
@@ -162,8 +203,228 @@ def obtener_horario_esperado(empleado, fecha):
             'tipo_sistema': 'FIJO'
         }
 
+# ========== RESOLUCIÓN MASIVA DE HORARIOS ==========
+
+def _a_minutos(hora):
+    """Convierte un time a minutos desde medianoche (-1 si es None)"""
+    return hora.hour * 60 + hora.minute if hora else MatrizHorarios.SIN_HORA
+
+def _a_hora(minutos):
+    """Convierte minutos desde medianoche a time (None si es -1)"""
+    return time(minutos // 60, minutos % 60) if minutos != MatrizHorarios.SIN_HORA else None
+
+class MatrizHorarios:
+    """
+    Horario esperado de N empleados × D días guardado en arreglos planos.
+
+    Por cada celda (empleado, día) se guarda si es día laboral y la hora de entrada y
+    salida esperadas en minutos desde medianoche; por empleado, la tolerancia y el
+    tipo de sistema. Se construye con obtener_horarios_esperados().
+    """
+    SIN_HORA = -1
+
+    def __init__(self, empleado_ids, fecha_inicio, fecha_fin):
+        self.empleado_ids = list(empleado_ids)
+        self.indice = {empleado_id: i for i, empleado_id in enumerate(self.empleado_ids)}
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.num_dias = max((fecha_fin - fecha_inicio).days + 1, 0)
+
+        celdas = len(self.empleado_ids) * self.num_dias
+        self.laboral = bytearray(celdas)
+        self.entrada = array('h', [self.SIN_HORA]) * celdas
+        self.salida = array('h', [self.SIN_HORA]) * celdas
+        self.tolerancia = array('h', [0]) * len(self.empleado_ids)
+        self.tipo_sistema = [TipoSistemaHorario.FIJO] * len(self.empleado_ids)
+
+    def _celda(self, empleado_id, fecha):
+        return self.indice[empleado_id] * self.num_dias + (fecha - self.fecha_inicio).days
+
+    def asignar(self, empleado_id, fecha, es_laboral, hora_entrada=None, hora_salida=None):
+        celda = self._celda(empleado_id, fecha)
+        self.laboral[celda] = 1 if es_laboral else 0
+        self.entrada[celda] = _a_minutos(hora_entrada)
+        self.salida[celda] = _a_minutos(hora_salida)
+
+    def es_dia_laboral(self, empleado_id, fecha):
+        return bool(self.laboral[self._celda(empleado_id, fecha)])
+
+    def hora_entrada(self, empleado_id, fecha):
+        return _a_hora(self.entrada[self._celda(empleado_id, fecha)])
+
+    def hora_salida(self, empleado_id, fecha):
+        return _a_hora(self.salida[self._celda(empleado_id, fecha)])
+
+    def dias_laborales(self, empleado_id, fecha_inicio=None, fecha_fin=None):
+        """Número de días laborales esperados del empleado en el rango (por defecto, todo el periodo)"""
+        inicio = self._celda(empleado_id, fecha_inicio or self.fecha_inicio)
+        fin = self._celda(empleado_id, fecha_fin or self.fecha_fin)
+        return sum(self.laboral[inicio:fin + 1])
+
+    def horario(self, empleado_id, fecha):
+        """Horario de una celda con las mismas claves básicas que obtener_horario_esperado"""
+        celda = self._celda(empleado_id, fecha)
+        i = self.indice[empleado_id]
+        return {
+            'hora_entrada': _a_hora(self.entrada[celda]),
+            'hora_salida': _a_hora(self.salida[celda]),
+            'es_dia_laboral': bool(self.laboral[celda]),
+            'tolerancia_minutos': self.tolerancia[i],
+            'tipo_sistema': self.tipo_sistema[i],
+        }
+
+def obtener_horarios_esperados(empleados, fecha_inicio, fecha_fin):
+    """
+    Resuelve el horario esperado de muchos empleados en un rango de fechas con un
+    número constante de consultas (no una por empleado ni por día).
+
+    Aplica las mismas reglas que obtener_horario_esperado y, además, las
+    asignaciones diarias (AsignacionTurnoDiaria) tienen prioridad sobre el horario
+    base. Para turnos 24x24 el ciclo se ancla en la última entrada previa al rango.
+
+    Args:
+        empleados: QuerySet o lista de Empleado
+        fecha_inicio: datetime.date - Primer día (incluido)
+        fecha_fin: datetime.date - Último día (incluido)
+
+    Returns:
+        MatrizHorarios
+    """
+    from .models import AsignacionTurnoDiaria
+
+    if isinstance(empleados, QuerySet):
+        empleados = empleados.select_related('tipo_horario')
+    empleados = list(empleados)
+
+    matriz = MatrizHorarios([e.id for e in empleados], fecha_inicio, fecha_fin)
+    fechas = [fecha_inicio + timedelta(days=d) for d in range(matriz.num_dias)]
+
+    # Clasificar empleados por tipo de sistema (mismas reglas que obtener_horario_esperado)
+    sistemas = {}
+    for empleado in empleados:
+        tipo_horario = empleado.tipo_horario
+        if not tipo_horario:
+            sistemas[empleado.id] = None
+        elif tipo_horario.tipo_sistema == TipoSistemaHorario.TURNO_24H or tipo_horario.es_turno_24h:
+            sistemas[empleado.id] = TipoSistemaHorario.TURNO_24H
+        elif tipo_horario.tipo_sistema == TipoSistemaHorario.ROTATIVO:
+            sistemas[empleado.id] = TipoSistemaHorario.ROTATIVO
+        elif tipo_horario.tipo_sistema == TipoSistemaHorario.PERSONALIZADO or tipo_horario.requiere_horario_por_dia:
+            sistemas[empleado.id] = TipoSistemaHorario.PERSONALIZADO
+        else:
+            sistemas[empleado.id] = TipoSistemaHorario.FIJO
+
+    sin_horario = [e for e in empleados if sistemas[e.id] is None]
+    turno_24h = [e for e in empleados if sistemas[e.id] == TipoSistemaHorario.TURNO_24H]
+    rotativos = [e for e in empleados if sistemas[e.id] == TipoSistemaHorario.ROTATIVO]
+    personalizados = [e for e in empleados if sistemas[e.id] == TipoSistemaHorario.PERSONALIZADO]
+
+    # === CARGA MASIVA (una consulta por fuente) ===
+
+    config = _cache_horarios.obtener(('config',), _config_horario_global) if sin_horario else None
+
+    horarios_dia = {}
+    if personalizados:
+        for horario_dia in HorarioDiaSemana.objects.filter(
+            tipo_horario_id__in={e.tipo_horario_id for e in personalizados}
+        ):
+            horarios_dia[(horario_dia.tipo_horario_id, horario_dia.dia_semana)] = horario_dia
+
+    asignaciones_rotativas = {}
+    if rotativos:
+        for asignacion in AsignacionTurnoRotativo.objects.filter(
+            empleado_id__in=[e.id for e in rotativos],
+            fecha_inicio__lte=fecha_fin,
+            fecha_fin__gte=fecha_inicio,
+            activo=True
+        ).order_by('-fecha_inicio').values_list(
+            'empleado_id', 'fecha_inicio', 'fecha_fin', 'turno_rotativo__hora_entrada', 'turno_rotativo__hora_salida'
+        ):
+            asignaciones_rotativas.setdefault(asignacion[0], []).append(asignacion[1:])
+
+    anclas_24h = {}
+    if turno_24h:
+        for empleado_id, previa, primera in Asistencia.objects.filter(
+            empleado_id__in=[e.id for e in turno_24h],
+            tipo_movimiento=TipoMovimiento.ENTRADA,
+            fecha__lte=fecha_fin
+        ).values('empleado').annotate(
+            previa=Max('fecha', filter=Q(fecha__lt=fecha_inicio)),
+            primera=Min('fecha', filter=Q(fecha__gte=fecha_inicio))
+        ).values_list('empleado', 'previa', 'primera'):
+            anclas_24h[empleado_id] = previa or primera
+
+    asignaciones_diarias = AsignacionTurnoDiaria.objects.filter(
+        empleado_id__in=matriz.empleado_ids,
+        fecha__gte=fecha_inicio,
+        fecha__lte=fecha_fin
+    ).values_list('empleado_id', 'fecha', 'es_descanso', 'hora_entrada', 'hora_salida')
+
+    # === LLENADO DE LA MATRIZ ===
+
+    if config:
+        hora_config, tolerancia_config = config
+    else:
+        hora_config, tolerancia_config = time(9, 0), 15
+    for empleado in sin_horario:
+        matriz.tolerancia[matriz.indice[empleado.id]] = tolerancia_config
+        for fecha in fechas:
+            matriz.asignar(empleado.id, fecha, fecha.weekday() < 5, hora_config)
+
+    for empleado in empleados:
+        sistema = sistemas[empleado.id]
+        if sistema is None:
+            continue
+        tipo_horario = empleado.tipo_horario
+        i = matriz.indice[empleado.id]
+        matriz.tolerancia[i] = tipo_horario.minutos_tolerancia
+        matriz.tipo_sistema[i] = sistema
+        base = (tipo_horario.hora_entrada, tipo_horario.hora_salida)
+
+        if sistema == TipoSistemaHorario.TURNO_24H:
+            # Ciclo de 48h: un día sí y uno no a partir de la entrada de referencia
+            ancla = anclas_24h.get(empleado.id) or fecha_inicio
+            for fecha in fechas:
+                matriz.asignar(empleado.id, fecha, (fecha - ancla).days % 2 == 0, *base)
+        elif sistema == TipoSistemaHorario.ROTATIVO:
+            asignaciones = asignaciones_rotativas.get(empleado.id, [])
+            for fecha in fechas:
+                turno = next(
+                    ((entrada, salida) for inicio, fin, entrada, salida in asignaciones if inicio <= fecha <= fin),
+                    None
+                )
+                if turno:
+                    matriz.asignar(empleado.id, fecha, True, *turno)
+                else:
+                    matriz.asignar(empleado.id, fecha, False, *base)
+        elif sistema == TipoSistemaHorario.PERSONALIZADO:
+            for fecha in fechas:
+                horario_dia = horarios_dia.get((tipo_horario.id, fecha.weekday()))
+                if horario_dia:
+                    matriz.asignar(
+                        empleado.id, fecha, horario_dia.es_dia_laboral,
+                        horario_dia.hora_entrada, horario_dia.hora_salida
+                    )
+                else:
+                    matriz.asignar(empleado.id, fecha, fecha.weekday() < 5, *base)
+        else:
+            for fecha in fechas:
+                matriz.asignar(empleado.id, fecha, fecha.weekday() < 5, *base)
+
+    # Las asignaciones diarias de la vista de turnos tienen prioridad
+    for empleado_id, fecha, es_descanso, hora_entrada, hora_salida in asignaciones_diarias:
+        if es_descanso:
+            matriz.asignar(empleado_id, fecha, False)
+        elif hora_entrada:
+            matriz.asignar(empleado_id, fecha, True, hora_entrada, hora_salida)
+
+    return matriz
+
 def enviar_email_visitante(visitante):
-    """Envía email con QR al visitante y notifica al departamento"""
+    """
+    Encola el email con QR al visitante y el aviso al departamento; los envía el
+    scheduler desde la bandeja de salida (attendance.correos).
+    """
 
     # Email al visitante
     subject_visitante = f'Confirmación de Visita - {visitante.fecha_visita}'
@@ -207,7 +468,6 @@ def enviar_email_visitante(visitante):
     #    with open(visitante.qr_code.path, 'rb') as f:
     #        email_visitante.attach('qr_code.png', f.read(), 'image/png')
 
-    email_visitante.send(fail_silently=False)
 
     # Email al departamento
     subject_depto = f'Nueva Visita Programada - {visitante.nombre}'
@@ -234,17 +494,73 @@ def enviar_email_visitante(visitante):
         [visitante.departamento_visita.email]
     )
     email_depto.attach_alternative(mensaje_depto, "text/html")
-    email_depto.send(fail_silently=False)
+    encolar_correos([email_visitante, email_depto])
+
+
+def agrupar_por_departamento(filas, departamento_de):
+    """
+    Reparte en una sola pasada las filas de un reporte ya calculado entre los
+    departamentos, conservando su orden; las filas sin departamento se omiten.
+
+    Returns:
+        dict {departamento_id: (Departamento, [filas])}
+    """
+    grupos = {}
+    for fila in filas:
+        departamento = departamento_de(fila)
+        if departamento is not None:
+            grupos.setdefault(departamento.pk, (departamento, []))[1].append(fila)
+    return grupos
+
+
+def correo_departamento(departamento, asunto, texto, html):
+    """Correo con la parte de un reporte que le toca a un departamento, dirigido a su email"""
+    correo = EmailMultiAlternatives(
+        f'{asunto} - {departamento.nombre}', texto, settings.DEFAULT_FROM_EMAIL, [departamento.email]
+    )
+    correo.attach_alternative(html, "text/html")
+    return correo
+
+
+def _filas_resumen(resumen):
+    """Filas ya formateadas de la tabla de resumen por empleado de los reportes HTML"""
+    return [
+        {
+            'nombre': fila['empleado'].user.get_full_name(),
+            'codigo': fila['empleado'].codigo_empleado,
+            'departamento': fila['empleado'].departamento.nombre if fila['empleado'].departamento else 'N/A',
+            'dias_asistidos': fila['dias_asistidos'],
+            'retardos': fila['retardos'],
+            'minutos_retardo': fila['minutos_retardo'],
+            'faltas': fila['faltas'],
+        }
+        for fila in resumen
+    ]
+
+
+def _html_reporte_semanal(fecha_inicio, fecha_fin, resumen, departamento=None):
+    """HTML del reporte semanal para las filas de resumen dadas (todas o las de un departamento)"""
+    filas = _filas_resumen(resumen)
+    return render_to_string('attendance/reportes/semanal.html', {
+        'fecha_inicio': fecha_inicio,
+        'fecha_fin': fecha_fin,
+        'departamento': departamento,
+        'filas': filas,
+        # Empleados con 3 o más retardos en la semana
+        'retardos_recurrentes': [fila for fila in filas if fila['retardos'] >= 3],
+    })
 
 
 def generar_reporte_semanal():
-    """Genera y envía el reporte semanal todos los jueves"""
+    """
+    Genera y envía el reporte semanal todos los jueves: el completo al gerente y,
+    si REPORTES_POR_DEPARTAMENTO, la parte de cada departamento a su email.
+    """
     hoy = timezone.now().date()
 
     # Calcular el rango de la semana (lunes a jueves)
     # Si hoy es jueves (weekday = 3), la semana va desde el lunes anterior hasta hoy
-    dias_desde_lunes = hoy.weekday()  # 0=lunes, 3=jueves
-    fecha_inicio = hoy - timedelta(days=dias_desde_lunes)
+    fecha_inicio = periodo_semana(hoy).inicio
     fecha_fin = hoy
 
     # Obtener configuración
@@ -252,144 +568,96 @@ def generar_reporte_semanal():
     if not config:
         return
 
-    # Obtener datos por empleado
-    empleados = Empleado.objects.filter(activo=True)
-
-    html_reporte = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; }}
-            table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-            th, td {{ border: 1px solid #ddd; padding: 10px; text-align: center; }}
-            th {{ background-color: #3b82f6; color: white; }}
-            tr:nth-child(even) {{ background-color: #f2f2f2; }}
-            .titulo {{ background-color: #1e40af; color: white; padding: 20px; text-align: center; }}
-            .resumen {{ background-color: #eff6ff; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-            .alerta {{ background-color: #fef2f2; padding: 15px; border-left: 4px solid #ef4444; margin: 20px 0; }}
-        </style>
-    </head>
-    <body>
-        <div class="titulo">
-            <h1>Reporte Semanal de Asistencias</h1>
-            <p>{fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}</p>
-        </div>
-
-        <table>
-            <tr>
-                <th>Empleado</th>
-                <th>Código</th>
-                <th>Departamento</th>
-                <th>Días Asistidos</th>
-                <th>Retardos</th>
-                <th>Total Min. Retardo</th>
-                <th>Faltas</th>
-            </tr>
-    """
-
-    # Recolectar empleados con retardos consecutivos
-    empleados_retardos_consecutivos = []
-
-    for empleado in empleados:
-        asistencias = Asistencia.objects.filter(
-            empleado=empleado,
-            fecha__gte=fecha_inicio,
-            fecha__lte=fecha_fin,
-            tipo_movimiento=TipoMovimiento.ENTRADA
-        )
-
-        dias_asistidos = asistencias.values('fecha').distinct().count()
-        retardos = asistencias.filter(retardo=True).count()
-        total_min_retardo = sum(asistencias.filter(retardo=True).values_list('minutos_retardo', flat=True))
-
-        # Calcular días/turnos laborales según tipo de horario
-        tipo_horario = empleado.tipo_horario
-        if tipo_horario and tipo_horario.es_turno_24h:
-            # Para turnos de 24h: calcular turnos esperados en el período
-            # Ciclo de 48 horas (24h trabajo + 24h descanso)
-            dias_periodo = (fecha_fin - fecha_inicio).days + 1
-            turnos_esperados = dias_periodo // 2  # Un turno cada 2 días
-            faltas = max(0, turnos_esperados - dias_asistidos)
-        else:
-            # Para horarios regulares: lunes a viernes
-            dias_laborales = 0
-            fecha_actual = fecha_inicio
-            while fecha_actual <= fecha_fin:
-                if fecha_actual.weekday() < 5:  # Lunes a viernes
-                    dias_laborales += 1
-                fecha_actual += timedelta(days=1)
-            faltas = dias_laborales - dias_asistidos
-
-        html_reporte += f"""
-            <tr>
-                <td>{empleado.user.get_full_name()}</td>
-                <td>{empleado.codigo_empleado}</td>
-                <td>{empleado.departamento.nombre if empleado.departamento else 'N/A'}</td>
-                <td>{dias_asistidos}</td>
-                <td>{retardos}</td>
-                <td>{total_min_retardo}</td>
-                <td>{faltas}</td>
-            </tr>
-        """
-
-        # Detectar empleados con retardos consecutivos (3 o más retardos en la semana)
-        if retardos >= 3:
-            empleados_retardos_consecutivos.append({
-                'nombre': empleado.user.get_full_name(),
-                'codigo': empleado.codigo_empleado,
-                'retardos': retardos
-            })
-
-    html_reporte += "</table>"
-
-    # Agregar alerta de retardos consecutivos si existen
-    if empleados_retardos_consecutivos:
-        html_reporte += """
-        <div class="alerta">
-            <h2>⚠️ Atención: Retardos Recurrentes</h2>
-            <p>Los siguientes empleados tienen 3 o más retardos esta semana:</p>
-            <table>
-                <tr>
-                    <th>Empleado</th>
-                    <th>Código</th>
-                    <th>Retardos (esta semana)</th>
-                </tr>
-        """
-
-        for emp in empleados_retardos_consecutivos:
-            html_reporte += f"""
-                <tr>
-                    <td>{emp['nombre']}</td>
-                    <td>{emp['codigo']}</td>
-                    <td>{emp['retardos']}</td>
-                </tr>
-            """
-
-        html_reporte += "</table></div>"
-
-    html_reporte += "</body></html>"
+    # Obtener datos por empleado desde los resúmenes diarios; lo comparten todos los correos
+    resumen = resumen_asistencias_por_empleado(Empleado.objects.filter(activo=True), fecha_inicio, fecha_fin)
+    asunto = f'Reporte Semanal de Asistencias - Semana del {fecha_inicio.strftime("%d/%m/%Y")}'
 
     # Generar archivo Excel
     excel_buffer = generar_excel_reporte_semanal(fecha_inicio, fecha_fin)
     nombre_excel = f"reporte_semanal_{fecha_inicio.strftime('%Y%m%d')}_{fecha_fin.strftime('%Y%m%d')}.xlsx"
 
-    # Enviar email
+    # Email al gerente
     email = EmailMultiAlternatives(
-        f'Reporte Semanal de Asistencias - Semana del {fecha_inicio.strftime("%d/%m/%Y")}',
+        asunto,
         'Reporte semanal de asistencias. Por favor revisa el contenido HTML y el archivo Excel adjunto con el detalle de todas las checadas.',
         settings.DEFAULT_FROM_EMAIL,
         [config.email_gerente,'zuly.becerra@loginco.com.mx']
     )
-    email.attach_alternative(html_reporte, "text/html")
+    email.attach_alternative(_html_reporte_semanal(fecha_inicio, fecha_fin, resumen), "text/html")
     
     # Adjuntar archivo Excel
     email.attach(nombre_excel, excel_buffer.read(), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    
-    email.send(fail_silently=False)
+
+    correos = [email]
+    if settings.REPORTES_POR_DEPARTAMENTO:
+        # Cada departamento recibe sus filas del mismo resumen, sin volver a calcularlo
+        for departamento, filas in agrupar_por_departamento(resumen, lambda fila: fila['empleado'].departamento).values():
+            if departamento.email:
+                correos.append(correo_departamento(
+                    departamento,
+                    asunto,
+                    'Reporte semanal de asistencias de tu departamento. Por favor revisa el contenido HTML.',
+                    _html_reporte_semanal(fecha_inicio, fecha_fin, filas, departamento)
+                ))
+    enviar_correos(correos)
+
+
+def empleados_con_retardos(fecha_inicio, fecha_fin, minimo=3):
+    """
+    Empleados activos con al menos `minimo` días con retardo en el rango, en una sola
+    consulta sobre los resúmenes diarios.
+
+    Args:
+        fecha_inicio: datetime.date - Primer día (incluido)
+        fecha_fin: datetime.date - Último día (incluido)
+        minimo: int - Retardos mínimos para aparecer en la lista
+
+    Returns:
+        QuerySet de Empleado con user y departamento cargados y la anotación retardos,
+        ordenado de más a menos retardos
+    """
+    return Empleado.objects.filter(
+        activo=True,
+        resumenes_diarios__fecha__gte=fecha_inicio,
+        resumenes_diarios__fecha__lte=fecha_fin,
+        resumenes_diarios__retardo=True
+    ).annotate(
+        retardos=Count('resumenes_diarios')
+    ).filter(
+        retardos__gte=minimo
+    ).select_related('user', 'departamento').order_by('-retardos', 'codigo_empleado')
+
+
+def _html_reporte_diario(hoy, total_empleados, llegaron, retardos, empleados_retardos_consecutivos, departamento=None):
+    """HTML del reporte diario (de toda la empresa o de un departamento)"""
+    return render_to_string('attendance/reportes/diario.html', {
+        'hoy': hoy,
+        'departamento': departamento,
+        'total_empleados': total_empleados,
+        'llegaron': llegaron,
+        'porcentaje': llegaron / total_empleados * 100 if total_empleados else 0,
+        'retardos': [
+            {
+                'nombre': resumen_dia.empleado.user.get_full_name(),
+                'codigo': resumen_dia.empleado.codigo_empleado,
+                'tipo_horario': resumen_dia.empleado.tipo_horario.nombre if resumen_dia.empleado.tipo_horario else 'Estándar',
+                'primera_entrada': resumen_dia.primera_entrada,
+                'minutos_retardo': resumen_dia.minutos_retardo,
+            }
+            for resumen_dia in retardos
+        ],
+        'retardos_consecutivos': [
+            {'nombre': empleado.user.get_full_name(), 'codigo': empleado.codigo_empleado, 'retardos': empleado.retardos}
+            for empleado in empleados_retardos_consecutivos
+        ],
+    })
 
 
 def generar_reporte_diario():
-    """Genera y envía el reporte diario después de las 12:00 PM"""
+    """
+    Genera y envía el reporte diario después de las 12:00 PM: el completo al gerente
+    y, si REPORTES_POR_DEPARTAMENTO, la parte de cada departamento a su email.
+    """
     hoy = timezone.now().date()
 
     # Obtener configuración
@@ -397,121 +665,61 @@ def generar_reporte_diario():
     if not config:
         return
 
-    # Asistencias del día
-    asistencias_entrada = Asistencia.objects.filter(
-        fecha=hoy,
-        tipo_movimiento=TipoMovimiento.ENTRADA
-    ).select_related('empleado', 'empleado__user')
+    # Resúmenes del día (uno por empleado que ya checó)
+    resumenes_hoy = ResumenDiarioAsistencia.objects.filter(fecha=hoy, primera_entrada__isnull=False)
 
-    total_empleados = Empleado.objects.filter(activo=True).count()
-    llegaron = asistencias_entrada.count()
-    retardos = asistencias_entrada.filter(retardo=True)
+    # Conteos por departamento en una consulta cada uno; los totales de la empresa son su suma
+    empleados_por_departamento = dict(
+        Empleado.objects.filter(activo=True).values_list('departamento').annotate(total=Count('id')).order_by()
+    )
+    llegaron_por_departamento = dict(
+        resumenes_hoy.values_list('empleado__departamento').annotate(total=Count('id')).order_by()
+    )
+    retardos = list(
+        resumenes_hoy.filter(retardo=True).select_related(
+            'empleado', 'empleado__user', 'empleado__tipo_horario', 'empleado__departamento'
+        ).order_by('empleado__codigo_empleado')
+    )
 
     # Empleados con retardos consecutivos (últimos 5 días)
-    fecha_inicio = hoy - timedelta(days=5)
-    empleados_retardos_consecutivos = []
-
-    for empleado in Empleado.objects.filter(activo=True):
-        retardos_count = Asistencia.objects.filter(
-            empleado=empleado,
-            fecha__gte=fecha_inicio,
-            fecha__lte=hoy,
-            tipo_movimiento=TipoMovimiento.ENTRADA,
-            retardo=True
-        ).count()
-
-        if retardos_count >= 3:
-            empleados_retardos_consecutivos.append({
-                'nombre': empleado.user.get_full_name(),
-                'codigo': empleado.codigo_empleado,
-                'retardos': retardos_count
-            })
-
-    # Generar HTML del reporte
-    html_reporte = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; }}
-            table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-            th, td {{ border: 1px solid #ddd; padding: 12px; text-align: left; }}
-            th {{ background-color: #3b82f6; color: white; }}
-            tr:nth-child(even) {{ background-color: #f2f2f2; }}
-            .resumen {{ background-color: #eff6ff; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-            .alerta {{ background-color: #fef2f2; padding: 15px; border-left: 4px solid #ef4444; margin: 20px 0; }}
-        </style>
-    </head>
-    <body>
-        <h1>Reporte Diario de Asistencia</h1>
-        <p><strong>Fecha:</strong> {hoy.strftime('%d/%m/%Y')}</p>
-
-        <div class="resumen">
-            <h2>Resumen</h2>
-            <p><strong>Total de Empleados:</strong> {total_empleados}</p>
-            <p><strong>Asistieron:</strong> {llegaron} ({(llegaron/total_empleados*100):.1f}%)</p>
-            <p><strong>Retardos del Día:</strong> {retardos.count()}</p>
-        </div>
-
-        <h2>Retardos del Día</h2>
-        <table>
-            <tr>
-                <th>Empleado</th>
-                <th>Código</th>
-                <th>Tipo de Horario</th>
-                <th>Hora de Entrada</th>
-                <th>Minutos de Retardo</th>
-            </tr>
-    """
+    empleados_retardos_consecutivos = list(empleados_con_retardos(hoy - timedelta(days=5), hoy))
 
-    for asistencia in retardos:
-        tipo_horario_nombre = asistencia.empleado.tipo_horario.nombre if asistencia.empleado.tipo_horario else 'Estándar'
-        html_reporte += f"""
-            <tr>
-                <td>{asistencia.empleado.user.get_full_name()}</td>
-                <td>{asistencia.empleado.codigo_empleado}</td>
-                <td>{tipo_horario_nombre}</td>
-                <td>{asistencia.hora.strftime('%H:%M')}</td>
-                <td>{asistencia.minutos_retardo}</td>
-            </tr>
-        """
-
-    html_reporte += "</table>"
-
-    if empleados_retardos_consecutivos:
-        html_reporte += """
-        <div class="alerta">
-            <h2>⚠️ Atención: Retardos Consecutivos</h2>
-            <p>Los siguientes empleados tienen 3 o más retardos en los últimos 5 días:</p>
-            <table>
-                <tr>
-                    <th>Empleado</th>
-                    <th>Código</th>
-                    <th>Retardos (últimos 5 días)</th>
-                </tr>
-        """
-
-        for emp in empleados_retardos_consecutivos:
-            html_reporte += f"""
-                <tr>
-                    <td>{emp['nombre']}</td>
-                    <td>{emp['codigo']}</td>
-                    <td>{emp['retardos']}</td>
-                </tr>
-            """
-
-        html_reporte += "</table></div>"
-
-    html_reporte += "</body></html>"
-
-    # Enviar email
+    asunto = f'Reporte Diario de Asistencia - {hoy.strftime("%d/%m/%Y")}'
     email = EmailMultiAlternatives(
-        f'Reporte Diario de Asistencia - {hoy.strftime("%d/%m/%Y")}',
+        asunto,
         'Reporte diario de asistencias. Por favor revisa el contenido HTML.',
         settings.DEFAULT_FROM_EMAIL,
         [config.email_gerente,'zuly.becerra@loginco.com.mx']
     )
-    email.attach_alternative(html_reporte, "text/html")
-    email.send(fail_silently=False)
+    email.attach_alternative(_html_reporte_diario(
+        hoy,
+        sum(empleados_por_departamento.values()),
+        sum(llegaron_por_departamento.values()),
+        retardos,
+        empleados_retardos_consecutivos
+    ), "text/html")
+
+    correos = [email]
+    if settings.REPORTES_POR_DEPARTAMENTO:
+        # Cada departamento con empleados activos recibe su parte de las mismas listas
+        retardos_por_departamento = agrupar_por_departamento(retardos, lambda r: r.empleado.departamento)
+        consecutivos_por_departamento = agrupar_por_departamento(empleados_retardos_consecutivos, attrgetter('departamento'))
+        for departamento in Departamento.objects.filter(pk__in=[pk for pk in empleados_por_departamento if pk]):
+            if departamento.email:
+                correos.append(correo_departamento(
+                    departamento,
+                    asunto,
+                    'Reporte diario de asistencias de tu departamento. Por favor revisa el contenido HTML.',
+                    _html_reporte_diario(
+                        hoy,
+                        empleados_por_departamento[departamento.pk],
+                        llegaron_por_departamento.get(departamento.pk, 0),
+                        retardos_por_departamento.get(departamento.pk, (None, []))[1],
+                        consecutivos_por_departamento.get(departamento.pk, (None, []))[1],
+                        departamento
+                    )
+                ))
+    enviar_correos(correos)
 
 
 def generar_reporte_quincenal(dia):
@@ -519,93 +727,24 @@ def generar_reporte_quincenal(dia):
     hoy = timezone.now().date()
 
     # Determinar el período
-    if dia == 13:
-        fecha_inicio = hoy.replace(day=1)
-        fecha_fin = hoy.replace(day=13)
-        periodo = "Primera Quincena"
-    else:  # día 28
-        fecha_inicio = hoy.replace(day=14)
-        # Último día del mes
-        if hoy.month == 12:
-            fecha_fin = hoy.replace(day=31)
-        else:
-            fecha_fin = (hoy.replace(month=hoy.month + 1, day=1) - timedelta(days=1))
-        periodo = "Segunda Quincena"
+    quincena = periodo_quincena(hoy.year, hoy.month, primera=(dia == 13))
+    fecha_inicio = quincena.inicio
+    fecha_fin = quincena.ultimo_dia
+    periodo = "Primera Quincena" if dia == 13 else "Segunda Quincena"
 
     config = ConfiguracionSistema.objects.first()
     if not config:
         return
 
-    # Obtener datos por empleado
-    empleados = Empleado.objects.filter(activo=True)
-
-    html_reporte = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; }}
-            table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-            th, td {{ border: 1px solid #ddd; padding: 10px; text-align: center; }}
-            th {{ background-color: #3b82f6; color: white; }}
-            tr:nth-child(even) {{ background-color: #f2f2f2; }}
-            .titulo {{ background-color: #1e40af; color: white; padding: 20px; text-align: center; }}
-        </style>
-    </head>
-    <body>
-        <div class="titulo">
-            <h1>Reporte de Asistencias - {periodo}</h1>
-            <p>{fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}</p>
-        </div>
-
-        <table>
-            <tr>
-                <th>Empleado</th>
-                <th>Código</th>
-                <th>Departamento</th>
-                <th>Días Asistidos</th>
-                <th>Retardos</th>
-                <th>Total Min. Retardo</th>
-                <th>Faltas</th>
-            </tr>
-    """
+    # Obtener datos por empleado desde los resúmenes diarios
+    resumen = resumen_asistencias_por_empleado(Empleado.objects.filter(activo=True), fecha_inicio, fecha_fin)
 
-    for empleado in empleados:
-        asistencias = Asistencia.objects.filter(
-            empleado=empleado,
-            fecha__gte=fecha_inicio,
-            fecha__lte=fecha_fin,
-            tipo_movimiento=TipoMovimiento.ENTRADA
-        )
-
-        dias_asistidos = asistencias.values('fecha').distinct().count()
-        retardos = asistencias.filter(retardo=True).count()
-        total_min_retardo = sum(asistencias.filter(retardo=True).values_list('minutos_retardo', flat=True))
-
-        # Calcular días/turnos laborales según tipo de horario
-        tipo_horario = empleado.tipo_horario
-        if tipo_horario and tipo_horario.es_turno_24h:
-            # Para turnos de 24h: calcular turnos esperados en el período
-            dias_periodo = (fecha_fin - fecha_inicio).days + 1
-            turnos_esperados = dias_periodo // 2
-            faltas = max(0, turnos_esperados - dias_asistidos)
-        else:
-            # Para horarios regulares: todos los días del período
-            dias_laborales = (fecha_fin - fecha_inicio).days + 1
-            faltas = dias_laborales - dias_asistidos
-
-        html_reporte += f"""
-            <tr>
-                <td>{empleado.user.get_full_name()}</td>
-                <td>{empleado.codigo_empleado}</td>
-                <td>{empleado.departamento.nombre if empleado.departamento else 'N/A'}</td>
-                <td>{dias_asistidos}</td>
-                <td>{retardos}</td>
-                <td>{total_min_retardo}</td>
-                <td>{faltas}</td>
-            </tr>
-        """
-
-    html_reporte += "</table></body></html>"
+    html_reporte = render_to_string('attendance/reportes/quincenal.html', {
+        'periodo': periodo,
+        'fecha_inicio': fecha_inicio,
+        'fecha_fin': fecha_fin,
+        'filas': _filas_resumen(resumen),
+    })
 
     # Enviar email
     email = EmailMultiAlternatives(
@@ -615,7 +754,33 @@ def generar_reporte_quincenal(dia):
         [config.email_gerente]
     )
     email.attach_alternative(html_reporte, "text/html")
-    email.send(fail_silently=False)
+    enviar_correos([email])
+
+
+def _html_reporte_tiempo_extra(hoy, tiempos_extra):
+    """HTML del reporte de tiempo extra: el detalle y el total de horas por empleado"""
+    filas = []
+    por_empleado = {}
+    for te in tiempos_extra:
+        nombre = te.empleado.user.get_full_name()
+        filas.append({
+            'nombre': nombre,
+            'codigo': te.empleado.codigo_empleado,
+            'fecha': te.fecha,
+            'horas_extra': te.horas_extra,
+            'descripcion': te.descripcion,
+        })
+        empleado = por_empleado.setdefault(te.empleado_id, {
+            'nombre': nombre, 'codigo': te.empleado.codigo_empleado, 'horas': 0
+        })
+        empleado['horas'] += float(te.horas_extra)
+
+    return render_to_string('attendance/reportes/tiempo_extra.html', {
+        'periodo': hoy.strftime('%B %Y'),
+        'filas': filas,
+        'total_horas': sum(empleado['horas'] for empleado in por_empleado.values()),
+        'por_empleado': por_empleado.values(),
+    })
 
 
 def generar_reporte_tiempo_extra_mensual():
@@ -630,89 +795,11 @@ def generar_reporte_tiempo_extra_mensual():
 
     # Obtener tiempos extra del mes
     tiempos_extra = TiempoExtra.objects.filter(
-        fecha__month=mes,
-        fecha__year=anio,
+        periodo_mes(anio, mes).filtro(),
         aprobado=True
     ).select_related('empleado', 'empleado__user')
 
-    # Generar HTML
-    html_reporte = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; }}
-            table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-            th, td {{ border: 1px solid #ddd; padding: 10px; text-align: left; }}
-            th {{ background-color: #10b981; color: white; }}
-            tr:nth-child(even) {{ background-color: #f2f2f2; }}
-            .total {{ background-color: #d1fae5; font-weight: bold; }}
-        </style>
-    </head>
-    <body>
-        <h1>Reporte de Tiempo Extra</h1>
-        <p><strong>Período:</strong> {hoy.strftime('%B %Y')}</p>
-
-        <table>
-            <tr>
-                <th>Empleado</th>
-                <th>Código</th>
-                <th>Fecha</th>
-                <th>Horas Extra</th>
-                <th>Descripción</th>
-            </tr>
-    """
-
-    total_horas = 0
-    empleados_resumen = {}
-
-    for te in tiempos_extra:
-        html_reporte += f"""
-            <tr>
-                <td>{te.empleado.user.get_full_name()}</td>
-                <td>{te.empleado.codigo_empleado}</td>
-                <td>{te.fecha.strftime('%d/%m/%Y')}</td>
-                <td>{te.horas_extra}</td>
-                <td>{te.descripcion}</td>
-            </tr>
-        """
-        total_horas += float(te.horas_extra)
-
-        emp_id = te.empleado.id
-        if emp_id not in empleados_resumen:
-            empleados_resumen[emp_id] = {
-                'nombre': te.empleado.user.get_full_name(),
-                'codigo': te.empleado.codigo_empleado,
-                'horas': 0
-            }
-        empleados_resumen[emp_id]['horas'] += float(te.horas_extra)
-
-    html_reporte += f"""
-            <tr class="total">
-                <td colspan="3">TOTAL</td>
-                <td>{total_horas:.2f}</td>
-                <td></td>
-            </tr>
-        </table>
-
-        <h2>Resumen por Empleado</h2>
-        <table>
-            <tr>
-                <th>Empleado</th>
-                <th>Código</th>
-                <th>Total Horas Extra</th>
-            </tr>
-    """
-
-    for emp in empleados_resumen.values():
-        html_reporte += f"""
-            <tr>
-                <td>{emp['nombre']}</td>
-                <td>{emp['codigo']}</td>
-                <td>{emp['horas']:.2f}</td>
-            </tr>
-        """
-
-    html_reporte += "</table></body></html>"
+    html_reporte = _html_reporte_tiempo_extra(hoy, tiempos_extra)
 
     # Guardar en ruta de red
     nombre_archivo = f"reporte_tiempo_extra_{anio}_{mes:02d}.html"
@@ -727,163 +814,225 @@ def generar_reporte_tiempo_extra_mensual():
 
 # ========== FUNCIONES PARA REPORTES EXCEL ==========
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from io import BytesIO
+from itertools import groupby
+from .excel import LibroExcel, TAMANO_LOTE
+from .paralelo import filas_por_departamento, filtro_departamentos
+
+NOMBRES_MOVIMIENTO = dict(TipoMovimiento.choices)
+
+
+def _nombre_completo(nombre, apellido):
+    """Equivalente a User.get_full_name() para filas obtenidas con values()"""
+    return f"{nombre} {apellido}".strip()
+
+
+def filas_reporte_semanal(fecha_inicio, fecha_fin, departamentos=None):
+    """
+    Genera (clave, fila) del reporte semanal: una fila por empleado y día con al
+    menos una checada, en orden de fecha y código.
+
+    Args:
+        departamentos: ids de Departamento a incluir (None dentro de la lista = sin
+            departamento); por defecto todos. Ver attendance.paralelo.
+    """
+    # Todas las checadas de empleados activos del período, ya en el orden de las filas
+    checadas_periodo = Asistencia.objects.filter(
+        empleado__activo=True,
+        fecha__gte=fecha_inicio,
+        fecha__lte=fecha_fin
+    )
+    if departamentos is not None:
+        checadas_periodo = checadas_periodo.filter(filtro_departamentos(departamentos))
+    checadas_periodo = checadas_periodo.order_by('fecha', 'empleado__codigo_empleado', 'hora').annotate(
+        nombre=F('empleado__user__first_name'),
+        apellido=F('empleado__user__last_name'),
+        codigo=F('empleado__codigo_empleado'),
+        departamento=F('empleado__departamento__nombre')
+    ).values_list(
+        'fecha', 'empleado_id', 'nombre', 'apellido', 'codigo', 'departamento',
+        'tipo_movimiento', 'hora', 'retardo', 'minutos_retardo', named=True
+    )
+    
+    # Una fila por empleado y día con al menos una checada
+    filas_por_dia = groupby(
+        checadas_periodo.iterator(chunk_size=TAMANO_LOTE),
+        key=lambda checada: (checada.fecha, checada.empleado_id)
+    )
+    for _, checadas_dia in filas_por_dia:
+        checadas = {}
+        for checada in checadas_dia:
+            # Si hay varias del mismo tipo, se queda la última del día
+            checadas[checada.tipo_movimiento] = checada
+        
+        # Entrada
+        entrada = checadas.get('ENTRADA')
+        hora_entrada = None
+        if entrada:
+            hora_entrada = entrada.hora.strftime('%H:%M')
+            if entrada.retardo:
+                hora_entrada += f" (Retardo: {entrada.minutos_retardo} min)"
+        
+        # Salida a comida, entrada de comida y salida
+        demas_horas = [
+            checadas[tipo].hora.strftime('%H:%M') if tipo in checadas else None
+            for tipo in ('SALIDA_COMIDA', 'ENTRADA_COMIDA', 'SALIDA')
+        ]
+        
+        yield (checada.fecha, checada.codigo), [
+            checada.fecha.strftime('%d/%m/%Y'),
+            _nombre_completo(checada.nombre, checada.apellido),
+            checada.codigo,
+            checada.departamento or 'N/A',
+            hora_entrada,
+            *demas_horas,
+        ]
+
 
-def generar_excel_reporte_semanal(fecha_inicio, fecha_fin):
+def generar_excel_reporte_semanal(fecha_inicio, fecha_fin, destino=None, procesos=None):
     """
     Genera un archivo Excel con todas las checadas de la semana.
     
+    Las checadas se leen en una sola consulta recorrida por lotes y cada fila se
+    escribe en cuanto se arma, sin mantener el libro completo en memoria. Con
+    varios procesos, cada departamento se arma en uno distinto (attendance.paralelo).
+    
     Args:
         fecha_inicio: datetime.date - Inicio del período (lunes)
         fecha_fin: datetime.date - Fin del período (jueves o viernes)
+        destino: archivo binario donde escribir; por defecto un BytesIO nuevo
+        procesos: int - Procesos para armar las filas; por defecto settings.REPORTES_PROCESOS
     
     Returns:
-        BytesIO: Buffer con el archivo Excel generado
+        BytesIO (o destino): Buffer con el archivo Excel generado
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reporte Semanal"
-    
-    # Estilos
-    header_fill = PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    title_font = Font(bold=True, size=14)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+    libro = LibroExcel()
+    ws = libro.hoja("Reporte Semanal", [12, 30, 12, 20, 25, 15, 15, 12])
     
     # Título
-    ws['A1'] = "REPORTE SEMANAL DE ASISTENCIAS"
-    ws['A1'].font = title_font
-    ws.merge_cells('A1:H1')
-    
-    ws['A2'] = f"Período: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}"
-    ws.merge_cells('A2:H2')
+    ws.titulo("REPORTE SEMANAL DE ASISTENCIAS", 8)
+    ws.titulo(f"Período: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}", 8, estilo=None)
+    ws.vacia()
     
     # Encabezados
-    headers = ['Fecha', 'Empleado', 'Código', 'Departamento', 'Entrada', 'Salida Comida', 'Entrada Comida', 'Salida']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=4, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-    
-    # Obtener empleados activos
-    empleados = Empleado.objects.filter(activo=True).select_related('user', 'departamento').order_by('codigo_empleado')
-    
-    row = 5
-    fecha_actual = fecha_inicio
-    
-    # Iterar por cada fecha en el rango
-    while fecha_actual <= fecha_fin:
-        for empleado in empleados:
-            # Obtener asistencias del día
-            asistencias = Asistencia.objects.filter(
-                empleado=empleado,
-                fecha=fecha_actual
-            ).order_by('hora')
-            
-            if asistencias.exists():
-                # Organizar por tipo de movimiento
-                checadas = {
-                    'ENTRADA': None,
-                    'SALIDA_COMIDA': None,
-                    'ENTRADA_COMIDA': None,
-                    'SALIDA': None
-                }
-                
-                for asist in asistencias:
-                    checadas[asist.tipo_movimiento] = asist
-                
-                # Escribir fila
-                ws.cell(row=row, column=1, value=fecha_actual.strftime('%d/%m/%Y'))
-                ws.cell(row=row, column=2, value=empleado.user.get_full_name())
-                ws.cell(row=row, column=3, value=empleado.codigo_empleado)
-                ws.cell(row=row, column=4, value=empleado.departamento.nombre if empleado.departamento else 'N/A')
-                
-                # Entrada
-                if checadas['ENTRADA']:
-                    hora_str = checadas['ENTRADA'].hora.strftime('%H:%M')
-                    if checadas['ENTRADA'].retardo:
-                        hora_str += f" (Retardo: {checadas['ENTRADA'].minutos_retardo} min)"
-                    ws.cell(row=row, column=5, value=hora_str)
-                
-                # Salida a comida
-                if checadas['SALIDA_COMIDA']:
-                    ws.cell(row=row, column=6, value=checadas['SALIDA_COMIDA'].hora.strftime('%H:%M'))
-                
-                # Entrada de comida
-                if checadas['ENTRADA_COMIDA']:
-                    ws.cell(row=row, column=7, value=checadas['ENTRADA_COMIDA'].hora.strftime('%H:%M'))
-                
-                # Salida
-                if checadas['SALIDA']:
-                    ws.cell(row=row, column=8, value=checadas['SALIDA'].hora.strftime('%H:%M'))
-                
-                # Aplicar bordes
-                for col in range(1, 9):
-                    ws.cell(row=row, column=col).border = border
-                
-                row += 1
-        
-        fecha_actual += timedelta(days=1)
+    ws.encabezados(
+        ['Fecha', 'Empleado', 'Código', 'Departamento', 'Entrada', 'Salida Comida', 'Entrada Comida', 'Salida'],
+        libro.estilo_encabezado("3B82F6", tamano=12)
+    )
     
-    # Ajustar ancho de columnas
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 20
-    ws.column_dimensions['E'].width = 25
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 12
+    for fila in filas_por_departamento(filas_reporte_semanal, fecha_inicio, fecha_fin, procesos=procesos):
+        ws.fila(fila)
     
-    # Guardar en BytesIO
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer
+    return libro.guardar(destino)
+
+
+def resumen_asistencias_por_empleado(empleados, fecha_inicio, fecha_fin):
+    """
+    Calcula los indicadores de asistencia de cada empleado en un rango con una sola
+    consulta agrupada sobre ResumenDiarioAsistencia (una fila por empleado y día).
+
+    Los días que todavía no tienen resumen (hoy sin checada, o días aún no
+    reconciliados por el job nocturno) no cuentan como esperados ni como faltas.
+
+    Args:
+        empleados: QuerySet o lista de Empleado (define el orden del resultado)
+        fecha_inicio: datetime.date - Primer día (incluido)
+        fecha_fin: datetime.date - Último día (incluido)
+
+    Returns:
+        list: un dict por empleado con las claves empleado, dias_asistidos, retardos,
+        minutos_retardo, permisos (días), dias_esperados y faltas
+    """
+    if isinstance(empleados, QuerySet):
+        empleados = empleados.select_related('user', 'departamento', 'tipo_horario')
+    empleados = list(empleados)
+
+    asistio = Q(primera_entrada__isnull=False)
+    totales = {
+        fila['empleado']: fila
+        for fila in ResumenDiarioAsistencia.objects.filter(
+            empleado_id__in=[e.id for e in empleados],
+            fecha__gte=fecha_inicio,
+            fecha__lte=fecha_fin
+        ).values('empleado').annotate(
+            dias_asistidos=Count('id', filter=asistio),
+            retardos=Count('id', filter=Q(retardo=True)),
+            minutos_retardo=Sum('minutos_retardo', filter=Q(retardo=True)),
+            permisos=Count('id', filter=Q(ausencia=AusenciaDia.PERMISO)),
+            dias_esperados=Count('id', filter=Q(es_dia_laboral=True)),
+            faltas=Count('id', filter=Q(es_dia_laboral=True, ausencia=AusenciaDia.NINGUNA) & ~asistio)
+        )
+    }
 
-def generar_excel_reporte_mensual(mes, anio):
+    resumen = []
+    for empleado in empleados:
+        fila = totales.get(empleado.id, {})
+        resumen.append({
+            'empleado': empleado,
+            'dias_asistidos': fila.get('dias_asistidos', 0),
+            'retardos': fila.get('retardos', 0),
+            'minutos_retardo': fila.get('minutos_retardo') or 0,
+            'permisos': fila.get('permisos', 0),
+            'dias_esperados': fila.get('dias_esperados', 0),
+            'faltas': fila.get('faltas', 0),
+        })
+    return resumen
+
+
+def filas_detalle_mensual(fecha_inicio, fecha_fin, departamentos=None):
+    """
+    Genera (clave, fila) de la hoja de detalle: una fila por checada del rango, en
+    orden de fecha, código y hora. departamentos como en filas_reporte_semanal.
+    """
+    # Recorridas por lotes para no cargarlas completas en memoria
+    asistencias = Asistencia.objects.filter(fecha__gte=fecha_inicio, fecha__lte=fecha_fin)
+    if departamentos is not None:
+        asistencias = asistencias.filter(filtro_departamentos(departamentos))
+    asistencias = asistencias.order_by('fecha', 'empleado__codigo_empleado', 'hora').values_list(
+        'fecha', 'empleado__user__first_name', 'empleado__user__last_name', 'empleado__codigo_empleado',
+        'tipo_movimiento', 'hora', 'retardo', 'minutos_retardo'
+    )
+    
+    for fecha, nombre, apellido, codigo, tipo_movimiento, hora, retardo, minutos_retardo in asistencias.iterator(chunk_size=TAMANO_LOTE):
+        yield (fecha, codigo, hora), [
+            fecha.strftime('%d/%m/%Y'),
+            _nombre_completo(nombre, apellido),
+            codigo,
+            NOMBRES_MOVIMIENTO.get(tipo_movimiento, tipo_movimiento),
+            hora.strftime('%H:%M:%S'),
+            'Sí' if retardo else 'No',
+            minutos_retardo if retardo else 0,
+        ]
+
+
+def generar_excel_reporte_mensual(mes, anio, destino=None, progreso=None, procesos=None):
     """
     Genera un archivo Excel detallado del reporte mensual.
     
     Args:
         mes: int - Mes (1-12)
         anio: int - Año
+        destino: archivo binario donde escribir; por defecto un BytesIO nuevo
+        progreso: callable(porcentaje) opcional que se llama al terminar cada etapa
+        procesos: int - Procesos para armar el detalle por departamento; por defecto
+            settings.REPORTES_PROCESOS
     
     Returns:
-        BytesIO: Buffer con el archivo Excel generado
+        BytesIO (o destino): Buffer con el archivo Excel generado
     """
-    wb = Workbook()
+    libro = LibroExcel()
     
     # Hoja 1: Resumen por empleado
-    ws_resumen = wb.active
-    ws_resumen.title = "Resumen"
+    ws_resumen = libro.hoja("Resumen", [30, 12, 20, 15, 15, 15, 15, 15, 15])
     
     # Hoja 2: Detalle de asistencias
-    ws_detalle = wb.create_sheet("Detalle de Asistencias")
+    ws_detalle = libro.hoja("Detalle de Asistencias", [20, 20, 20, 20, 20, 12, 15])
     
     # Hoja 3: Retardos y faltas
-    ws_retardos = wb.create_sheet("Retardos y Faltas")
+    ws_retardos = libro.hoja("Retardos y Faltas", [30, 12, 20, 15, 15, 15])
     
     # Estilos
-    header_fill = PatternFill(start_color="10B981", end_color="10B981", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    title_font = Font(bold=True, size=14)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+    encabezado = libro.estilo_encabezado("10B981")
+    encabezado_retardos = libro.estilo_encabezado("EF4444")
     
     # Obtener nombre del mes
     from calendar import month_name
@@ -894,191 +1043,70 @@ def generar_excel_reporte_mensual(mes, anio):
         pass
     nombre_mes = month_name[mes] if mes <= 12 else str(mes)
     
-    # ===== HOJA 1: RESUMEN =====
-    ws_resumen['A1'] = f"REPORTE MENSUAL DE ASISTENCIAS - {nombre_mes.upper()} {anio}"
-    ws_resumen['A1'].font = title_font
-    ws_resumen.merge_cells('A1:H1')
+    # Calcular el resumen una sola vez; lo comparten la hoja 1 y la hoja 3.
+    # En meses cerrados se lee el resumen precalculado por el job nocturno.
+    from .resumen_mensual import resumen_mensual_por_empleado
+    periodo = periodo_mes(anio, mes)
+    resumen = resumen_mensual_por_empleado(anio, mes)
+    avanzar = progreso or (lambda porcentaje: None)
+    avanzar(20)
     
-    headers_resumen = ['Empleado', 'Código', 'Departamento', 'Días Asistidos', 'Retardos', 'Min. Retardo', 'Faltas', 'Permisos']
-    for col, header in enumerate(headers_resumen, start=1):
-        cell = ws_resumen.cell(row=3, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-    
-    # Obtener datos
-    from .models import SolicitudPermiso, SolicitudVacaciones, EstadoSolicitud
-    empleados = Empleado.objects.filter(activo=True).select_related('user', 'departamento').order_by('codigo_empleado')
-    
-    # Calcular días laborales del mes
-    from calendar import monthrange
-    dias_mes = monthrange(anio, mes)[1]
-    fecha_inicio_mes = date(anio, mes, 1)
-    fecha_fin_mes = date(anio, mes, dias_mes)
-    
-    row_resumen = 4
-    for empleado in empleados:
-        asistencias = Asistencia.objects.filter(
-            empleado=empleado,
-            fecha__month=mes,
-            fecha__year=anio,
-            tipo_movimiento=TipoMovimiento.ENTRADA
-        )
-        
-        dias_asistidos = asistencias.values('fecha').distinct().count()
-        retardos = asistencias.filter(retardo=True).count()
-        total_min_retardo = sum(asistencias.filter(retardo=True).values_list('minutos_retardo', flat=True))
-        
-        # Contar permisos aprobados
-        permisos_dias = SolicitudPermiso.objects.filter(
-            empleado=empleado,
-            fecha_inicio__lte=fecha_fin_mes,
-            fecha_fin__gte=fecha_inicio_mes,
-            estado__in=[EstadoSolicitud.APROBADO_JEFE, EstadoSolicitud.APROBADO_GERENCIA]
-        ).count()
-        
-        # Calcular días laborales esperados
-        horario = obtener_horario_esperado(empleado, fecha_inicio_mes)
-        if horario['tipo_sistema'] == 'TURNO_24H':
-            # Turnos 24h: aproximadamente 15 turnos al mes
-            dias_esperados = 15
-        else:
-            # Contar días laborales (lunes a viernes por defecto)
-            dias_esperados = 0
-            fecha_temp = fecha_inicio_mes
-            while fecha_temp <= fecha_fin_mes:
-                if fecha_temp.weekday() < 5:  # Lunes a viernes
-                    dias_esperados += 1
-                fecha_temp += timedelta(days=1)
-        
-        faltas = dias_esperados - dias_asistidos - permisos_dias
-        if faltas < 0:
-            faltas = 0
-        
-        ws_resumen.cell(row=row_resumen, column=1, value=empleado.user.get_full_name())
-        ws_resumen.cell(row=row_resumen, column=2, value=empleado.codigo_empleado)
-        ws_resumen.cell(row=row_resumen, column=3, value=empleado.departamento.nombre if empleado.departamento else 'N/A')
-        ws_resumen.cell(row=row_resumen, column=4, value=dias_asistidos)
-        ws_resumen.cell(row=row_resumen, column=5, value=retardos)
-        ws_resumen.cell(row=row_resumen, column=6, value=total_min_retardo)
-        ws_resumen.cell(row=row_resumen, column=7, value=faltas)
-        ws_resumen.cell(row=row_resumen, column=8, value=permisos_dias)
-        
-        for col in range(1, 9):
-            ws_resumen.cell(row=row_resumen, column=col).border = border
-        
-        row_resumen += 1
+    # ===== HOJA 1: RESUMEN =====
+    ws_resumen.titulo(f"REPORTE MENSUAL DE ASISTENCIAS - {nombre_mes.upper()} {anio}", 9)
+    ws_resumen.vacia()
+    ws_resumen.encabezados(
+        ['Empleado', 'Código', 'Departamento', 'Días Asistidos', 'Retardos', 'Min. Retardo', 'Faltas', 'Permisos', 'Horas Extra'],
+        encabezado
+    )
     
-    # Ajustar anchos
-    ws_resumen.column_dimensions['A'].width = 30
-    ws_resumen.column_dimensions['B'].width = 12
-    ws_resumen.column_dimensions['C'].width = 20
-    for col in ['D', 'E', 'F', 'G', 'H']:
-        ws_resumen.column_dimensions[col].width = 15
+    for fila in resumen:
+        empleado = fila['empleado']
+        ws_resumen.fila([
+            empleado.user.get_full_name(),
+            empleado.codigo_empleado,
+            empleado.departamento.nombre if empleado.departamento else 'N/A',
+            fila['dias_asistidos'],
+            fila['retardos'],
+            fila['minutos_retardo'],
+            fila['faltas'],
+            fila['permisos'],
+            fila['horas_extra'],
+        ])
+    avanzar(30)
     
     # ===== HOJA 2: DETALLE DE ASISTENCIAS =====
-    ws_detalle['A1'] = "DETALLE DE TODAS LAS ASISTENCIAS"
-    ws_detalle['A1'].font = title_font
-    ws_detalle.merge_cells('A1:G1')
-    
-    headers_detalle = ['Fecha', 'Empleado', 'Código', 'Tipo Movimiento', 'Hora', 'Retardo', 'Min. Retardo']
-    for col, header in enumerate(headers_detalle, start=1):
-        cell = ws_detalle.cell(row=3, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-    
-    # Obtener todas las asistencias del mes
-    asistencias_mes = Asistencia.objects.filter(
-        fecha__month=mes,
-        fecha__year=anio
-    ).select_related('empleado', 'empleado__user').order_by('fecha', 'empleado__codigo_empleado', 'hora')
-    
-    row_detalle = 4
-    for asist in asistencias_mes:
-        ws_detalle.cell(row=row_detalle, column=1, value=asist.fecha.strftime('%d/%m/%Y'))
-        ws_detalle.cell(row=row_detalle, column=2, value=asist.empleado.user.get_full_name())
-        ws_detalle.cell(row=row_detalle, column=3, value=asist.empleado.codigo_empleado)
-        ws_detalle.cell(row=row_detalle, column=4, value=asist.get_tipo_movimiento_display())
-        ws_detalle.cell(row=row_detalle, column=5, value=asist.hora.strftime('%H:%M:%S'))
-        ws_detalle.cell(row=row_detalle, column=6, value='Sí' if asist.retardo else 'No')
-        ws_detalle.cell(row=row_detalle, column=7, value=asist.minutos_retardo if asist.retardo else 0)
-        
-        for col in range(1, 8):
-            ws_detalle.cell(row=row_detalle, column=col).border = border
-        
-        row_detalle += 1
+    ws_detalle.titulo("DETALLE DE TODAS LAS ASISTENCIAS", 7)
+    ws_detalle.vacia()
+    ws_detalle.encabezados(
+        ['Fecha', 'Empleado', 'Código', 'Tipo Movimiento', 'Hora', 'Retardo', 'Min. Retardo'],
+        encabezado
+    )
     
-    # Ajustar anchos
-    for col in ['A', 'B', 'C', 'D', 'E']:
-        ws_detalle.column_dimensions[col].width = 20
-    ws_detalle.column_dimensions['F'].width = 12
-    ws_detalle.column_dimensions['G'].width = 15
+    # Todas las asistencias del mes (en paralelo por departamento si hay varios procesos)
+    for fila in filas_por_departamento(filas_detalle_mensual, periodo.inicio, periodo.ultimo_dia, procesos=procesos):
+        ws_detalle.fila(fila)
+    avanzar(70)
     
     # ===== HOJA 3: RETARDOS Y FALTAS =====
-    ws_retardos['A1'] = "EMPLEADOS CON RETARDOS Y FALTAS"
-    ws_retardos['A1'].font = title_font
-    ws_retardos.merge_cells('A1:F1')
-    
-    headers_retardos = ['Empleado', 'Código', 'Departamento', 'Total Retardos', 'Total Min.', 'Faltas']
-    for col, header in enumerate(headers_retardos, start=1):
-        cell = ws_retardos.cell(row=3, column=col, value=header)
-        cell.fill = PatternFill(start_color="EF4444", end_color="EF4444", fill_type="solid")
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
+    ws_retardos.titulo("EMPLEADOS CON RETARDOS Y FALTAS", 6)
+    ws_retardos.vacia()
+    ws_retardos.encabezados(
+        ['Empleado', 'Código', 'Departamento', 'Total Retardos', 'Total Min.', 'Faltas'],
+        encabezado_retardos
+    )
     
-    row_retardos = 4
-    for empleado in empleados:
-        asistencias = Asistencia.objects.filter(
-            empleado=empleado,
-            fecha__month=mes,
-            fecha__year=anio,
-            tipo_movimiento=TipoMovimiento.ENTRADA
-        )
-        
-        retardos = asistencias.filter(retardo=True)
-        total_retardos = retardos.count()
-        total_min = sum(retardos.values_list('minutos_retardo', flat=True))
-        
-        dias_asistidos = asistencias.values('fecha').distinct().count()
-        
-        # Calcular faltas
-        horario = obtener_horario_esperado(empleado, fecha_inicio_mes)
-        if horario['tipo_sistema'] == 'TURNO_24H':
-            dias_esperados = 15
-        else:
-            dias_esperados = sum(1 for d in range(dias_mes) if date(anio, mes, d+1).weekday() < 5)
-        
-        faltas = dias_esperados - dias_asistidos
-        if faltas < 0:
-            faltas = 0
-        
+    for fila in resumen:
+        empleado = fila['empleado']
         # Solo incluir empleados con retardos o faltas
-        if total_retardos > 0 or faltas > 0:
-            ws_retardos.cell(row=row_retardos, column=1, value=empleado.user.get_full_name())
-            ws_retardos.cell(row=row_retardos, column=2, value=empleado.codigo_empleado)
-            ws_retardos.cell(row=row_retardos, column=3, value=empleado.departamento.nombre if empleado.departamento else 'N/A')
-            ws_retardos.cell(row=row_retardos, column=4, value=total_retardos)
-            ws_retardos.cell(row=row_retardos, column=5, value=total_min)
-            ws_retardos.cell(row=row_retardos, column=6, value=faltas)
-            
-            for col in range(1, 7):
-                ws_retardos.cell(row=row_retardos, column=col).border = border
-            
-            row_retardos += 1
-    
-    # Ajustar anchos
-    ws_retardos.column_dimensions['A'].width = 30
-    ws_retardos.column_dimensions['B'].width = 12
-    ws_retardos.column_dimensions['C'].width = 20
-    for col in ['D', 'E', 'F']:
-        ws_retardos.column_dimensions[col].width = 15
+        if fila['retardos'] > 0 or fila['faltas'] > 0:
+            ws_retardos.fila([
+                empleado.user.get_full_name(),
+                empleado.codigo_empleado,
+                empleado.departamento.nombre if empleado.departamento else 'N/A',
+                fila['retardos'],
+                fila['minutos_retardo'],
+                fila['faltas'],
+            ])
+    avanzar(80)
     
-    # Guardar en BytesIO
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer
+    return libro.guardar(destino)
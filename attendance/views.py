@@ -1,20 +1,27 @@
-from django.shortcuts import render, redirect
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse, HttpResponse
 from django.views.generic import CreateView, ListView
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from datetime import datetime, timedelta
 from django.views.decorators.http import require_http_methods
 from .models import (
-    Empleado, Asistencia, TipoMovimiento, Visitante,
-    RegistroVisita, TiempoExtra, ConfiguracionSistema,
-    SolicitudPermiso, SolicitudVacaciones, EstadoSolicitud, TipoAusencia,
-    AsignacionTurnoDiaria, TurnoRotativo
+    Empleado, Visitante, RegistroVisita, TiempoExtra,
+    AsignacionTurnoDiaria, TurnoRotativo, ResumenDiarioAsistencia,
+    TareaReporte, TipoTareaReporte, EstadoTarea
 )
+from checador.storage_backends import get_reportes_storage
+from .artefactos import artefacto_existente, respuesta_artefacto
 from .forms import VisitanteForm, CheckInForm
-from .utils import enviar_email_visitante, generar_reporte_diario, generar_reporte_quincenal
+from .checkin import empleado_checkin_por_qr, registrar_checada, registrar_lote
+from .periodos import periodo_mes
+from .tareas import encolar_tarea, estado_tarea
+from .utils import enviar_email_visitante, generar_reporte_diario, generar_reporte_quincenal, empleados_con_retardos
 import json
+import uuid
 from django.views.decorators.csrf import csrf_exempt
 
 # Health check endpoint para DigitalOcean
@@ -77,12 +84,11 @@ def checkin_view(request):
                     messages.error(request, 'Visitante no encontrado')
                     return redirect('checkin')
 
-            # Verificar si es empleado
-            try:
-                empleado = Empleado.objects.get(qr_uuid=qr_code, activo=True)
+            # Verificar si es empleado (la identidad sale de la caché de QR)
+            empleado = empleado_checkin_por_qr(qr_code, timezone.localdate())
+            if empleado:
                 return procesar_checkin_empleado(request, empleado)
-            except Empleado.DoesNotExist:
-                messages.error(request, 'Código QR no válido')
+            messages.error(request, 'Código QR no válido')
     else:
         form = CheckInForm()
 
@@ -90,205 +96,136 @@ def checkin_view(request):
 
 # Vista para tablet de recepción
 def checkin_view_tablet(request):
-    """Vista principal para la tablet de checkin en recepción"""
+    """Vista principal para la tablet de checkin en recepción (las checadas van por checkin_api)"""
     if request.method == 'POST':
+        # Ingreso sin JavaScript: mismo flujo que checkin_api con mensajes y redirección
         form = CheckInForm(request.POST)
         if form.is_valid():
-            qr_code = form.cleaned_data['qr_code']
-
-            # Verificar si es empleado
-            try:
-                empleado = Empleado.objects.get(qr_uuid=qr_code, activo=True)
-                return procesar_checkin_empleado(request, empleado, redirect_to='checkin_tablet')
-            except Empleado.DoesNotExist:
-                pass
-
-            # Verificar si es visitante
-            try:
-                if qr_code.startswith('VISITANTE:'):
-                    uuid_visitante = qr_code.replace('VISITANTE:', '')
-                    visitante = Visitante.objects.get(qr_uuid=uuid_visitante)
-                    return procesar_checkin_visitante(request, visitante, redirect_to='checkin_tablet')
-            except Visitante.DoesNotExist:
-                pass
-
+            tipo, registro = resolver_qr(form.cleaned_data['qr_code'])
+            if tipo == 'empleado':
+                return procesar_checkin_empleado(request, registro, redirect_to='checkin_tablet')
+            if tipo == 'visitante':
+                return procesar_checkin_visitante(request, registro, redirect_to='checkin_tablet')
             messages.error(request, 'Código QR no válido')
     else:
         form = CheckInForm()
 
     return render(request, 'attendance/checkin_tablet.html', {'form': form})
 
+def resolver_qr(qr_code):
+    """
+    Identifica el QR escaneado en la tablet.
+
+    Returns:
+        ('empleado', Empleado con las anotaciones de check-in), ('visitante', Visitante)
+        o (None, None) si no es válido
+    """
+    # La identidad del empleado sale de la caché de QR
+    empleado = empleado_checkin_por_qr(qr_code, timezone.localdate())
+    if empleado:
+        return 'empleado', empleado
+
+    if qr_code.startswith('VISITANTE:'):
+        try:
+            return 'visitante', Visitante.objects.get(qr_uuid=uuid.UUID(qr_code.replace('VISITANTE:', '')))
+        except (ValueError, Visitante.DoesNotExist):
+            pass
+    return None, None
+
+@require_http_methods(["POST"])
+def checkin_api(request):
+    """
+    Checada desde la tablet por AJAX: la página se actualiza en su lugar sin detener la
+    cámara, sin redirección ni escritura de mensajes en la sesión.
+
+    Responde JSON con ok, tipo ('empleado' o 'visitante'), movimiento, retardo,
+    minutos_retardo, mensaje, error, avisos ([{nivel, texto}]) y repetida (escaneo dentro
+    de CHECKIN_ANTIRREBOTE_SEGUNDOS que no registró otra checada).
+    """
+    form = CheckInForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'ok': False, 'error': 'Falta el código QR'}, status=400)
+
+    tipo, registro = resolver_qr(form.cleaned_data['qr_code'])
+    if tipo == 'empleado':
+        resultado = registrar_checada(registro)
+        asistencia = resultado['asistencia']
+        return JsonResponse({
+            'ok': resultado['error'] is None,
+            'tipo': tipo,
+            'movimiento': asistencia.tipo_movimiento if asistencia else None,
+            'retardo': bool(asistencia and asistencia.retardo),
+            'minutos_retardo': asistencia.minutos_retardo if asistencia else 0,
+            'mensaje': resultado['mensaje'],
+            'error': resultado['error'],
+            'avisos': [{'nivel': nivel, 'texto': texto} for nivel, texto in resultado['avisos']],
+            'repetida': resultado['repetida'],
+        })
+    if tipo == 'visitante':
+        resultado = registrar_movimiento_visitante(registro)
+        return JsonResponse({
+            'ok': resultado['error'] is None,
+            'tipo': tipo,
+            'movimiento': resultado['movimiento'],
+            'retardo': False,
+            'minutos_retardo': 0,
+            'mensaje': resultado['mensaje'],
+            'error': resultado['error'],
+            'avisos': [],
+            'repetida': False,
+        })
+    return JsonResponse({'ok': False, 'error': 'Código QR no válido'}, status=404)
+
+@require_http_methods(["POST"])
+def checkin_lote_api(request):
+    """
+    Sincroniza los escaneos que la tablet guardó sin conexión (o una ráfaga de escaneos).
+
+    Recibe JSON {"escaneos": [{qr_code, timestamp, dispositivo, nonce}, ...]} y responde
+    {"resultados": [...]} en el mismo orden (ver checkin.registrar_lote). Cada resultado
+    es definitivo: la tablet puede quitar de su cola todos los escaneos respondidos.
+    """
+    try:
+        escaneos = json.loads(request.body)['escaneos']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Se esperaba {"escaneos": [...]}'}, status=400)
+    if not isinstance(escaneos, list):
+        return JsonResponse({'error': 'escaneos debe ser una lista'}, status=400)
+    if len(escaneos) > settings.CHECKIN_LOTE_MAXIMO:
+        return JsonResponse({'error': f'Máximo {settings.CHECKIN_LOTE_MAXIMO} escaneos por lote'}, status=413)
+
+    return JsonResponse({'resultados': registrar_lote(escaneos)})
+
 def procesar_checkin_empleado(request, empleado, redirect_to='checkin'):
     """Procesa el check-in de un empleado"""
-    hoy = timezone.now().date()
-    ahora = timezone.now().time()
-    
-    # === VALIDAR PERMISOS Y VACACIONES ===
-    
-    # Verificar si tiene vacaciones aprobadas para hoy
-    vacaciones_activas = SolicitudVacaciones.objects.filter(
-        empleado=empleado,
-        fecha_inicio__lte=hoy,
-        fecha_fin__gte=hoy,
-        estado__in=[EstadoSolicitud.APROBADO_JEFE, EstadoSolicitud.APROBADO_GERENCIA]
-    ).first()
-    
-    if vacaciones_activas:
-        messages.warning(
-            request,
-            f"{empleado.user.get_full_name()} - Tienes vacaciones aprobadas del {vacaciones_activas.fecha_inicio} al {vacaciones_activas.fecha_fin}. No deberías estar registrando asistencia."
-        )
-        # Permitir el registro pero con advertencia
-    
-    # Verificar si tiene permiso de día completo aprobado para hoy
-    permiso_dia_completo = SolicitudPermiso.objects.filter(
-        empleado=empleado,
-        tipo_ausencia=TipoAusencia.DIAS_COMPLETOS,
-        fecha_inicio__lte=hoy,
-        fecha_fin__gte=hoy,
-        estado__in=[EstadoSolicitud.APROBADO_JEFE, EstadoSolicitud.APROBADO_GERENCIA]
-    ).first()
-    
-    if permiso_dia_completo:
-        messages.warning(
-            request,
-            f"{empleado.user.get_full_name()} - Tienes permiso aprobado para hoy ({permiso_dia_completo.tipo_permiso.nombre}). No deberías estar registrando asistencia."
-        )
-        # Permitir el registro pero con advertencia
-    
-    # Verificar si tiene permiso por horas aprobado para esta hora
-    permiso_horas = SolicitudPermiso.objects.filter(
-        empleado=empleado,
-        tipo_ausencia=TipoAusencia.HORAS,
-        fecha_inicio=hoy,
-        estado__in=[EstadoSolicitud.APROBADO_JEFE, EstadoSolicitud.APROBADO_GERENCIA]
-    ).first()
-    
-    if permiso_horas and permiso_horas.hora_inicio and permiso_horas.hora_fin:
-        # Verificar si la hora actual está dentro del rango del permiso
-        if permiso_horas.hora_inicio <= ahora <= permiso_horas.hora_fin:
-            messages.info(
-                request,
-                f"{empleado.user.get_full_name()} - Tienes permiso por horas de {permiso_horas.hora_inicio.strftime('%H:%M')} a {permiso_horas.hora_fin.strftime('%H:%M')}."
-            )
-    
-    # === CONTINUAR CON LÓGICA NORMAL ===
-    
-    ultima_asistencia = Asistencia.objects.filter(
-        empleado=empleado,
-        fecha=hoy
-    ).order_by('-hora').first()
+    resultado = registrar_checada(empleado)
 
-    # Obtener tipo de horario del empleado
-    tipo_horario = empleado.tipo_horario
+    for nivel, texto in resultado['avisos']:
+        getattr(messages, nivel)(request, texto)
 
-    # Determinar el tipo de movimiento según el horario
-    if not ultima_asistencia:
-        tipo = TipoMovimiento.ENTRADA
+    if resultado['error']:
+        messages.error(request, resultado['error'])
+    elif resultado['repetida']:
+        messages.info(request, resultado['mensaje'])
     else:
-        # Verificar si el empleado tiene horario de comida
-        tiene_comida = False
-        if tipo_horario:
-            # Para turnos de 24h, nunca hay comida
-            if tipo_horario.es_turno_24h:
-                tiene_comida = False
-            else:
-                # Usar el campo tiene_horario_comida
-                tiene_comida = tipo_horario.tiene_horario_comida
-        
-        # Si NO tiene horario de comida, alternar entre ENTRADA y SALIDA solamente
-        if not tiene_comida:
-            if ultima_asistencia.tipo_movimiento == TipoMovimiento.ENTRADA:
-                tipo = TipoMovimiento.SALIDA
-            else:
-                # Cualquier otra checada reinicia el ciclo
-                tipo = TipoMovimiento.ENTRADA
-        else:
-            # Horario CON comida: secuencia completa ENTRADA → SALIDA_COMIDA → ENTRADA_COMIDA → SALIDA
-            if ultima_asistencia.tipo_movimiento == TipoMovimiento.ENTRADA:
-                tipo = TipoMovimiento.SALIDA_COMIDA
-            elif ultima_asistencia.tipo_movimiento == TipoMovimiento.SALIDA_COMIDA:
-                tipo = TipoMovimiento.ENTRADA_COMIDA
-            elif ultima_asistencia.tipo_movimiento == TipoMovimiento.ENTRADA_COMIDA:
-                tipo = TipoMovimiento.SALIDA
-            else:
-                # Si hay algún caso extraño (SALIDA), reiniciar ciclo
-                tipo = TipoMovimiento.ENTRADA
-
-    # Validar horario de comida si aplica
-    if tipo == TipoMovimiento.SALIDA_COMIDA:
-        if tipo_horario and tipo_horario.tiene_horario_comida:
-            # Validar que esté dentro del rango de comida
-            if tipo_horario.hora_inicio_comida and tipo_horario.hora_fin_comida:
-                if not (tipo_horario.hora_inicio_comida <= ahora <= tipo_horario.hora_fin_comida):
-                    messages.error(
-                        request,
-                        f"No puedes salir a comer fuera del horario permitido ({tipo_horario.hora_inicio_comida.strftime('%H:%M')} - {tipo_horario.hora_fin_comida.strftime('%H:%M')})"
-                    )
-                    return redirect(redirect_to)
-        elif tipo_horario and not tipo_horario.tiene_horario_comida:
-            # No tiene horario de comida, no permitir este movimiento
-            messages.error(request, "Tu horario no incluye salida a comida")
-            return redirect(redirect_to)
-
-    asistencia = Asistencia.objects.create(
-        empleado=empleado,
-        tipo_movimiento=tipo
-    )
-
-    # Calcular retardo si es entrada
-    if tipo == TipoMovimiento.ENTRADA:
-        config = ConfiguracionSistema.objects.first()
-        if tipo_horario and tipo_horario.hora_entrada:
-            asistencia.calcular_retardo(str(tipo_horario.hora_entrada), tipo_horario.minutos_tolerancia)
-        elif config:
-            asistencia.calcular_retardo(str(config.hora_entrada), config.minutos_tolerancia)
-        asistencia.save()
-
-    # Construir mensaje informativo
-    nombre = empleado.user.get_full_name()
-    hora_registro = asistencia.hora.strftime('%H:%M')
-    
-    # Mensaje base según tipo de movimiento
-    tipo_display = asistencia.get_tipo_movimiento_display()
-    mensaje = f"✅ {nombre} - {tipo_display} ({hora_registro})"
-    
-    # Agregar info de retardo si aplica
-    if asistencia.retardo:
-        mensaje += f" ⚠️ Retardo: {asistencia.minutos_retardo} min"
-    
-    # Contar checadas del día para dar contexto
-    total_checadas_hoy = Asistencia.objects.filter(
-        empleado=empleado,
-        fecha=hoy
-    ).count()
-    
-    # Agregar info adicional según el tipo
-    if tipo == TipoMovimiento.ENTRADA:
-        mensaje += f" | Checada #{total_checadas_hoy}"
-    elif tipo == TipoMovimiento.SALIDA:
-        if tiene_comida:
-            mensaje += f" (Final del día) | Total checadas: {total_checadas_hoy}"
-        else:
-            mensaje += f" | Checada #{total_checadas_hoy}"
-    elif tipo == TipoMovimiento.SALIDA_COMIDA:
-        mensaje += " 🍽️"
-    elif tipo == TipoMovimiento.ENTRADA_COMIDA:
-        mensaje += " 💼"
-
-    messages.success(request, mensaje)
+        messages.success(request, resultado['mensaje'])
     return redirect(redirect_to)
 
-def procesar_checkin_visitante(request, visitante, redirect_to='checkin'):
-    """Procesa el check-in de un visitante"""
+def registrar_movimiento_visitante(visitante):
+    """
+    Registra la entrada del visitante o, si tiene una visita abierta, su salida (y desactiva el QR).
+
+    Returns:
+        dict: {'movimiento': 'ENTRADA', 'SALIDA' o None, 'mensaje': texto o None, 'error': texto o None}
+    """
     # Validar que el QR esté activo
     if not visitante.qr_activo:
-        messages.error(
-            request, 
-            f"Código QR inactivo para {visitante.nombre}. La visita ya finalizó. Debe registrar una nueva visita."
-        )
-        return redirect(redirect_to)
-    
+        return {
+            'movimiento': None,
+            'mensaje': None,
+            'error': f"Código QR inactivo para {visitante.nombre}. La visita ya finalizó. Debe registrar una nueva visita.",
+        }
+
     # Verificar si ya tiene un registro abierto
     registro_abierto = RegistroVisita.objects.filter(
         visitante=visitante,
@@ -299,17 +236,26 @@ def procesar_checkin_visitante(request, visitante, redirect_to='checkin'):
         # Registrar salida y desactivar QR
         registro_abierto.hora_salida = timezone.now()
         registro_abierto.save()
-        
+
         # Desactivar el QR después de la salida
         visitante.qr_activo = False
         visitante.save(update_fields=['qr_activo'])
-        
-        messages.success(request, f"Salida registrada: {visitante.nombre}. El código QR ha sido desactivado.")
-    else:
-        # Registrar entrada
-        RegistroVisita.objects.create(visitante=visitante)
-        messages.success(request, f"Entrada registrada: {visitante.nombre} - Visita a {visitante.departamento_visita}")
 
+        mensaje = f"Salida registrada: {visitante.nombre}. El código QR ha sido desactivado."
+        return {'movimiento': 'SALIDA', 'mensaje': mensaje, 'error': None}
+
+    # Registrar entrada
+    RegistroVisita.objects.create(visitante=visitante)
+    mensaje = f"Entrada registrada: {visitante.nombre} - Visita a {visitante.departamento_visita}"
+    return {'movimiento': 'ENTRADA', 'mensaje': mensaje, 'error': None}
+
+def procesar_checkin_visitante(request, visitante, redirect_to='checkin'):
+    """Procesa el check-in de un visitante"""
+    resultado = registrar_movimiento_visitante(visitante)
+    if resultado['error']:
+        messages.error(request, resultado['error'])
+    else:
+        messages.success(request, resultado['mensaje'])
     return redirect(redirect_to)
 
 # Vista de formulario de visitantes (pública)
@@ -335,34 +281,22 @@ def dashboard_view(request):
     """Dashboard con estadísticas de asistencia"""
     hoy = timezone.now().date()
 
-    # Estadísticas del día
-    asistencias_hoy = Asistencia.objects.filter(
-        fecha=hoy,
-        tipo_movimiento=TipoMovimiento.ENTRADA
+    # Estadísticas del día desde los resúmenes diarios
+    estadisticas_hoy = ResumenDiarioAsistencia.objects.filter(fecha=hoy).aggregate(
+        llegaron=Count('id', filter=Q(primera_entrada__isnull=False)),
+        retardos=Count('id', filter=Q(retardo=True))
     )
 
     total_empleados = Empleado.objects.filter(activo=True).count()
-    llegaron_hoy = asistencias_hoy.count()
-    retardos_hoy = asistencias_hoy.filter(retardo=True).count()
+    llegaron_hoy = estadisticas_hoy['llegaron']
+    retardos_hoy = estadisticas_hoy['retardos']
 
-    # Empleados con retardos consecutivos (últimos 5 días)
+    # Empleados con retardos consecutivos (últimos 5 días), en una sola consulta agrupada
     fecha_inicio = hoy - timedelta(days=5)
-    empleados_retardos = []
-
-    for empleado in Empleado.objects.filter(activo=True):
-        retardos = Asistencia.objects.filter(
-            empleado=empleado,
-            fecha__gte=fecha_inicio,
-            fecha__lte=hoy,
-            tipo_movimiento=TipoMovimiento.ENTRADA,
-            retardo=True
-        ).count()
-
-        if retardos >= 3:
-            empleados_retardos.append({
-                'empleado': empleado,
-                'retardos': retardos
-            })
+    empleados_retardos = [
+        {'empleado': empleado, 'retardos': empleado.retardos}
+        for empleado in empleados_con_retardos(fecha_inicio, hoy)
+    ]
 
     context = {
         'total_empleados': total_empleados,
@@ -383,58 +317,48 @@ def reporte_mensual_view(request, mes=None, anio=None):
         mes = hoy.month
         anio = hoy.year
 
-    # Obtener todas las asistencias del mes
-    asistencias = Asistencia.objects.filter(
-        fecha__month=mes,
-        fecha__year=anio
-    ).select_related('empleado', 'empleado__user')
-
-    # Agrupar por empleado
-    empleados_data = {}
-    for asistencia in asistencias:
-        emp_id = asistencia.empleado.id
-        if emp_id not in empleados_data:
-            empleados_data[emp_id] = {
-                'empleado': asistencia.empleado,
-                'dias_unicos': set(),  # Usar set para días únicos
-                'retardos': 0,
-                'total_minutos_retardo': 0,
-            }
-
-        if asistencia.tipo_movimiento == TipoMovimiento.ENTRADA:
-            # Agregar fecha al set de días únicos
-            empleados_data[emp_id]['dias_unicos'].add(asistencia.fecha)
-            if asistencia.retardo:
-                empleados_data[emp_id]['retardos'] += 1
-                empleados_data[emp_id]['total_minutos_retardo'] += asistencia.minutos_retardo
-    
-    # Convertir sets a conteo de días
-    for emp_id, data in empleados_data.items():
-        data['total_dias'] = len(data['dias_unicos'])
-        del data['dias_unicos']  # Eliminar el set ya que no es serializable para template
+    if request.GET.get('formato') == 'excel':
+        # Meses cerrados: si ya existe el archivo para la versión actual de sus datos se sirve directo
+        artefacto = artefacto_existente('mensual', periodo_mes(anio, mes), 'xlsx')
+        if artefacto:
+            if 'application/json' in request.headers.get('Accept', ''):
+                # Polling desde la página: se le indica que descargue directamente
+                return JsonResponse({'estado': EstadoTarea.TERMINADA, 'progreso': 100, 'descarga_url': request.get_full_path()})
+            return respuesta_artefacto(*artefacto, f"reporte_mensual_{anio}_{mes:02d}.xlsx")
+
+        # Si no, se encola: generarlo aquí ocuparía el worker que atiende a las tablets
+        tarea = encolar_tarea(TipoTareaReporte.MENSUAL, {'mes': mes, 'anio': anio}, request.user)
+        return JsonResponse(estado_tarea(tarea), status=202)
+    
+    # Una fila por empleado con checadas en el mes, agregada sobre los resúmenes diarios.
+    # Días y retardos solo cuentan las ENTRADAS; quien solo tiene otros movimientos aparece con 0.
+    con_retardo = Q(resumenes_diarios__retardo=True)
+    empleados = Empleado.objects.filter(
+        periodo_mes(anio, mes).filtro('resumenes_diarios__fecha'),
+        resumenes_diarios__checadas__gt=0
+    ).annotate(
+        total_dias=Count('resumenes_diarios', filter=Q(resumenes_diarios__primera_entrada__isnull=False)),
+        retardos=Count('resumenes_diarios', filter=con_retardo),
+        total_minutos_retardo=Coalesce(Sum('resumenes_diarios__minutos_retardo', filter=con_retardo), 0)
+    ).select_related('user', 'departamento').order_by('codigo_empleado')
+
+    empleados_data = [
+        {
+            'empleado': empleado,
+            'total_dias': empleado.total_dias,
+            'retardos': empleado.retardos,
+            'total_minutos_retardo': empleado.total_minutos_retardo,
+        }
+        for empleado in empleados
+    ]
 
     # Calcular total de retardos
-    total_retardos = sum(data['retardos'] for data in empleados_data.values())
-    
-    # Si se solicita formato Excel, generar y descargar
-    if request.GET.get('formato') == 'excel':
-        from django.http import HttpResponse
-        from attendance.utils import generar_excel_reporte_mensual
-        
-        excel_buffer = generar_excel_reporte_mensual(mes, anio)
-        nombre_archivo = f"reporte_mensual_{anio}_{mes:02d}.xlsx"
-        
-        response = HttpResponse(
-            excel_buffer.read(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
-        return response
-    
+    total_retardos = sum(data['retardos'] for data in empleados_data)
+
     context = {
         'mes': mes,
         'anio': anio,
-        'empleados_data': empleados_data.values(),
+        'empleados_data': empleados_data,
         'total_retardos': total_retardos,
         'years_disponibles': range(2024, datetime.now().year + 1), # Generacion de years
         'active_nav': 'reportes',
@@ -442,6 +366,18 @@ def reporte_mensual_view(request, mes=None, anio=None):
 
     return render(request, 'attendance/reporte_mensual.html', context)
 
+def tarea_reporte_estado(request, tarea_id):
+    """Estado y progreso de una tarea de reporte (JSON para polling)"""
+    tarea = get_object_or_404(TareaReporte, pk=tarea_id)
+    return JsonResponse(estado_tarea(tarea))
+
+def tarea_reporte_descarga(request, tarea_id):
+    """Descarga el archivo de una tarea terminada"""
+    tarea = get_object_or_404(TareaReporte, pk=tarea_id)
+    if tarea.estado != EstadoTarea.TERMINADA:
+        return JsonResponse(estado_tarea(tarea), status=409)
+    return respuesta_artefacto(get_reportes_storage(), tarea.archivo, tarea.nombre_descarga)
+
 # Lista de visitantes
 def visitantes_list_view(request):
     """Lista de todos los visitantes"""
@@ -529,7 +465,6 @@ def verificar_visitante_qr(request):
 def asignacion_turnos_mensual(request, mes=None, anio=None):
     """Vista tipo Excel para asignación de turnos mensuales"""
     import calendar
-    from datetime import date
     
     # Si no se especifica mes/año, usar el actual
     if not mes or not anio:
@@ -543,18 +478,17 @@ def asignacion_turnos_mensual(request, mes=None, anio=None):
     # Obtener empleados activos
     empleados = Empleado.objects.filter(activo=True).select_related('user').order_by('user__first_name')
     
-    # Obtener número de días en el mes
-    num_dias = calendar.monthrange(anio, mes)[1]
+    # Rango del mes [día 1, día 1 del mes siguiente)
+    periodo = periodo_mes(anio, mes)
     
     # Crear lista de días con información
     dias_del_mes = []
     nombres_dias = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
     
-    for dia in range(1, num_dias + 1):
-        fecha = date(anio, mes, dia)
+    for fecha in periodo.dias():
         dia_semana_num = fecha.weekday()  # 0=Lunes, 6=Domingo
         dias_del_mes.append({
-            'numero': dia,
+            'numero': fecha.day,
             'fecha': fecha,
             'dia_semana': nombres_dias[dia_semana_num],
             'es_fin_semana': dia_semana_num >= 5  # Sábado o Domingo
@@ -562,8 +496,7 @@ def asignacion_turnos_mensual(request, mes=None, anio=None):
     
     # Obtener asignaciones existentes para este mes
     asignaciones = AsignacionTurnoDiaria.objects.filter(
-        fecha__year=anio,
-        fecha__month=mes
+        periodo.filtro()
     ).select_related('empleado', 'turno_rotativo')
     
     # Crear diccionario de asignaciones por empleado y fecha
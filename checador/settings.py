@@ -50,7 +50,6 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'storages',
-    'django_apscheduler',
     'attendance',
 ]
 
@@ -190,10 +189,62 @@ EMAIL_HOST_USER = 'apikey'  # Cambiar
 EMAIL_HOST_PASSWORD = env.str('EMAIL_HOST_PASSWORD')  # Usar App Password de Gmail
 DEFAULT_FROM_EMAIL = 'checadorKasu@transportekasu.com.mx'
 
-# django-apscheduler: reportes periódicos programados dentro del proceso Django
-APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s a"
-APSCHEDULER_RUN_NOW_TIMEOUT = 25  # seconds
-SCHEDULER_DEFAULT = True
+# Bandeja de salida (attendance.correos): correos por conexión SMTP, intentos antes de darlo
+# por fallido, segundos de espera del primer reintento (se duplica en cada uno), segundos que
+# un envío aparta su lote y segundos entre revisiones del scheduler
+CORREOS_LOTE = env.int('CORREOS_LOTE', default=50)
+CORREOS_MAX_INTENTOS = env.int('CORREOS_MAX_INTENTOS', default=6)
+CORREOS_REINTENTO_BASE = env.int('CORREOS_REINTENTO_BASE', default=60)
+CORREOS_TIEMPO_MAXIMO = env.int('CORREOS_TIEMPO_MAXIMO', default=300)
+CORREOS_INTERVALO = env.int('CORREOS_INTERVALO', default=15)
+
+# Scheduler de reportes periódicos (manage.py run_scheduler): segundos de vigencia del
+# candado en BD que impide que corran dos schedulers; el activo lo renueva cada tercio
+SCHEDULER_CANDADO_SEGUNDOS = env.int('SCHEDULER_CANDADO_SEGUNDOS', default=60)
+
+# Caché por proceso de obtener_horario_esperado (entradas y segundos de vigencia)
+HORARIOS_CACHE_TAMANO = env.int('HORARIOS_CACHE_TAMANO', default=1024)
+HORARIOS_CACHE_TTL = env.int('HORARIOS_CACHE_TTL', default=300)
+
+# Caché de QR → empleado del check-in: por proceso (entradas y segundos tras los que se
+# recarga completa) o, con CHECKIN_QR_CACHE_ALIAS, un cache de CACHES compartido entre workers
+CHECKIN_QR_CACHE_TAMANO = env.int('CHECKIN_QR_CACHE_TAMANO', default=20000)
+CHECKIN_QR_CACHE_TTL = env.int('CHECKIN_QR_CACHE_TTL', default=3600)
+CHECKIN_QR_CACHE_ALIAS = env.str('CHECKIN_QR_CACHE_ALIAS', default='')
+
+# Sincronización de escaneos guardados sin conexión en la tablet: escaneos máximos por lote,
+# horas de atraso aceptadas y segundos que el reloj de la tablet puede ir adelantado
+CHECKIN_LOTE_MAXIMO = env.int('CHECKIN_LOTE_MAXIMO', default=200)
+CHECKIN_LOTE_MAX_HORAS = env.int('CHECKIN_LOTE_MAX_HORAS', default=72)
+CHECKIN_RELOJ_TOLERANCIA = env.int('CHECKIN_RELOJ_TOLERANCIA', default=300)
+
+# Segundos tras una checada en los que otro escaneo del mismo empleado (doble escaneo o dos
+# tablets) se toma como repetido y no se registra; 0 lo desactiva
+CHECKIN_ANTIRREBOTE_SEGUNDOS = env.int('CHECKIN_ANTIRREBOTE_SEGUNDOS', default=30)
+
+# Días hacia atrás (terminando ayer) que el job nocturno recalcula en ResumenDiarioAsistencia
+RESUMEN_DIARIO_DIAS_RECONCILIACION = env.int('RESUMEN_DIARIO_DIAS_RECONCILIACION', default=7)
+# Meses cerrados que el job revisa para construir o reconstruir su resumen precalculado
+RESUMEN_MENSUAL_MESES = env.int('RESUMEN_MENSUAL_MESES', default=3)
+
+# Descargas de Excel: bytes que se mantienen en memoria antes de pasar a un archivo temporal en disco
+REPORTES_SPOOL_MAX_BYTES = env.int('REPORTES_SPOOL_MAX_BYTES', default=5 * 1024 * 1024)
+# Segundos de vigencia de las URLs firmadas de reportes guardados en Spaces
+REPORTES_URL_EXPIRA = env.int('REPORTES_URL_EXPIRA', default=300)
+# Enviar además a cada Departamento.email su parte de los reportes diario y semanal
+REPORTES_POR_DEPARTAMENTO = env.bool('REPORTES_POR_DEPARTAMENTO', default=True)
+# Procesos para armar las filas de los reportes Excel por departamento (1 = en el mismo proceso).
+# Solo aplica fuera de las vistas: trabajador de reportes, scheduler y comandos de cierre de mes
+REPORTES_PROCESOS = env.int('REPORTES_PROCESOS', default=1)
+
+# Cola de reportes (attendance.tareas): segundos entre revisiones del trabajador, segundos tras
+# los que una tarea en proceso se considera abandonada, y si el proceso scheduler también la procesa
+TAREAS_REPORTE_INTERVALO = env.int('TAREAS_REPORTE_INTERVALO', default=5)
+TAREAS_REPORTE_TIEMPO_MAXIMO = env.int('TAREAS_REPORTE_TIEMPO_MAXIMO', default=600)
+TAREAS_REPORTE_EN_SCHEDULER = env.bool('TAREAS_REPORTE_EN_SCHEDULER', default=False)
+# El trabajador de reportes corre en otro contenedor que el web: con True los archivos de
+# reportes exigen Spaces y, sin sus credenciales, fallan en lugar de quedar en el disco local
+REPORTES_STORAGE_COMPARTIDO = env.bool('REPORTES_STORAGE_COMPARTIDO', default=False)
 
 # Seguridad
 SECURE_BROWSER_XSS_FILTER = True
@@ -48,9 +48,11 @@ class ReportesStorage(S3Boto3Storage):
     location = 'reportes'
     default_acl = 'private'  # Los reportes son privados por defecto
     file_overwrite = True
+    # Sin custom_domain: las URLs se firman y expiran (el bucket no es público para reportes)
+    querystring_auth = True
 
     def __init__(self, *args, **kwargs):
-        kwargs['custom_domain'] = getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
+        kwargs.setdefault('querystring_expire', getattr(settings, 'REPORTES_URL_EXPIRA', 300))
         super().__init__(*args, **kwargs)
         logger.info("📊 ReportesStorage inicializado para DigitalOcean Spaces")
 
@@ -117,6 +119,24 @@ def upload_reporte_excel(filename):
 
 # === FUNCIONES DE UTILIDAD ===
 
+def get_reportes_storage():
+    """
+    Storage de reportes generados: ReportesStorage en Spaces o, sin credenciales,
+    una carpeta privada bajo MEDIA_ROOT que solo se sirve a través de las vistas.
+
+    Con REPORTES_STORAGE_COMPARTIDO (web y trabajador en contenedores distintos) el disco
+    local no sirve: el web no vería los archivos del trabajador, así que se exige Spaces.
+    """
+    if getattr(settings, 'USE_SPACES', False):
+        return ReportesStorage()
+    if getattr(settings, 'REPORTES_STORAGE_COMPARTIDO', False):
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured(
+            'REPORTES_STORAGE_COMPARTIDO requiere Spaces: configura SPACES_KEY, SPACES_SECRET y SPACES_BUCKET'
+        )
+    from django.core.files.storage import FileSystemStorage
+    return FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'reportes'), base_url=None)
+
 def get_file_url(file_field):
     """
     Obtiene la URL completa de un archivo, manejando tanto storage local como Spaces
@@ -231,39 +251,58 @@ class FileUploadMiddleware:
 
 # === SEÑALES PARA MANEJO AUTOMÁTICO ===
 
+from django.apps import apps
+from django.db import models
 from django.db.models.signals import post_delete, pre_save
-from django.dispatch import receiver
 
-@receiver(post_delete)
+# Modelo -> nombres de sus campos de archivo; solo esos modelos tienen conectadas las señales
+FILE_FIELDS = {}
+
+def connect_file_signals():
+    """
+    Conecta las señales de limpieza de archivos solo a los modelos con FileField/ImageField.
+    Se llama desde AttendanceConfig.ready(), cuando ya están cargados todos los modelos:
+    guardar o borrar cualquier otro modelo (p. ej. cada checada) no paga ninguna consulta extra.
+    """
+    for model in apps.get_models():
+        names = [field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+        if not names:
+            continue
+        FILE_FIELDS[model] = names
+        post_delete.connect(delete_file_on_model_delete, sender=model, dispatch_uid=f'delete_file_{model._meta.label}')
+        pre_save.connect(delete_old_file_on_change, sender=model, dispatch_uid=f'delete_old_file_{model._meta.label}')
+
 def delete_file_on_model_delete(sender, instance, **kwargs):
     """
     Elimina archivos del storage cuando se elimina un modelo
     """
-    # Buscar campos de archivo en el modelo
-    for field in instance._meta.fields:
-        if hasattr(field, 'upload_to'):
-            file_field = getattr(instance, field.name)
-            if file_field:
-                delete_file_from_storage(file_field.name)
-
-@receiver(pre_save)
-def delete_old_file_on_change(sender, instance, **kwargs):
+    for name in FILE_FIELDS.get(sender, ()):
+        file_field = getattr(instance, name)
+        if file_field:
+            delete_file_from_storage(file_field.name)
+
+def delete_old_file_on_change(sender, instance, update_fields=None, **kwargs):
     """
     Elimina archivo anterior cuando se actualiza con uno nuevo
     """
     if not instance.pk:
         return  # Es un nuevo objeto, no hay archivo anterior
 
+    names = FILE_FIELDS.get(sender, ())
+    if update_fields is not None:
+        names = [name for name in names if name in update_fields]
+    if not names:
+        return
+
+    # Solo se leen las columnas de archivo de la fila anterior
     try:
-        old_instance = sender.objects.get(pk=instance.pk)
+        old_instance = sender._base_manager.only(*names).get(pk=instance.pk)
     except sender.DoesNotExist:
         return
 
-    # Verificar campos de archivo
-    for field in instance._meta.fields:
-        if hasattr(field, 'upload_to'):
-            old_file = getattr(old_instance, field.name)
-            new_file = getattr(instance, field.name)
+    for name in names:
+        old_file = getattr(old_instance, name)
+        new_file = getattr(instance, name)
 
-            if old_file and old_file != new_file:
-                delete_file_from_storage(old_file.name)
\ No newline at end of file
+        if old_file and old_file != new_file:
+            delete_file_from_storage(old_file.name)
@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'checador.settings')
 
 application = get_wsgi_application()
+
+# Carga la caché de QR del check-in antes del primer escaneo; si la BD aún no responde,
+# se carga en la primera búsqueda
+try:
+    from django.db import connections
+    from attendance.checkin import calentar_cache_qr
+    calentar_cache_qr()
+    connections.close_all()
+except Exception as e:
+    print(f"No se pudo precargar la caché de QR: {e}")